@@ -0,0 +1,120 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from metrics import Counter, Gauge, Histogram
+
+# ---------------------------
+# Admission control
+# ---------------------------
+# LLM-bound /call work runs under an adaptive concurrency limit. Up to ADMISSION_QUEUE_SIZE more
+# requests wait (at most ADMISSION_QUEUE_TIMEOUT_SECONDS) for a slot; anything beyond that is shed
+# to the degraded path (template reply, booking/handoff still applied) instead of piling onto the
+# providers. The limit follows observed reply latency, gradient style: a fast and a slow moving
+# average are compared, and while recent latency stays within ADMISSION_LATENCY_TOLERANCE x the
+# long-run level the limit grows by ~sqrt(limit); as it climbs above that the limit shrinks in
+# proportion. Growth only happens while the limit is actually being used.
+ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", 32))
+ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", 4))
+ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", 256))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 64))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 2))
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", 2))
+SHORT_WINDOW_WEIGHT = 0.2   # EWMA weight of each sample in the recent average
+LONG_WINDOW_WEIGHT = 0.01   # ... and in the long-run average
+LIMIT_SMOOTHING = 0.2
+
+ADMISSIONS = Counter(
+    "riverstone_admission_total",
+    "LLM admission decisions: admitted, queued, shed_queue_full, shed_timeout",
+    label_names=("result",),
+)
+ADMISSION_WAIT = Histogram("riverstone_admission_wait_seconds", "Time queued requests waited for an LLM slot")
+
+
+class AdmissionController:
+    def __init__(self, initial_limit=ADMISSION_INITIAL_LIMIT, min_limit=ADMISSION_MIN_LIMIT,
+                 max_limit=ADMISSION_MAX_LIMIT, queue_size=ADMISSION_QUEUE_SIZE,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS, tolerance=ADMISSION_LATENCY_TOLERANCE,
+                 export_metrics=True):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.short_latency = None
+        self.long_latency = None
+        self._waiters = deque()
+        if export_metrics:
+            Gauge("riverstone_admission_limit", "Current adaptive LLM concurrency limit", callback=lambda: int(self.limit))
+            Gauge("riverstone_admission_in_flight", "LLM-bound requests running", callback=lambda: self.in_flight)
+            Gauge("riverstone_admission_queued", "Requests waiting for an LLM slot", callback=lambda: len(self._waiters))
+
+    async def acquire(self):
+        """True once a slot is held (call release() after), False if the request should be shed."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            ADMISSIONS.inc("admitted")
+            return True
+        if len(self._waiters) >= self.queue_size:
+            ADMISSIONS.inc("shed_queue_full")
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            # release() hands its slot straight to the waiter (in_flight is already counted)
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not (waiter.done() and not waiter.cancelled()):
+                ADMISSIONS.inc("shed_timeout")
+                return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # granted a slot just as the request went away
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+        ADMISSION_WAIT.observe(time.perf_counter() - started)
+        ADMISSIONS.inc("queued")
+        return True
+
+    def release(self, latency=None):
+        """Free a slot; latency (seconds) of the LLM work it covered feeds the adaptive limit."""
+        if latency is not None:
+            self.observe(latency)
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                self.in_flight += 1
+
+    def observe(self, latency):
+        if self.short_latency is None:
+            self.short_latency = self.long_latency = latency
+            return
+        self.short_latency += SHORT_WINDOW_WEIGHT * (latency - self.short_latency)
+        self.long_latency += LONG_WINDOW_WEIGHT * (latency - self.long_latency)
+        if self.long_latency > 2 * self.short_latency:
+            # Recovering from a slow period: let the long-run level come back down faster
+            self.long_latency *= 0.95
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / self.short_latency))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        if self.in_flight < self.limit / 2:
+            target = min(target, self.limit)  # not using the limit we have: don't raise it
+        limit = self.limit + LIMIT_SMOOTHING * (target - self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+    def retry_after(self):
+        """Whole seconds after which a shed request is likely to get a full reply."""
+        latency = self.short_latency or 1.0
+        backlog = (len(self._waiters) + self.in_flight) / max(self.limit, 1)
+        return max(1, min(30, math.ceil(latency * (1 + backlog))))
@@ -0,0 +1,147 @@
+"""
+Lead rollups: calls, new leads, bookings and handoffs per day, overall / per suburb / per project.
+
+    python -m analytics show --days 7
+    python -m analytics rebuild --db leads.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import date, timedelta
+from pydantic_core import from_json
+from knowledge_pack import KNOWLEDGE_PACK
+
+# ---------------------------
+# Rollups
+# ---------------------------
+# lead_rollups holds one counter row per (day, dimension, value), dimension being "all" (value ""),
+# "suburb" or "project". Every lead write bumps its rows in the same transaction as the lead, so the
+# counts can't drift from leads.db, and /stats reads at most days x (1 + suburbs + projects) rows
+# however many leads there are. A lead with several preferred suburbs counts once in each of them
+# (and in each matching project) but once in "all". Projects come from the suburbs the caller asked
+# about. Databases with leads logged before the rollups existed can be backfilled with `rebuild`.
+ROLLUP_METRICS = ("calls", "leads", "bookings", "handoffs")
+STATS_MAX_DAYS = 366
+SUBURB_PROJECTS = {}
+for _project in KNOWLEDGE_PACK["projects"]:
+    SUBURB_PROJECTS.setdefault(_project["suburb"].lower(), []).append(_project["name"])
+
+UPSERT_SQL = f"""
+    INSERT INTO lead_rollups (day, dimension, value, {', '.join(ROLLUP_METRICS)}) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (day, dimension, value) DO UPDATE SET
+        {', '.join(f'{metric} = {metric} + excluded.{metric}' for metric in ROLLUP_METRICS)}
+"""
+
+
+def migrate_rollups(db):
+    db.execute(f"""
+    CREATE TABLE IF NOT EXISTS lead_rollups (
+        day TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        {', '.join(f'{metric} INTEGER NOT NULL DEFAULT 0' for metric in ROLLUP_METRICS)},
+        PRIMARY KEY (day, dimension, value)
+    ) WITHOUT ROWID
+    """)
+    db.commit()
+
+
+def rollup_keys(suburbs):
+    """(dimension, value) rows a lead interested in these suburbs counts towards."""
+    suburbs = list(dict.fromkeys(str(suburb).strip().title() for suburb in suburbs or () if str(suburb).strip()))
+    projects = dict.fromkeys(project for suburb in suburbs for project in SUBURB_PROJECTS.get(suburb.lower(), ()))
+    return [("all", "")] + [("suburb", suburb) for suburb in suburbs] + [("project", project) for project in projects]
+
+
+def record_call(db, lead, timestamp, new_lead):
+    """Count one logged call (lead dict as built by voice_agent.build_lead_data) without committing."""
+    events = lead.get("events") or ()
+    counts = (1, int(new_lead), int("lead.booked" in events), int("lead.handoff" in events))
+    day = timestamp[:10]
+    db.executemany(UPSERT_SQL, [
+        (day, dimension, value, *counts) for dimension, value in rollup_keys((lead.get("qualification") or {}).get("suburbs"))
+    ])
+
+
+def rebuild_rollups(db):
+    """
+    Recompute lead_rollups from the leads table in one pass. Older rows only keep their latest state,
+    so each lead is counted on its first day: call_count calls, one booking if it holds one, and no
+    handoffs (those were never stored on the lead).
+    """
+    migrate_rollups(db)
+    totals = {}
+    for timestamp, qualification, booking, call_count in db.execute(
+        "SELECT timestamp, qualification, booking, COALESCE(call_count, 1) FROM leads"
+    ):
+        try:
+            suburbs = (from_json(qualification) or {}).get("suburbs") if qualification else None
+            booked = bool((from_json(booking) or {}).get("ok")) if booking else False
+        except (ValueError, AttributeError):
+            suburbs, booked = None, False
+        for key in rollup_keys(suburbs):
+            counts = totals.setdefault(((timestamp or "")[:10], *key), [0, 0, 0, 0])
+            counts[0] += call_count
+            counts[1] += 1
+            counts[2] += booked
+    try:
+        db.execute("DELETE FROM lead_rollups")
+        db.executemany(UPSERT_SQL, [(*key, *counts) for key, counts in totals.items()])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(totals)
+
+
+def _with_rates(counts):
+    calls = counts["calls"]
+    return dict(
+        counts,
+        booking_rate=round(counts["bookings"] / calls, 4) if calls else None,
+        handoff_rate=round(counts["handoffs"] / calls, 4) if calls else None,
+    )
+
+
+def rollup_stats(db, days=30, today=None):
+    """Totals, per-day, per-suburb and per-project counts (with booking/handoff rates) for the last `days` days."""
+    since = ((today or date.today()) - timedelta(days=days - 1)).isoformat()
+    stats = {"since": since, "totals": dict.fromkeys(ROLLUP_METRICS, 0), "by_day": [], "by_suburb": {}, "by_project": {}}
+    for day, dimension, value, *counts in db.execute(
+        f"SELECT day, dimension, value, {', '.join(ROLLUP_METRICS)} FROM lead_rollups WHERE day >= ? ORDER BY day",
+        (since,)
+    ):
+        counts = dict(zip(ROLLUP_METRICS, counts))
+        if dimension == "all":
+            stats["by_day"].append(_with_rates(dict(counts, day=day)))
+            target = stats["totals"]
+        else:
+            target = stats[f"by_{dimension}"].setdefault(value, dict.fromkeys(ROLLUP_METRICS, 0))
+        for metric, count in counts.items():
+            target[metric] += count
+    stats["totals"] = _with_rates(stats["totals"])
+    for dimension in ("by_suburb", "by_project"):
+        stats[dimension] = {
+            value: _with_rates(counts)
+            for value, counts in sorted(stats[dimension].items(), key=lambda item: -item[1]["calls"])
+        }
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["show", "rebuild"])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    args = parser.parse_args(argv)
+    db = sqlite3.connect(args.db)
+    if args.command == "rebuild":
+        print(json.dumps({"rollup_rows": rebuild_rollups(db)}))
+    else:
+        migrate_rollups(db)
+        print(json.dumps(rollup_stats(db, args.days), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 # app.py
 import os
+import io
+import re
+import json
+import uuid
+import hashlib
 import requests
 import base64
 import streamlit as st
 from dotenv import load_dotenv
 from gtts import gTTS
+from PIL import Image
 from datetime import datetime
 import logging
+from knowledge_pack import KNOWLEDGE_PACK
 
 # Configure logging to output to Streamlit logs
 logging.basicConfig(level=logging.ERROR)
@@ -20,6 +27,41 @@ def iso_to_readable(iso_str):
     dt = datetime.fromisoformat(iso_str)
     return dt.strftime("%a %d %b %I:%M %p")
 
+def short_price(price_str):
+    """Shorten a knowledge-pack price like 'from $585,000' to 'from $585k'."""
+    match = re.fullmatch(r"from \$([\d,]+)", price_str)
+    if not match:
+        return price_str.split(" (")[0]
+    return f"from ${int(match.group(1).replace(',', '')) // 1000}k"
+
+
+# --------------------------
+# Image Assets (cached)
+# --------------------------
+# Display widths are ~2x the rendered size in the centered layout so images stay sharp on retina screens.
+HERO_WIDTH = 1400
+CARD_WIDTH = 720
+WEBP_QUALITY = 80
+
+@st.cache_data(show_spinner=False)
+def load_webp(path, max_width, mtime=None):
+    """Resize an image once and return compressed WebP bytes; cached across reruns (mtime busts the cache)."""
+    with Image.open(path) as img:
+        img.thumbnail((max_width, img.height))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+def show_image(path, max_width, **kwargs):
+    """Render a cached WebP variant of a local image, falling back to the original file."""
+    try:
+        st.image(load_webp(path, max_width, os.path.getmtime(path)), **kwargs)
+    except Exception as e:
+        logger.warning(f"WebP conversion failed for {path}: {e}")
+        st.image(path, **kwargs)
+
 
 # --------------------------
 # Load environment variables
@@ -40,6 +82,19 @@ BACKEND_URL = get_backend_url()
 
 
 BACKEND_API_KEY = os.getenv("BACKEND_API_KEY")  # Optional backend auth
+HISTORY_TURNS_SENT = 20  # backend keeps at most this many turns (CHAT_HISTORY_MAX_TURNS)
+
+def idempotency_key_for(payload):
+    """Same submission retried (e.g. after a timeout) reuses its key; new content gets a new one."""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    if st.session_state.get("pending_request_hash") != digest:
+        st.session_state.pending_request_hash = digest
+        st.session_state.pending_request_key = str(uuid.uuid4())
+    return st.session_state.pending_request_key
+
+def clear_idempotency_key():
+    st.session_state.pop("pending_request_hash", None)
+    st.session_state.pop("pending_request_key", None)
 
 def play_agent_audio_from_base64(audio_base64: str):
     if not audio_base64:
@@ -66,45 +121,32 @@ st.title("Riverstone Voice Agent")
 # --------------------------
 # Hero Section + Main Image
 # --------------------------
-st.markdown("""
+st.markdown(f"""
     <h2 style='text-align: center; color: #1E3A8A;'>Find Your Perfect Home Across Melbourne</h2>
     <p style='text-align: center; font-size: 1.1em;'>
-        Riverstone Place • Harbourview Towers • Yarra Edge • Collingwood Quarter<br>
-        <strong>Expert guidance from Harbourline Developments</strong>
+        {" • ".join(p["name"] for p in KNOWLEDGE_PACK["projects"])}<br>
+        <strong>Expert guidance from {KNOWLEDGE_PACK["developer"]}</strong>
     </p>
 """, unsafe_allow_html=True)
 
 # Main Hero Image
-st.image(
-    "images/hero_img.jpg", 
+show_image(
+    KNOWLEDGE_PACK["hero_image"],
+    HERO_WIDTH,
     use_container_width=True,
     caption="Discover modern living across Melbourne's best inner suburbs"
 )
 
 st.markdown("### Our Current Projects")
 
-# Project Cards (beautiful side-by-side)
-col1, col2 = st.columns(2)
-with col1:
-    st.image("images/riverstone.png", use_container_width=True)
-    st.markdown("**Riverstone Place** — Abbotsford")
-    st.caption("Leafy, riverside living • from $585k")
-
-with col2:
-    st.image("images/harbourview.png", use_container_width=True)
-    st.markdown("**Harbourview Towers** — Richmond")
-    st.caption("Vibrant & central • from $720k")
-
-col3, col4 = st.columns(2)
-with col3:
-    st.image("images/yarra_edge.png", use_container_width=True)
-    st.markdown("**Yarra Edge** — Footscray")
-    st.caption("Best value + food scene • from $520k")
-
-with col4:
-    st.image("images/collingwood.png", use_container_width=True)
-    st.markdown("**Collingwood Quarter** — Collingwood")
-    st.caption("Hip & creative • from $635k")
+# Project Cards (two per row, built from the knowledge pack)
+projects = KNOWLEDGE_PACK["projects"]
+for row_start in range(0, len(projects), 2):
+    for col, project in zip(st.columns(2), projects[row_start:row_start + 2]):
+        with col:
+            show_image(project["image"], CARD_WIDTH, use_container_width=True)
+            st.markdown(f"**{project['name']}** — {project['suburb']}")
+            st.caption(f"{project['tagline']} • {short_price(project['price_1bed'])}")
 
 st.divider()
 
@@ -179,17 +221,18 @@ if submitted:
         "preferred_suburbs": [s.strip() for s in preferred_suburbs.split(",") if s.strip()],
         "preferred_slot": preferred_slot,
         "additional_info": additional_info,
-        "chat_history": st.session_state.chat_history,
+        "chat_history": st.session_state.chat_history[-HISTORY_TURNS_SENT:],
     }
 
     with st.spinner("Contacting Riverstone Agent..."):
         try:
-            headers = {"Content-Type": "application/json"}
+            headers = {"Content-Type": "application/json", "Idempotency-Key": idempotency_key_for(data)}
             if BACKEND_API_KEY:
                 headers["Authorization"] = f"Bearer {BACKEND_API_KEY}"
             resp = requests.post(BACKEND_URL, json=data, headers=headers, timeout=40)
             resp.raise_for_status()
             result = resp.json()
+            clear_idempotency_key()
 
             #--------------------
             # Save chat history
@@ -305,16 +348,17 @@ if st.session_state.get("follow_up_mode", False):
         if follow_up_text and "last_data" in st.session_state:
             follow_up_data = st.session_state.last_data.copy()
             follow_up_data["message"] = follow_up_text
-            follow_up_data["chat_history"] = st.session_state.chat_history
+            follow_up_data["chat_history"] = st.session_state.chat_history[-HISTORY_TURNS_SENT:]
 
             with st.spinner("Asking agent..."):
                 try:
-                    headers = {"Content-Type": "application/json"}
+                    headers = {"Content-Type": "application/json", "Idempotency-Key": idempotency_key_for(follow_up_data)}
                     if BACKEND_API_KEY:
                         headers["Authorization"] = f"Bearer {BACKEND_API_KEY}"
                     resp = requests.post(BACKEND_URL, json=follow_up_data, headers=headers, timeout=30)
                     resp.raise_for_status()
                     new_result = resp.json()
+                    clear_idempotency_key()
                     # overwrite main agent response
                     st.session_state.agent_text = new_result.get("response", "No response.")
 
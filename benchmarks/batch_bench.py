@@ -0,0 +1,114 @@
+"""
+Throughput benchmark for /call/batch against the stand-in LLM providers.
+
+    python -m benchmarks.batch_bench --leads 2000 --latency lognormal:300:0.3
+    python -m benchmarks.batch_bench --leads 2000 --concurrency 64 --format json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import configure_backend
+from benchmarks.mock_llm import MockLLMProcess
+from benchmarks.workload import request_mix
+
+
+def _start_uvicorn(app):
+    """Serve the app over real HTTP in a background thread (ASGITransport buffers streamed bodies)."""
+    import socket
+    import threading
+    import uvicorn
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+async def _post_batch(base_url, leads, body_format):
+    import httpx
+
+    if body_format == "ndjson":
+        content = "".join(json.dumps(lead) + "\n" for lead in leads).encode()
+        headers = {"Content-Type": "application/x-ndjson"}
+    else:
+        content = json.dumps(leads).encode()
+        headers = {"Content-Type": "application/json"}
+    headers["Authorization"] = f"Bearer {os.environ['BATCH_API_TOKEN']}"
+
+    first_result = None
+    statuses = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        start = time.perf_counter()
+        async with client.stream("POST", "/call/batch", content=content, headers=headers) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                if first_result is None:
+                    first_result = time.perf_counter() - start
+                status = json.loads(line)["status"]
+                statuses[status] = statuses.get(status, 0) + 1
+        elapsed = time.perf_counter() - start
+    return elapsed, first_result, statuses
+
+
+def run(leads=1000, latency="lognormal:300:0.3", concurrency=None, body_format="ndjson", seed=42):
+    server = MockLLMProcess(gemini={"latency": latency, "seed": seed}, mistral={"latency": latency}).start()
+    try:
+        with tempfile.TemporaryDirectory() as db_dir:
+            configure_backend(server.url, db_dir)
+            # One client sends the whole batch: lift the per-item rate limit and token budget it is charged against
+            os.environ["BATCH_API_TOKEN"] = "bench"
+            os.environ["BATCH_RATE_LIMIT_MAX_ITEMS"] = str(10**9)
+            os.environ["CLIENT_DAILY_BUDGET_USD"] = os.environ["CLIENT_HARD_LIMIT_USD"] = "1000000"
+            if concurrency:
+                os.environ["BATCH_CONCURRENCY"] = str(concurrency)
+                os.environ["GEMINI_MAX_CONCURRENCY"] = str(concurrency)
+            import voice_agent
+
+            # Unique identities: no single-flight coalescing, every lead costs a provider call
+            payloads = [payload for _, payload in request_mix(leads, seed=seed, scenarios=["browse", "follow_up"])]
+            app_server, thread, base_url = _start_uvicorn(voice_agent.app)
+            try:
+                elapsed, first_result, statuses = asyncio.run(_post_batch(base_url, payloads, body_format))
+            finally:
+                app_server.should_exit = True
+                thread.join(timeout=10)
+        provider_calls = server.stats()
+    finally:
+        server.stop()
+    return {
+        "leads": leads,
+        "format": body_format,
+        "provider_latency": latency,
+        "batch_concurrency": voice_agent.BATCH_CONCURRENCY,
+        "elapsed_s": round(elapsed, 3),
+        "leads_per_s": round(leads / elapsed, 1),
+        "time_to_first_result_ms": round((first_result or 0) * 1000, 1),
+        "statuses": statuses,
+        "provider_calls": provider_calls,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=1000)
+    parser.add_argument("--latency", default="lognormal:300:0.3", help="stand-in provider latency spec")
+    parser.add_argument("--concurrency", type=int, help="override BATCH_CONCURRENCY / GEMINI_MAX_CONCURRENCY")
+    parser.add_argument("--format", choices=["ndjson", "json"], default="ndjson")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.leads, args.latency, args.concurrency, args.format), indent=2))
+
+
+if __name__ == "__main__":
+    main()
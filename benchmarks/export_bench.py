@@ -0,0 +1,112 @@
+"""
+Lead export throughput and memory on a generated leads table.
+
+    python -m benchmarks.export_bench --leads 1000000
+    python -m benchmarks.export_bench --leads 10000000 --format parquet
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lead_export import export_leads
+from leads import migrate_leads
+
+LEADS_SQL = """
+CREATE TABLE leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, caller_cli TEXT, summary TEXT, qualification TEXT,
+    booking TEXT, compliance_flags TEXT, transcript_url TEXT, recording_url TEXT
+)
+"""
+INSERT_CHUNK = 50000
+
+
+def synthetic_leads(count, seed=4):
+    rng = random.Random(seed)
+    suburbs = ["Richmond", "Abbotsford", "Footscray", "Collingwood", "Brunswick"]
+    for i in range(count):
+        budget = rng.randrange(500_000, 2_000_000, 10_000)
+        beds = rng.choice([1, 2, 3])
+        booked = rng.random() < 0.1
+        qualification = json.dumps({
+            "budget_band": str(budget), "beds": beds, "parking": rng.choice([0, 1, 2]), "owner_occ": rng.random() < 0.6,
+            "timeframe": rng.choice(["0-3 months", "3-6 months", "6-12 months"]),
+            "finance_status": rng.choice(["Pre-approved", "Exploring"]), "suburbs": rng.sample(suburbs, 2),
+        })
+        booking = json.dumps({"ok": True, "booking_id": f"RS-{i}", "slot": "2026-03-02T10:00:00+10:00", "mode": "video"}
+                             if booked else {"ok": False})
+        timestamp = f"2026-03-{1 + i % 28:02d}T10:00:00+10:00"
+        yield (timestamp, f"04{i:08d}", f"Buyer {i}, {beds}-bed, budget ${budget}", qualification, booking, "[]",
+               f"/transcripts/{i:024x}", None, f"Buyer {i}", f"buyer{i}@example.com", rng.randrange(1, 10),
+               timestamp, 1)
+
+
+def build(path, leads):
+    db = sqlite3.connect(path)
+    db.execute(LEADS_SQL)
+    migrate_leads(db)
+    rows = synthetic_leads(leads)
+    while True:
+        chunk = [row for _, row in zip(range(INSERT_CHUNK), rows)]
+        if not chunk:
+            break
+        db.executemany("""
+            INSERT INTO leads (timestamp, caller_cli, summary, qualification, booking, compliance_flags, transcript_url,
+                               recording_url, name, email, interest_score, updated_at, call_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, chunk)
+    db.commit()
+    return db
+
+
+def run(leads=1000000, fmt="csv"):
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        db = build(os.path.join(tmp, "leads.db"), leads)
+        build_s = time.perf_counter() - started
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        size = 0
+        with open(os.path.join(tmp, f"leads.{fmt}"), "wb") as out:
+            for data in export_leads(db, fmt):
+                out.write(data)
+                size += len(data)
+        export_s = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        db.close()
+    return {
+        "leads": leads,
+        "format": fmt,
+        "build_s": round(build_s, 1),
+        "export_s": round(export_s, 1),
+        "rows_per_second": round(leads / export_s),
+        "output_mb": round(size / 1e6, 1),
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=1000000)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--output", choices=["table", "json"], default="table")
+    args = parser.parse_args(argv)
+    report = run(args.leads, args.format)
+    if args.output == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"  {key:<16} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Filtered-search latency of the unit inventory on a generated catalogue.
+
+    python -m benchmarks.inventory_bench --units 1000000
+    python -m benchmarks.inventory_bench --units 1000000 --queries 5000 --format json
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import percentile
+from inventory import UnitInventory, demo_units, migrate_units, upsert_units
+from knowledge_pack import KNOWLEDGE_PACK
+
+
+def synthetic_queries(count, seed=3):
+    rng = random.Random(seed)
+    suburbs = [project["suburb"] for project in KNOWLEDGE_PACK["projects"]]
+    for _ in range(count):
+        yield {
+            "max_price": rng.randrange(500_000, 2_000_000, 10_000),
+            "beds": rng.choice([None, 1, 2, 3]),
+            "min_parking": rng.choice([0, 1, 2]),
+            "suburbs": rng.choice([None, rng.sample(suburbs, 1), rng.sample(suburbs, 2)]),
+            "min_floor": rng.choice([None, None, None, 10]),
+        }
+
+
+def run(units=1000000, queries=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = sqlite3.connect(os.path.join(tmp, "units.db"))
+        migrate_units(db)
+        per_project = units // len(KNOWLEDGE_PACK["projects"])
+        started = time.perf_counter()
+        upsert_units(db, demo_units(KNOWLEDGE_PACK, per_project))
+        import_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        inventory = UnitInventory(db)
+        load_s = time.perf_counter() - started
+
+        latencies = []
+        for query in synthetic_queries(queries):
+            started = time.perf_counter()
+            inventory.search(**query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        db.close()
+    return {
+        "units": len(inventory),
+        "groups": len(inventory.groups),
+        "import_s": round(import_s, 1),
+        "load_s": round(load_s, 2),
+        "search_p50_ms": round(percentile(latencies, 0.50), 3),
+        "search_p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    args = parser.parse_args(argv)
+    report = run(args.units, args.queries)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"  {key:<16} {value}")
+
+
+if __name__ == "__main__":
+    main()
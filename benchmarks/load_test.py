@@ -0,0 +1,236 @@
+"""
+Replayable load test for voice_agent.app against local stand-in LLM providers.
+
+    python -m benchmarks.load_test --profile hotpath
+    python -m benchmarks.load_test --profile realistic --requests 300 --concurrency 16
+    python -m benchmarks.load_test --profile hotpath --save-baseline   # record a new baseline
+    python -m benchmarks.load_test --profile hotpath --check           # exit 1 on regression
+
+Baselines are machine-specific: record them on the box that runs --check.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_llm import MockLLMProcess
+from benchmarks.workload import request_mix
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# ---------------------------
+# Profiles
+# ---------------------------
+PROFILES = {
+    # Zero provider latency: measures our own per-request overhead
+    "hotpath": {"requests": 500, "concurrency": 8,
+                "gemini": {"latency": "fixed:0"}, "mistral": {"latency": "fixed:0"}},
+    # Typical provider latency with a trickle of failures
+    "realistic": {"requests": 200, "concurrency": 16,
+                  "gemini": {"latency": "lognormal:40:0.5", "error_rate": 0.02},
+                  "mistral": {"latency": "lognormal:60:0.5", "error_rate": 0.01}},
+    # Gemini region-blocked: every call falls through to Mistral
+    "location_block": {"requests": 200, "concurrency": 8,
+                       "gemini": {"latency": "fixed:2", "location_block_rate": 1.0},
+                       "mistral": {"latency": "lognormal:30:0.4"}},
+    # Campaign burst of identical default submissions: exercises single-flight coalescing
+    "campaign": {"requests": 200, "concurrency": 32, "scenarios": ["campaign"],
+                 "gemini": {"latency": "lognormal:300:0.3"}, "mistral": {"latency": "fixed:0"}},
+    # Traffic spike far beyond provider capacity: exercises admission control / load shedding
+    "spike": {"requests": 1500, "concurrency": 300,
+              "gemini": {"latency": "lognormal:1500:0.3"}, "mistral": {"latency": "lognormal:1500:0.3"}},
+    # Both providers flaky: exercises the static fallback
+    "degraded": {"requests": 200, "concurrency": 8,
+                 "gemini": {"latency": "uniform:5:20", "error_rate": 0.3},
+                 "mistral": {"latency": "uniform:5:20", "error_rate": 0.3}},
+}
+
+# Metrics compared in --check; True means higher is better
+CHECKED_METRICS = {"throughput_rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def configure_backend(mock_url, db_dir):
+    """Point voice_agent at the stand-in server; must run before voice_agent is imported."""
+    os.environ["CI"] = "false"
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ.setdefault("MISTRAL_API_KEY", "bench")
+    os.environ["GEMINI_BASE_URL"] = mock_url
+    os.environ["MISTRAL_SERVER_URL"] = mock_url
+    os.environ["LEADS_DB_PATH"] = os.path.join(db_dir, "bench_leads.db")
+    os.environ["TRANSCRIPT_DIR"] = os.path.join(db_dir, "transcripts")
+    os.environ["RATE_LIMIT_MAX_REQUESTS"] = str(10**9)
+
+
+async def _drive(app, requests, concurrency):
+    import httpx
+
+    latencies = []
+    statuses = Counter()
+    scenarios = Counter()
+    degraded = 0
+    queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal degraded
+            while not queue.empty():
+                scenario, payload = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/call", json=payload)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+                scenarios[scenario] += 1
+                degraded += response.status_code == 200 and response.json().get("degraded", False)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, scenarios, degraded, elapsed
+
+
+def run(profile_name, requests=None, concurrency=None, seed=42, trace_memory=False):
+    profile = PROFILES[profile_name]
+    count = requests or profile["requests"]
+    concurrency = concurrency or profile["concurrency"]
+    server = MockLLMProcess(
+        gemini=dict(profile["gemini"], seed=seed),
+        mistral=dict(profile["mistral"], seed=seed + 1),
+    ).start()
+    with tempfile.TemporaryDirectory() as db_dir:
+        configure_backend(server.url, db_dir)
+        import voice_agent
+
+        workload = list(request_mix(count, seed=seed, scenarios=profile.get("scenarios")))
+        if trace_memory:
+            tracemalloc.start()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        latencies, statuses, scenarios, degraded, elapsed = asyncio.run(_drive(voice_agent.app, workload, concurrency))
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        heap_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    provider_calls = server.stats()
+    server.stop()
+
+    latencies.sort()
+    return {
+        "profile": profile_name,
+        "requests": count,
+        "concurrency": concurrency,
+        "throughput_rps": round(count / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        "heap_peak_mb": round(heap_peak / 2**20, 2) if heap_peak is not None else None,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "degraded": degraded,
+        "scenarios": dict(sorted(scenarios.items())),
+        "provider_calls": provider_calls,
+    }
+
+
+# ---------------------------
+# Baselines
+# ---------------------------
+def load_baselines():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline(report):
+    baselines = load_baselines()
+    baselines[report["profile"]] = {key: report[key] for key in ("requests", "concurrency", *CHECKED_METRICS)}
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_to_baseline(report, tolerance):
+    """Return a list of human-readable regressions (empty if within tolerance)."""
+    baseline = load_baselines().get(report["profile"])
+    if not baseline:
+        return []
+    regressions = []
+    for metric, higher_is_better in CHECKED_METRICS.items():
+        old, new = baseline[metric], report[metric]
+        if higher_is_better and new < old * (1 - tolerance):
+            regressions.append(f"{metric}: {new} < baseline {old} (-{tolerance:.0%} allowed)")
+        if not higher_is_better and new > old * (1 + tolerance):
+            regressions.append(f"{metric}: {new} > baseline {old} (+{tolerance:.0%} allowed)")
+    return regressions
+
+
+def print_report(report):
+    print(f"Profile {report['profile']}: {report['requests']} requests @ concurrency {report['concurrency']}")
+    print(f"  throughput  {report['throughput_rps']} req/s")
+    print(f"  latency     p50 {report['p50_ms']} ms | p95 {report['p95_ms']} ms | "
+          f"p99 {report['p99_ms']} ms | max {report['max_ms']} ms")
+    memory = f"  memory      peak RSS {report['peak_rss_mb']} MB (+{report['rss_growth_mb']} MB during run)"
+    if report["heap_peak_mb"] is not None:
+        memory += f", traced heap peak {report['heap_peak_mb']} MB"
+    print(memory)
+    print(f"  statuses    {report['statuses']} ({report['degraded']} degraded by load shedding)")
+    print(f"  scenarios   {report['scenarios']}")
+    print(f"  providers   {report['provider_calls']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="hotpath")
+    parser.add_argument("--requests", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--trace-memory", action="store_true", help="track Python heap peak (slower)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep backend warning logs (injected errors are noisy)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="fail if worse than the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+
+    report = run(args.profile, args.requests, args.concurrency, args.seed, args.trace_memory)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        save_baseline(report)
+        print(f"Saved baseline for '{args.profile}' to {BASELINE_PATH}")
+    if args.check:
+        regressions = compare_to_baseline(report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
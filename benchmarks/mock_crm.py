@@ -0,0 +1,84 @@
+import gzip
+import json
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.mock_llm import MockProvider
+
+# ---------------------------
+# Stand-in CRM webhook receiver
+# ---------------------------
+# Accepts the gzipped {"events": [...]} batches webhooks.py sends, with the same latency/error
+# injection as the stand-in LLM providers (errors answer 503). Point CRM_WEBHOOK_URLS at .url.
+
+
+class MockCRMServer:
+    def __init__(self, latency="fixed:0", error_rate=0.0, seed=0, host="127.0.0.1", port=0):
+        self.behaviour = MockProvider(latency=latency, error_rate=error_rate, seed=seed)
+        self.events = []
+        self.batches = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server.lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                delay, outcome = server.behaviour.decide()
+                if delay:
+                    time.sleep(delay)
+                if outcome == "error":
+                    self._send(503, {"error": "unavailable"})
+                    return
+                events = json.loads(body)["events"]
+                with server.lock:
+                    server.events.extend(events)
+                    server.batches += 1
+                self._send(200, {"received": len(events)})
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/hooks"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
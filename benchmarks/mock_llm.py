@@ -0,0 +1,213 @@
+import json
+import math
+import multiprocessing
+import random
+import socket
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ---------------------------
+# Stand-in Gemini / Mistral server
+# ---------------------------
+# Speaks just enough of the Gemini REST (`:generateContent`) and Mistral
+# (`/v1/chat/completions`) wire formats for the real SDK clients to parse replies.
+# Point the backend at it with GEMINI_BASE_URL / MISTRAL_SERVER_URL.
+
+MOCK_REPLY = (
+    "Gotcha! With a budget like yours, Riverstone Place in Abbotsford is a great fit — leafy, quiet "
+    "and ten minutes to the CBD. Would you like to book a quick chat with our team this week?"
+)
+
+
+def parse_latency(spec):
+    """
+    Build a latency sampler (seconds) from a spec string:
+    fixed:<ms> | uniform:<min_ms>:<max_ms> | lognormal:<median_ms>:<sigma>
+    """
+    kind, *args = spec.split(":")
+    args = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda rng: args[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(max(args[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, args[1]) / 1000
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class MockProvider:
+    """Behaviour of one stand-in provider: latency, error rate and (Gemini only) location blocking."""
+
+    def __init__(self, latency="fixed:0", error_rate=0.0, location_block_rate=0.0, seed=0):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.location_block_rate = location_block_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def decide(self):
+        with self.lock:
+            delay = self.sample_latency(self.rng)
+            roll = self.rng.random()
+        if roll < self.location_block_rate:
+            return delay, "location_block"
+        if roll < self.location_block_rate + self.error_rate:
+            return delay, "error"
+        return delay, "ok"
+
+
+def _gemini_body(outcome, prompt_chars):
+    if outcome == "location_block":
+        return 400, {"error": {"code": 400, "message": "User location is not supported for the API use.",
+                               "status": "FAILED_PRECONDITION"}}
+    if outcome == "error":
+        return 500, {"error": {"code": 500, "message": "Internal error (injected)", "status": "INTERNAL"}}
+    return 200, {
+        "candidates": [{"content": {"parts": [{"text": MOCK_REPLY}], "role": "model"}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": prompt_chars // 4, "candidatesTokenCount": len(MOCK_REPLY) // 4,
+                          "totalTokenCount": prompt_chars // 4 + len(MOCK_REPLY) // 4},
+    }
+
+
+def _mistral_body(outcome, prompt_chars, model):
+    if outcome != "ok":
+        return 500, {"object": "error", "message": "Internal error (injected)", "type": "internal_error"}
+    return 200, {
+        "id": "mock-chat", "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": MOCK_REPLY}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(MOCK_REPLY) // 4,
+                  "total_tokens": prompt_chars // 4 + len(MOCK_REPLY) // 4},
+    }
+
+
+class MockLLMServer:
+    """Threaded HTTP server hosting both stand-in providers on one local port."""
+
+    def __init__(self, gemini=None, mistral=None, host="127.0.0.1", port=0):
+        self.gemini = gemini or MockProvider()
+        self.mistral = mistral or MockProvider()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                if self.path == "/__stats":
+                    self._send(200, server.stats())
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                prompt_chars = len(json.dumps(payload))
+                if "generateContent" in self.path:
+                    provider = server.gemini
+                    delay, outcome = provider.decide()
+                    status, body = _gemini_body(outcome, prompt_chars)
+                elif self.path.endswith("/chat/completions"):
+                    provider = server.mistral
+                    delay, outcome = provider.decide()
+                    status, body = _mistral_body(outcome, prompt_chars, payload.get("model", ""))
+                else:
+                    self._send(404, {"error": "not found"})
+                    return
+                with provider.lock:
+                    provider.stats[outcome] += 1
+                if delay:
+                    time.sleep(delay)
+                self._send(status, body)
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def stats(self):
+        return {"gemini": dict(self.gemini.stats), "mistral": dict(self.mistral.stats)}
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------------------
+# Out-of-process server
+# ---------------------------
+# Running the stand-in in its own process keeps its request handling off the
+# benchmarked process's GIL, so results reflect the app and not the mock.
+
+def _serve(gemini_kwargs, mistral_kwargs, conn):
+    server = MockLLMServer(gemini=MockProvider(**gemini_kwargs), mistral=MockProvider(**mistral_kwargs))
+    conn.send(server.url)
+    conn.close()
+    server.httpd.serve_forever()
+
+
+class MockLLMProcess:
+    def __init__(self, gemini=None, mistral=None):
+        self.gemini_kwargs = gemini or {}
+        self.mistral_kwargs = mistral or {}
+        self.process = None
+        self.url = None
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        parent, child = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(self.gemini_kwargs, self.mistral_kwargs, child), daemon=True
+        )
+        self.process.start()
+        self.url = parent.recv()
+        return self
+
+    def stats(self):
+        with urllib.request.urlopen(f"{self.url}/__stats", timeout=5) as response:
+            return json.load(response)
+
+    def stop(self):
+        if self.process and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,100 @@
+"""
+Query latency of the BM25 grounding index on a synthetic catalogue.
+
+    python -m benchmarks.retrieval_bench --docs 100000
+    python -m benchmarks.retrieval_bench --docs 100000 --queries 2000 --format json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_test import percentile
+from benchmarks.workload import FOLLOW_UPS
+from retrieval import BM25Index
+
+SUBURBS = ["Abbotsford", "Richmond", "Footscray", "Collingwood", "Brunswick", "Fitzroy", "Carlton", "Southbank",
+           "Docklands", "Hawthorn", "Prahran", "Northcote", "Coburg", "Essendon", "Kensington", "Preston"]
+FEATURES = ["balcony", "city views", "river views", "north facing", "study nook", "ensuite", "walk-in robe",
+            "stone benchtops", "gas cooktop", "storage cage", "EV charging", "rooftop garden", "gym", "pool",
+            "concierge", "pet friendly", "bike storage", "double glazing", "courtyard", "corner apartment"]
+LIFESTYLE = ["cafes", "food scene", "parks", "train station", "trams", "schools", "shopping", "nightlife",
+             "river trails", "markets", "breweries", "street art", "quiet streets", "CBD", "beach"]
+
+
+def synthetic_documents(count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        kind = rng.random()
+        suburb = rng.choice(SUBURBS)
+        if kind < 0.8:
+            beds = rng.choice([1, 1, 2, 2, 2, 3])
+            text = (f"Unit {i} at {suburb} Residences: {beds}-bed, {rng.choice([1, 1, 2])} bath, level {rng.randrange(1, 30)}, "
+                    f"${rng.randrange(450, 1800)},000, {', '.join(rng.sample(FEATURES, 3))}.")
+        elif kind < 0.95:
+            text = f"{suburb} project {i} lifestyle: close to {', '.join(rng.sample(LIFESTYLE, 4))}."
+        else:
+            text = f"FAQ {i}: {rng.choice(FOLLOW_UPS)} Answer about {rng.choice(LIFESTYLE)} and {rng.choice(FEATURES)}."
+        yield f"doc:{i}", text
+
+
+def synthetic_queries(count, seed=11):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield (f"{rng.choice(FOLLOW_UPS)} {rng.choice(SUBURBS)} {rng.choice([1, 2, 3])}-bed "
+               f"{rng.choice(FEATURES)} near {rng.choice(LIFESTYLE)}")
+
+
+def run(docs=100000, queries=1000):
+    started = time.perf_counter()
+    index = BM25Index(synthetic_documents(docs))
+    build_s = time.perf_counter() - started
+
+    latencies = []
+    for query in synthetic_queries(queries):
+        started = time.perf_counter()
+        index.snippets(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    started = time.perf_counter()
+    for i in range(1000):
+        index.add(f"new:{i}", f"Unit new {i} at Fitzroy Residences: 2-bed, balcony, rooftop garden, near trams.")
+    add_us = (time.perf_counter() - started) / 1000 * 1e6
+    delta_queries = sorted(_timed(index.snippets, query) for query in synthetic_queries(200, seed=12))
+    return {
+        "docs": docs,
+        "build_s": round(build_s, 2),
+        "query_p50_ms": round(percentile(latencies, 0.50), 3),
+        "query_p99_ms": round(percentile(latencies, 0.99), 3),
+        "add_us": round(add_us, 1),
+        "query_p99_ms_with_delta": round(percentile(delta_queries, 0.99), 3),
+    }
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    args = parser.parse_args(argv)
+    report = run(args.docs, args.queries)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"  {key:<26} {value}")
+
+
+if __name__ == "__main__":
+    main()
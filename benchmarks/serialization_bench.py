@@ -0,0 +1,110 @@
+"""
+Microbenchmark of the /call serialization path: request parse + validation, response encoding,
+and lead-record encoding, for growing chat histories.
+
+    python -m benchmarks.serialization_bench
+    python -m benchmarks.serialization_bench --turns 0 20 200 1000 --format json
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+os.environ.setdefault("CI", "true")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from benchmarks.workload import DEFAULT_PROFILE, FOLLOW_UPS
+import voice_agent
+from voice_agent import CallRequest, CallResponse, build_lead_data
+from leads import encode_lead
+
+
+class UntypedCallRequest(BaseModel):
+    """CallRequest as it was declared before typed turns and bounds (for comparison)."""
+    name: str
+    phone: str
+    email: str
+    message: str
+    budget: int
+    beds: int
+    parking: int
+    timeframe: str
+    owner_occ: bool
+    finance_status: str
+    preferred_suburbs: list
+    preferred_slot: str = None
+    additional_info: str = ""
+    chat_history: list = []
+
+
+def request_body(turns):
+    history = [{"user": FOLLOW_UPS[i % len(FOLLOW_UPS)], "agent": "Great question! " * 20} for i in range(turns)]
+    return json.dumps(dict(DEFAULT_PROFILE, chat_history=history)).encode()
+
+
+RESULT = {
+    "response": "Gotcha! Riverstone Place in Abbotsford sounds like a great fit — want to book a display suite visit?",
+    "booking": {"ok": True, "booking_id": "RS-20260301-101500", "slot": "2026-03-02T10:00:00+11:00",
+                "mode": "display-suite", "message": "Booked Monday 02 March, 10:00 AM (display-suite)"},
+    "human_handoff": False,
+    "lead_logged": True,
+}
+
+
+def legacy_encode_lead(data):
+    return (json.dumps(data["qualification"]), json.dumps(data["booking"]), json.dumps(data["compliance_flags"]))
+
+
+def per_call_us(func, number):
+    return round(min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6, 2)
+
+
+def run(turn_counts=(0, 20, 200, 1000), number=2000):
+    response_adapter = TypeAdapter(CallResponse)
+    rows = []
+    for turns in turn_counts:
+        body = request_body(turns)
+        call = CallRequest.model_validate(json.loads(body))
+        data = build_lead_data(call, RESULT["booking"], 5, RESULT["response"])
+        rows.append({
+            "turns": turns,
+            "body_kb": round(len(body) / 1024, 1),
+            # FastAPI parses with json.loads, then validates the dict
+            "parse_untyped_us": per_call_us(lambda: UntypedCallRequest.model_validate(json.loads(body)), number),
+            "parse_typed_us": per_call_us(lambda: CallRequest.model_validate(json.loads(body)), number),
+            # No response_model: jsonable_encoder + json.dumps. With it: validate + pydantic-core dump_json
+            "encode_default_us": per_call_us(lambda: JSONResponse(jsonable_encoder(RESULT)).body, number),
+            "encode_response_model_us": per_call_us(
+                lambda: response_adapter.dump_json(response_adapter.validate_python(RESULT), exclude_unset=True),
+                number
+            ),
+            "lead_json_dumps_us": per_call_us(lambda: legacy_encode_lead(data), number),
+            "lead_encode_us": per_call_us(lambda: encode_lead(data), number),
+        })
+    return {"chat_history_max_turns": voice_agent.CHAT_HISTORY_MAX_TURNS, "results": rows}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[0, 20, 200, 1000])
+    parser.add_argument("--number", type=int, default=2000, help="iterations per measurement")
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    args = parser.parse_args(argv)
+    report = run(args.turns, args.number)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+        return
+    columns = list(report["results"][0])
+    print(f"chat history capped at {report['chat_history_max_turns']} turns; times are µs per call")
+    print("  ".join(f"{column:>24}" for column in columns))
+    for row in report["results"]:
+        print("  ".join(f"{row[column]:>24}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Webhook delivery throughput against the stand-in CRM receiver.
+
+    python -m benchmarks.webhook_bench --events 10000
+    python -m benchmarks.webhook_bench --events 2000 --batch-size 1 --latency fixed:20   # unbatched, for comparison
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_crm import MockCRMServer
+from webhooks import WebhookOutbox
+
+LEAD = {"caller_cli": "0412345678", "name": "Bench Buyer", "email": "bench@example.com", "interest_score": 7,
+        "summary": "Bench Buyer, 2-bed, budget $900000, finance Pre-approved",
+        "qualification": {"budget_band": "900000", "beds": 2, "parking": 1, "timeframe": "0-3 months"},
+        "booking": {"ok": True, "booking_id": "RS-20260301-101500", "slot": "2026-03-02T10:00:00+11:00"}}
+
+
+def run(events=10000, batch_size=200, latency="fixed:5", error_rate=0.0):
+    with MockCRMServer(latency=latency, error_rate=error_rate) as crm:
+        outbox = WebhookOutbox(sqlite3.connect(":memory:"), endpoints=[crm.url], batch_size=batch_size,
+                               backoff_seconds=0, export_metrics=False)
+        for lead_id in range(events):
+            outbox.emit("lead.booked", lead_id, LEAD, "2026-03-01T10:00:00+10:00")
+        outbox.db.commit()
+
+        async def deliver():
+            started = time.perf_counter()
+            while outbox.pending():
+                await outbox.flush()
+            elapsed = time.perf_counter() - started
+            await outbox.stop()
+            return elapsed
+
+        elapsed = asyncio.run(deliver())
+        stats = outbox.stats()[crm.url]
+    return {
+        "events": events,
+        "batch_size": batch_size,
+        "elapsed_s": round(elapsed, 2),
+        "events_per_second": round(events / elapsed, 1),
+        "posts": stats["batches"],
+        "connections": crm.connections,
+        "latency_p50_ms": stats["latency_p50_ms"],
+        "received": len({event["id"] for event in crm.events}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--latency", default="fixed:5", help="receiver latency spec (see mock_llm.parse_latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    args = parser.parse_args(argv)
+    report = run(args.events, args.batch_size, args.latency, args.error_rate)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"  {key:<18} {value}")
+
+
+if __name__ == "__main__":
+    main()
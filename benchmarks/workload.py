@@ -0,0 +1,72 @@
+import random
+
+# ---------------------------
+# Replayable CallRequest mixes
+# ---------------------------
+# Weighted request templates roughly matching what the Streamlit client sends.
+# The same seed always yields the same sequence, so runs are comparable.
+
+DEFAULT_PROFILE = {
+    "name": "Alex Tran",
+    "phone": "+61400000001",
+    "email": "alex.tran@example.com",
+    "message": "Hi, I want to know about 2-bed apartments.",
+    "budget": 900000,
+    "beds": 2,
+    "parking": 1,
+    "timeframe": "3-6 months",
+    "owner_occ": True,
+    "finance_status": "Pre-approved",
+    "preferred_suburbs": ["Abbotsford", "Riverstone"],
+    "preferred_slot": "",
+    "additional_info": "",
+    "chat_history": [],
+}
+
+FOLLOW_UPS = [
+    "What are the strata fees like?",
+    "Is there parking included with the 2-bed?",
+    "How close is it to the train?",
+    "When is completion expected?",
+    "Anything cheaper nearby with a good food scene?",
+]
+
+SCENARIOS = {
+    # name: (weight, overrides)
+    "browse": (50, {}),
+    "follow_up": (20, {"message": None, "history_turns": 4}),
+    "hot_booking": (15, {"message": "I'd love to book a visit to the display suite", "timeframe": "0-3 months",
+                         "budget": 1100000}),
+    "handoff": (10, {"message": "Can I speak to someone from the sales team?", "budget": 850000}),
+    "unsubscribe": (5, {"message": "Please stop calling me, unsubscribe"}),
+    # Campaign-link burst: everyone submits the untouched default form (identical prompts)
+    "campaign": (0, {"same_identity": True}),
+}
+
+
+def build_request(scenario, rng, index):
+    _, overrides = SCENARIOS[scenario]
+    payload = dict(DEFAULT_PROFILE)
+    if not overrides.get("same_identity"):
+        payload["phone"] = f"+614{rng.randrange(10**8):08d}"
+        payload["name"] = f"Bench Lead {index}"
+        payload["email"] = f"bench.lead.{index}@example.com"
+    turns = overrides.get("history_turns", 0)
+    payload["chat_history"] = [
+        {"user": rng.choice(FOLLOW_UPS), "agent": "Great question! " * 8} for _ in range(turns)
+    ]
+    for key, value in overrides.items():
+        if key in ("history_turns", "same_identity"):
+            continue
+        payload[key] = rng.choice(FOLLOW_UPS) if value is None else value
+    return payload
+
+
+def request_mix(count, seed=42, scenarios=None):
+    """Yield (scenario, payload) pairs drawn from the weighted scenario mix."""
+    rng = random.Random(seed)
+    names = scenarios or [name for name, (weight, _) in SCENARIOS.items() if weight]
+    weights = [SCENARIOS[name][0] or 1 for name in names]
+    for index in range(count):
+        scenario = rng.choices(names, weights)[0]
+        yield scenario, build_request(scenario, rng, index)
@@ -0,0 +1,319 @@
+"""
+Offline evaluation of prompt/model variants on a corpus of conversations.
+
+    python -m evaluation                                  # built-in corpus, one variant per routing tier
+    python -m evaluation --from-db leads.db --limit 200   # replay recorded transcripts
+    python -m evaluation --variants variants.json --corpus calls.jsonl --format json
+
+variants.json is a list of {"name", "tier", plus optional "gemini_model", "mistral_model",
+"temperature", "max_output_tokens", "thinking_budget", "template" (path to a str.format prompt
+template with build_prompt's fields) and "instruction"}. calls.jsonl holds one CallRequest per line.
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+# voice_agent opens leads.db, the transcript directory and the unit inventory as it is imported. Unless
+# something has already imported it, point it at a throwaway directory holding only the seeded demo
+# inventory: the harness never writes to the live database or the working directory, and prompts (so
+# cache keys) are the same on every machine. --from-db reads the given database read-only.
+LIVE_TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+if "voice_agent" not in sys.modules:
+    _sandbox = tempfile.mkdtemp(prefix="riverstone-eval-")
+    atexit.register(shutil.rmtree, _sandbox, ignore_errors=True)
+    os.environ.update(LEADS_DB_PATH=os.path.join(_sandbox, "leads.db"),
+                      TRANSCRIPT_DIR=os.path.join(_sandbox, "transcripts"), INVENTORY_SEED_DEMO="1")
+
+import voice_agent
+from voice_agent import PROMPT_TEMPLATE, STATIC_FALLBACK_REPLY, CallRequest, build_prompt, prompt_fingerprint
+from google.genai import types as genai_types
+from inventory import parse_price
+from knowledge_pack import KNOWLEDGE_PACK
+from routing import MODEL_TIERS, route_for
+from transcripts import TranscriptStore
+
+# ---------------------------
+# Evaluation
+# ---------------------------
+# Every (variant, case) pair builds its prompt with the live build_prompt and goes through the live
+# provider chain (_call_providers), under one asyncio pool of EVAL_CONCURRENCY calls: the work is
+# waiting on providers, so more processes would add nothing. Successful replies are cached on disk
+# under the prompt fingerprint (prompt + model parameters), so a rerun only pays for variants or
+# cases that changed; cached replies keep their recorded latency and cost. Replies are scored by
+# local heuristics, each pass/fail, and quality is their mean.
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", 8))
+EVAL_CACHE_DIR = os.getenv("EVAL_CACHE_DIR", ".eval_cache")
+MAX_REPLY_SENTENCES = 4
+MAX_REPLY_WORDS = 90
+HEURISTICS = ("length", "ends_with_question", "right_project", "no_markdown")
+
+BUILTIN_CORPUS = [
+    {"message": "I want a 2 bedroom apartment near the city with good transport", "budget": 950000, "beds": 2,
+     "preferred_suburbs": ["Abbotsford", "Richmond"], "additional_info": "I work in the CBD"},
+    {"message": "Looking for something affordable with a good food scene", "budget": 650000, "beds": 1,
+     "finance_status": "In-progress"},
+    {"message": "Hi, can you tell me about Riverstone Place?", "budget": 800000, "beds": 1,
+     "preferred_suburbs": ["Abbotsford"], "timeframe": "0-3 months"},
+    {"message": "We need three bedrooms and two car spaces", "budget": 1600000, "beds": 3, "parking": 2},
+    {"message": "What's the best value 2-bed you have?", "budget": 820000, "beds": 2, "owner_occ": False},
+    {"message": "Is parking included?", "budget": 1100000, "beds": 2, "preferred_suburbs": ["Richmond"],
+     "chat_history": [{"user": "Tell me about Harbourview Towers",
+                       "agent": "Harbourview Towers in Richmond has 2-beds from $1.05m. Want the floor plans?"}]},
+]
+BUILTIN_DEFAULTS = {
+    "name": "Eval Buyer", "phone": "+61400000000", "email": "eval@example.com", "parking": 1,
+    "timeframe": "3-6 months", "owner_occ": True, "finance_status": "Pre-approved", "preferred_suburbs": [],
+}
+MARKDOWN_PATTERN = re.compile(r"\*\*|__|`|^\s*#|^\s*[-*•]\s|\[[^\]]+\]\([^)]+\)", re.MULTILINE)
+SENTENCE_END = re.compile(r"[.!?]+(?:\s|$)")
+
+
+# ---------------------------
+# Corpus
+# ---------------------------
+def builtin_corpus():
+    return [(f"builtin-{i}", CallRequest(**dict(BUILTIN_DEFAULTS, **case))) for i, case in enumerate(BUILTIN_CORPUS)]
+
+
+def load_corpus(path):
+    """(case id, CallRequest) per JSONL line; an "id" field names the case."""
+    cases = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if line.strip():
+                record = json.loads(line)
+                cases.append((str(record.pop("id", f"line-{line_no}")), CallRequest(**dict(BUILTIN_DEFAULTS, **record))))
+    return cases
+
+
+def corpus_from_leads(db, store, limit=100):
+    """
+    Replay recorded conversations: every turn of each lead's transcript becomes a case, with the
+    lead's qualification and the turns before it as chat history. Newest leads first.
+    """
+    cases = []
+    for lead_id, name, phone, email, qualification, transcript_id in db.execute(
+        "SELECT id, name, caller_cli, email, qualification, transcript_id FROM leads "
+        "WHERE transcript_id IS NOT NULL ORDER BY id DESC"
+    ):
+        q = json.loads(qualification or "{}")
+        profile = dict(BUILTIN_DEFAULTS, name=name or "Buyer", phone=phone or "", email=email or "")
+        for field in ("beds", "parking", "timeframe", "owner_occ", "finance_status"):
+            if q.get(field) not in (None, ""):
+                profile[field] = q[field]
+        profile["budget"] = int(q.get("budget_band") or 0)
+        profile["preferred_suburbs"] = q.get("suburbs") or []
+        history = []
+        for index, turn in enumerate(store.turns(transcript_id)):
+            cases.append((f"lead-{lead_id}-{index}", CallRequest(**profile, message=turn["user"], chat_history=list(history))))
+            history.append({"user": turn["user"], "agent": turn["agent"]})
+            if len(cases) >= limit:
+                return cases
+    return cases
+
+
+# ---------------------------
+# Heuristics
+# ---------------------------
+def affordable_projects(budget, beds):
+    """Projects whose "from" price for this many bedrooms (capped at 3) fits the budget."""
+    key = f"price_{min(max(beds, 1), 3)}bed"
+    return {
+        project["name"] for project in KNOWLEDGE_PACK["projects"]
+        if (parse_price(project.get(key)) or float("inf")) <= budget
+    }
+
+
+def mentioned_projects(reply):
+    text = reply.lower()
+    return {
+        project["name"] for project in KNOWLEDGE_PACK["projects"]
+        if project["name"].lower() in text or project["suburb"].lower() in text
+    }
+
+
+def score_reply(call: CallRequest, reply: str) -> dict:
+    """Pass/fail per heuristic in HEURISTICS."""
+    sentences = len(SENTENCE_END.findall(reply.strip())) or 1
+    mentioned = mentioned_projects(reply)
+    affordable = affordable_projects(call.budget, call.beds)
+    # Never pitch a project they can't afford; an opening reply should pitch one they can
+    right_project = mentioned <= affordable and bool(mentioned or call.chat_history or not affordable)
+    return {
+        "length": sentences <= MAX_REPLY_SENTENCES and len(reply.split()) <= MAX_REPLY_WORDS,
+        "ends_with_question": reply.rstrip().endswith("?"),
+        "right_project": right_project,
+        "no_markdown": not MARKDOWN_PATTERN.search(reply),
+    }
+
+
+# ---------------------------
+# Variants and runs
+# ---------------------------
+def load_variants(path=None):
+    if path is None:
+        return [{"name": tier, "tier": tier} for tier in MODEL_TIERS]
+    with open(path) as f:
+        variants = json.load(f)
+    for variant in variants:
+        if variant.get("template"):
+            with open(variant["template"]) as template:
+                variant["template_text"] = template.read()
+    return variants
+
+
+def variant_route(variant):
+    route = route_for(variant.get("tier", "standard"))
+    route.update({key: variant[key] for key in ("gemini_model", "mistral_model", "temperature",
+                                                 "max_output_tokens", "thinking_budget") if key in variant})
+    return route
+
+
+class ResponseCache:
+    """One JSON file per prompt fingerprint under directory (two-level fan-out)."""
+
+    def __init__(self, directory=EVAL_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+
+async def call_providers(prompt, route):
+    """The live Gemini → Mistral → static chain with this route's models and limits."""
+    config = genai_types.GenerateContentConfig(
+        temperature=route["temperature"],
+        max_output_tokens=route["max_output_tokens"] + route["thinking_budget"],
+        thinking_config=genai_types.ThinkingConfig(thinking_budget=route["thinking_budget"])
+    )
+    return await voice_agent._call_providers(
+        prompt, route["gemini_model"], route["mistral_model"], route["temperature"], route["max_output_tokens"], config
+    )
+
+
+async def evaluate_case(variant, case_id, call, cache, complete=call_providers):
+    route = variant_route(variant)
+    prompt = build_prompt(call, variant.get("instruction"), variant.get("template_text") or PROMPT_TEMPLATE)
+    key = prompt_fingerprint(prompt, route["gemini_model"], route["mistral_model"], route["temperature"],
+                             route["max_output_tokens"], route["thinking_budget"])
+    entry = cache.get(key)
+    cached = entry is not None
+    if not cached:
+        reply, usage = await complete(prompt, route)
+        entry = {"reply": reply, "usage": usage}
+        if reply != STATIC_FALLBACK_REPLY:  # failures are retried on the next run
+            cache.put(key, entry)
+    usage = entry["usage"]
+    served = next((u for u in usage if u["ok"]), None)
+    return {
+        "variant": variant["name"],
+        "case": case_id,
+        "reply": entry["reply"],
+        "provider": served["provider"] if served else "static",
+        "latency_ms": round(sum(u["latency_ms"] for u in usage), 1) if usage else None,
+        "cost_usd": sum(u["cost_usd"] for u in usage),
+        "cached": cached,
+        "scores": score_reply(call, entry["reply"]),
+    }
+
+
+async def run_evaluation(variants, cases, concurrency=EVAL_CONCURRENCY, cache=None, complete=call_providers):
+    """Per-case results for every variant x case, concurrency provider calls at a time."""
+    cache = cache or ResponseCache()
+    pool = asyncio.Semaphore(concurrency)
+
+    async def one(variant, case_id, call):
+        async with pool:
+            return await evaluate_case(variant, case_id, call, cache, complete)
+
+    return await asyncio.gather(*(one(variant, case_id, call) for variant in variants for case_id, call in cases))
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+def summarize(results):
+    """Quality (heuristic pass rates) against latency and cost, one row per variant."""
+    by_variant = {}
+    for result in results:
+        by_variant.setdefault(result["variant"], []).append(result)
+    report = []
+    for name, rows in by_variant.items():
+        latencies = sorted(row["latency_ms"] for row in rows if row["latency_ms"] is not None)
+        rates = {h: round(sum(row["scores"][h] for row in rows) / len(rows), 3) for h in HEURISTICS}
+        report.append({
+            "variant": name,
+            "cases": len(rows),
+            "quality": round(sum(rates.values()) / len(rates), 3),
+            **rates,
+            "latency_p50_ms": _percentile(latencies, 0.5),
+            "latency_p95_ms": _percentile(latencies, 0.95),
+            "cost_usd": round(sum(row["cost_usd"] for row in rows), 6),
+            "fallbacks": sum(row["provider"] != "gemini" for row in rows),
+            "cached": sum(row["cached"] for row in rows),
+        })
+    return sorted(report, key=lambda row: -row["quality"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", help="JSON list of variants (default: one per routing tier)")
+    parser.add_argument("--corpus", help="JSONL of CallRequests (default: built-in cases)")
+    parser.add_argument("--from-db", help="replay recorded transcripts from this leads.db instead")
+    parser.add_argument("--transcript-dir", default=LIVE_TRANSCRIPT_DIR, help="segment directory for --from-db")
+    parser.add_argument("--limit", type=int, default=100, help="max cases taken from --from-db")
+    parser.add_argument("--concurrency", type=int, default=EVAL_CONCURRENCY)
+    parser.add_argument("--cache-dir", default=EVAL_CACHE_DIR)
+    parser.add_argument("--out", help="also write per-case results (with replies) to this JSONL file")
+    parser.add_argument("--format", choices=["table", "json"], default="table")
+    args = parser.parse_args(argv)
+
+    if args.from_db:
+        db = sqlite3.connect(f"file:{args.from_db}?mode=ro", uri=True)
+        cases = corpus_from_leads(db, TranscriptStore(db, args.transcript_dir), args.limit)
+    else:
+        cases = load_corpus(args.corpus) if args.corpus else builtin_corpus()
+    variants = load_variants(args.variants)
+    started = time.perf_counter()
+    results = asyncio.run(run_evaluation(variants, cases, args.concurrency, ResponseCache(args.cache_dir)))
+    if args.out:
+        with open(args.out, "w") as f:
+            f.writelines(json.dumps(result) + "\n" for result in results)
+    report = summarize(results)
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{len(cases)} cases x {len(variants)} variants in {time.perf_counter() - started:.1f}s")
+    columns = ["variant", "quality", *HEURISTICS, "latency_p50_ms", "latency_p95_ms", "cost_usd", "fallbacks", "cached"]
+    widths = [max(len(column), 8) for column in columns]
+    print("  ".join(f"{column:>{width}}" for column, width in zip(columns, widths)))
+    for row in report:
+        print("  ".join(f"{str(row[column]):>{width}}" for column, width in zip(columns, widths)))
+
+
+if __name__ == "__main__":
+    main()
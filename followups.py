@@ -0,0 +1,302 @@
+"""
+Outbound follow-up campaigns for warm leads.
+
+    python -m followups --campaign spring-open-day --min-score 3 --timeframe "0-3 months" --timeframe "3-6 months"
+    python -m followups --campaign spring-open-day --wait   # sleep through closed hours instead of stopping
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pydantic import ValidationError
+
+import voice_agent
+from leads import ensure_columns
+from voice_agent import MAX_INTEREST_SCORE, MELBOURNE_TZ, CallRequest, generate_agent_response, insert_usage
+from metrics import Counter
+from routing import route_for
+
+# ---------------------------
+# Follow-up campaigns
+# ---------------------------
+# Matching leads (interest_score / timeframe index; lead ids past the campaign cursor, or older leads
+# updated since the last claim, e.g. a repeat call that raised the score) are claimed into the
+# followups table together with the new cursor in one commit, then drained page by page
+# by a worker pool that writes a personalised message through generate_agent_response. Claimed rows
+# stay "pending" until their message is stored, so a restarted campaign picks up where it stopped
+# and a re-run later only claims leads that arrived since. Leads whose stored details no longer make
+# a valid CallRequest are marked "skipped". LLM usage is collected per page and written to llm_usage
+# (client "followup:<campaign>") in the page's status transaction, so no write lock is held while the
+# LLM calls run. Messages are stored for the dialler/SMS sender; this module
+# does not contact anyone itself.
+FOLLOWUP_CONCURRENCY = int(os.getenv("FOLLOWUP_CONCURRENCY", 8))
+FOLLOWUP_PAGE_SIZE = int(os.getenv("FOLLOWUP_PAGE_SIZE", 200))
+FOLLOWUP_MIN_AGE_DAYS = int(os.getenv("FOLLOWUP_MIN_AGE_DAYS", 2))
+FOLLOWUP_TIER = os.getenv("FOLLOWUP_TIER", "standard")
+
+# Weekday (Mon=0) -> (open hour, close hour), Melbourne time; no outbound contact on Sundays
+BUSINESS_HOURS = {0: (9, 20), 1: (9, 20), 2: (9, 20), 3: (9, 20), 4: (9, 20), 5: (9, 17)}
+
+FOLLOWUP_INSTRUCTION = (
+    "This is an OUTBOUND follow-up: {name} enquired on {enquired} and has not said anything new. "
+    "Reintroduce yourself briefly, mention the project that best fits what they were after, "
+    "and invite them to book a display-suite visit or a quick call."
+)
+FOLLOWUP_MESSAGE = "(outbound follow-up — no new message from the lead)"
+
+FOLLOWUPS = Counter(
+    "riverstone_followups_total",
+    "Follow-up outcomes by campaign: generated, suppressed (do-not-call), skipped (invalid lead), failed",
+    label_names=("campaign", "outcome"),
+)
+
+
+def ensure_schema(db):
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS followup_campaigns (
+        name TEXT PRIMARY KEY,
+        last_lead_id INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT
+    )
+    """)
+    ensure_columns(db, "followup_campaigns", {"claimed_at": "TEXT"})
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS followups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        campaign TEXT NOT NULL,
+        lead_id INTEGER NOT NULL,
+        caller_cli TEXT NOT NULL,
+        status TEXT NOT NULL,
+        message TEXT,
+        created_at TEXT,
+        updated_at TEXT,
+        UNIQUE (campaign, caller_cli)
+    )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_followups_status ON followups (campaign, status)")
+    db.commit()
+
+
+def within_business_hours(now):
+    hours = BUSINESS_HOURS.get(now.weekday())
+    return hours is not None and hours[0] <= now.hour < hours[1]
+
+
+def next_business_open(now):
+    """Start of the next contact window at or after now (Melbourne time)."""
+    for day_offset in range(8):
+        day = now + timedelta(days=day_offset)
+        hours = BUSINESS_HOURS.get(day.weekday())
+        if hours is None:
+            continue
+        opens = MELBOURNE_TZ.localize(datetime(day.year, day.month, day.day, hours[0]))
+        closes = opens.replace(hour=hours[1])
+        if now < closes:
+            return max(now, opens)
+    raise ValueError("BUSINESS_HOURS has no open days")
+
+
+def call_from_lead(caller_cli, name, email, qualification):
+    """Rebuild a CallRequest from a stored lead so the normal prompt can be reused."""
+    q = json.loads(qualification or "{}")
+    try:
+        budget = int(float(q.get("budget_band") or 0))
+    except ValueError:
+        budget = 0
+    return CallRequest(
+        name=name or "there",
+        phone=caller_cli,
+        email=email or "",
+        message=FOLLOWUP_MESSAGE,
+        budget=budget,
+        beds=q.get("beds") or 0,
+        parking=q.get("parking") or 0,
+        timeframe=q.get("timeframe") or "",
+        owner_occ=bool(q.get("owner_occ")),
+        finance_status=q.get("finance_status") or "",
+        preferred_suburbs=q.get("suburbs") or [],
+    )
+
+
+class FollowupScheduler:
+    def __init__(self, campaign, min_score=3, timeframes=None, min_age_days=FOLLOWUP_MIN_AGE_DAYS,
+                 concurrency=FOLLOWUP_CONCURRENCY, page_size=FOLLOWUP_PAGE_SIZE, tier=FOLLOWUP_TIER,
+                 do_not_call=None, db=None, clock=None):
+        """do_not_call(phone, email) -> bool suppresses a lead; clock() returns the current Melbourne time."""
+        self.campaign = campaign
+        self.client_id = f"followup:{campaign}"
+        self._usage = []  # (lead_id, timestamp, usage records) for the page in progress
+        self.min_score = min_score
+        self.timeframes = list(timeframes or [])
+        self.min_age_days = min_age_days
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.route = route_for(tier)
+        self.do_not_call = do_not_call or voice_agent.suppression_list.is_suppressed
+        self.db = db or voice_agent.conn
+        self.clock = clock or (lambda: datetime.now(MELBOURNE_TZ))
+        ensure_schema(self.db)
+        self.db.execute("INSERT OR IGNORE INTO followup_campaigns (name, last_lead_id) VALUES (?, 0)", (campaign,))
+        self.db.commit()
+
+    def cursor_position(self):
+        return self.db.execute(
+            "SELECT last_lead_id FROM followup_campaigns WHERE name = ?", (self.campaign,)
+        ).fetchone()[0]
+
+    def select_leads(self, after_id, updated_since=None):
+        """Matching leads past after_id, or updated after updated_since: (id, caller_cli) in id order."""
+        cutoff = (datetime.now(voice_agent.LEAD_TZ) - timedelta(days=self.min_age_days)).isoformat()
+        # Closed score range so SQLite searches idx_leads_score_timeframe instead of walking every rowid
+        sql = ("SELECT id, caller_cli FROM leads WHERE interest_score BETWEEN ? AND ? "
+               "AND (id > ? OR updated_at > ?) AND timestamp <= ?")
+        params = [self.min_score, MAX_INTEREST_SCORE, after_id, updated_since or "9999", cutoff]  # "9999": no updates
+        if self.timeframes:
+            sql += f" AND timeframe IN ({','.join('?' * len(self.timeframes))})"
+            params += self.timeframes
+        # Sorted here rather than with ORDER BY id, which tips the planner back to a rowid scan
+        return sorted(self.db.execute(sql, params).fetchall())
+
+    def claim_new_leads(self):
+        """Claim matching leads as pending and advance the cursor (one commit). Returns leads matched."""
+        last_lead_id, claimed_at = self.db.execute(
+            "SELECT last_lead_id, claimed_at FROM followup_campaigns WHERE name = ?", (self.campaign,)
+        ).fetchone()
+        checked_at = datetime.now(voice_agent.LEAD_TZ).isoformat()  # same clock and format as leads.updated_at
+        rows = self.select_leads(last_lead_id, claimed_at)
+        self.db.execute("UPDATE followup_campaigns SET claimed_at = ? WHERE name = ?", (checked_at, self.campaign))
+        if not rows:
+            self.db.commit()
+            return 0
+        now = self.clock().isoformat()
+        # One follow-up per number per campaign: repeat leads from the same caller are ignored
+        self.db.executemany(
+            "INSERT OR IGNORE INTO followups (campaign, lead_id, caller_cli, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'pending', ?, ?)",
+            [(self.campaign, lead_id, caller_cli, now, now) for lead_id, caller_cli in rows if caller_cli]
+        )
+        self.db.execute(
+            "UPDATE followup_campaigns SET last_lead_id = ?, updated_at = ? WHERE name = ?",
+            (max(last_lead_id, rows[-1][0]), now, self.campaign)
+        )
+        self.db.commit()
+        return len(rows)
+
+    def pending(self, limit):
+        return self.db.execute("""
+            SELECT f.id, f.lead_id, f.caller_cli, l.name, l.email, l.qualification, l.timestamp
+            FROM followups f JOIN leads l ON l.id = f.lead_id
+            WHERE f.campaign = ? AND f.status = 'pending'
+            ORDER BY f.id LIMIT ?
+        """, (self.campaign, limit)).fetchall()
+
+    async def _follow_up(self, row):
+        """(followup_id, status, message) for one claimed row; LLM usage is recorded even when it fails."""
+        followup_id, lead_id, caller_cli, name, email, qualification, enquired = row
+        if self.do_not_call(caller_cli, email):
+            return followup_id, "suppressed", None
+        usage = []
+        try:
+            call = call_from_lead(caller_cli, name, email, qualification)
+        except (ValidationError, ValueError) as e:
+            logging.warning(f"Follow-up {followup_id} skipped, lead {lead_id} is not a valid call: {e}")
+            return followup_id, "skipped", None
+        instruction = FOLLOWUP_INSTRUCTION.format(name=call.name, enquired=(enquired or "")[:10])
+        try:
+            message = await generate_agent_response(call, usage, route=self.route, instruction=instruction)
+        except Exception as e:
+            logging.warning(f"Follow-up {followup_id} failed: {type(e).__name__} - {e}")
+            return followup_id, "failed", None
+        finally:
+            self._record_usage(lead_id, usage)
+        return followup_id, "generated", message
+
+    def _record_usage(self, lead_id, usage):
+        # Held in memory until _process writes the page: an insert here would hold the write lock across
+        # the rest of the page's LLM calls
+        if usage:
+            self._usage.append((lead_id, self.clock().isoformat(), usage))
+
+    async def _process(self, rows):
+        work_queue = asyncio.Queue()
+        for row in rows:
+            work_queue.put_nowait(row)
+        results = []
+
+        async def worker():
+            while not work_queue.empty():
+                results.append(await self._follow_up(work_queue.get_nowait()))
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(rows)))))
+        now = self.clock().isoformat()
+        usage, self._usage = self._usage, []
+        try:
+            # Failed rows stay pending and are retried on the next run
+            self.db.executemany(
+                "UPDATE followups SET status = ?, message = ?, updated_at = ? WHERE id = ?",
+                [(status, message, now, followup_id) for followup_id, status, message in results if status != "failed"]
+            )
+            for lead_id, timestamp, records in usage:
+                insert_usage(self.db, lead_id, timestamp, self.client_id, records)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        for _, status, _ in results:
+            FOLLOWUPS.inc(self.campaign, status)
+        return results
+
+    async def run(self, limit=None, wait_for_hours=False):
+        """
+        Generate follow-ups until the campaign is exhausted, `limit` leads are processed, or
+        business hours end (unless wait_for_hours, which sleeps until the next window).
+        """
+        counts = {"generated": 0, "suppressed": 0, "skipped": 0, "failed": 0}
+        retried = set()
+        claimed = False
+        while limit is None or sum(counts.values()) < limit:
+            now = self.clock()
+            if not within_business_hours(now):
+                if not wait_for_hours:
+                    logging.info(f"Campaign {self.campaign}: outside business hours, stopping")
+                    break
+                await asyncio.sleep((next_business_open(now) - now).total_seconds())
+                continue
+            batch_size = self.page_size if limit is None else min(self.page_size, limit - sum(counts.values()))
+            # Rows claimed by an earlier (interrupted) run go first; failures are retried once per run
+            rows = [row for row in self.pending(batch_size + len(retried)) if row[0] not in retried][:batch_size]
+            if not rows:
+                if claimed or not self.claim_new_leads():
+                    break
+                claimed = True
+                continue
+            for followup_id, status, _ in await self._process(rows):
+                counts[status] += 1
+                if status == "failed":
+                    retried.add(followup_id)
+        return {"campaign": self.campaign, "last_lead_id": self.cursor_position(), **counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campaign", required=True, help="campaign name; re-running the same name resumes it")
+    parser.add_argument("--min-score", type=int, default=3)
+    parser.add_argument("--timeframe", action="append", help="only leads with this timeframe (repeatable)")
+    parser.add_argument("--min-age-days", type=int, default=FOLLOWUP_MIN_AGE_DAYS)
+    parser.add_argument("--concurrency", type=int, default=FOLLOWUP_CONCURRENCY)
+    parser.add_argument("--tier", default=FOLLOWUP_TIER, help="model tier from routing.MODEL_TIERS")
+    parser.add_argument("--limit", type=int, help="stop after this many leads")
+    parser.add_argument("--wait", action="store_true", help="sleep through closed hours instead of stopping")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    scheduler = FollowupScheduler(
+        args.campaign, min_score=args.min_score, timeframes=args.timeframe, min_age_days=args.min_age_days,
+        concurrency=args.concurrency, tier=args.tier
+    )
+    print(json.dumps(asyncio.run(scheduler.run(limit=args.limit, wait_for_hours=args.wait)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from metrics import Counter, Gauge
+
+# ---------------------------
+# Idempotency keys
+# ---------------------------
+# Results of /call are remembered per Idempotency-Key for a bounded time so a client
+# retry returns the original reply instead of re-running scoring, booking, the LLM
+# and log_lead. A retry that arrives while the first attempt is still running waits
+# for it. Failed attempts are forgotten so they can be retried for real.
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 3600))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", 10000))
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "riverstone_idempotency_total",
+    "Idempotency-Key outcomes: new, replayed (completed result), attached (joined in-flight), conflict",
+    label_names=("result",),
+)
+
+
+class IdempotencyConflict(Exception):
+    """Key reused with a different request body."""
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds=IDEMPOTENCY_TTL_SECONDS, max_entries=IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (fingerprint, task, created); insertion order == age
+        Gauge("riverstone_idempotency_entries", "Idempotency keys currently stored", callback=lambda: len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, now):
+        # Same TTL for every entry, so the oldest (and first to expire) are at the front
+        while self._entries:
+            key, (_, task, created) = next(iter(self._entries.items()))
+            expired = now - created > self.ttl_seconds
+            if not expired and len(self._entries) <= self.max_entries:
+                break
+            if not task.done() and not expired:
+                break  # never drop an in-flight attempt to make room
+            self._entries.popitem(last=False)
+
+    async def run(self, key, fingerprint, factory):
+        """
+        Return (result, replayed). factory() runs at most once per live key; concurrent
+        and later callers with the same key get the same result.
+        """
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_fingerprint, task, _ = entry
+            if stored_fingerprint != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc("conflict")
+                raise IdempotencyConflict(key)
+            IDEMPOTENCY_REQUESTS.inc("replayed" if task.done() else "attached")
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(factory())
+        self._entries[key] = (fingerprint, task, now)
+        task.add_done_callback(lambda done, key=key: self._on_done(key, done))
+        IDEMPOTENCY_REQUESTS.inc("new")
+        self._evict(now)
+        return await asyncio.shield(task), False
+
+    def forget(self, key):
+        """Drop a completed key so the next request with it runs again (e.g. a degraded reply)."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1].done():
+            del self._entries[key]
+
+    def _on_done(self, key, task):
+        if task.cancelled() or task.exception() is not None:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is task:
+                del self._entries[key]
@@ -0,0 +1,417 @@
+"""
+Unit-level apartment inventory (per-unit price, beds, parking, floor, status).
+
+    python -m inventory import units.csv      # project,unit,floor,beds,baths,parking,price[,status]
+    python -m inventory seed --per-project 250000
+    python -m inventory search --beds 2 --max-price 900000 --min-parking 1
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from heapq import merge
+from itertools import islice
+from knowledge_pack import KNOWLEDGE_PACK
+from metrics import Histogram
+
+# ---------------------------
+# Unit inventory
+# ---------------------------
+# The units table is the source of truth; UnitInventory mirrors it in flat array columns (a few
+# bytes per unit) plus one price-sorted row list per (status, project, beds, parking) group. A
+# search picks the groups its equality predicates allow, bisects each to the price range and merges
+# them cheapest-first, so only the rows it returns are touched and the total is a sum of bisects.
+# min_floor is the one residual filter (checked while merging; total is then not computed).
+# Status changes must go through set_status() to keep the mirror in step. Writes from other
+# connections (`python -m inventory import` against the server's leads.db) are picked up by refresh():
+# a PRAGMA data_version check per search and, only if units.updated_at has moved, a rebuild on a
+# background thread with its own connection. Searches keep using the current columns until the new
+# ones are swapped in under the lock. Imports commit every UPSERT_BATCH_ROWS rows, so the write lock
+# is never held for longer than one batch.
+UNIT_STATUSES = ("available", "reserved", "sold")
+INVENTORY_DEMO_UNITS = int(os.getenv("INVENTORY_DEMO_UNITS", 120))  # per project, for `seed`
+UPSERT_BATCH_ROWS = 10000
+INVENTORY_SEED_DEMO = os.getenv("INVENTORY_SEED_DEMO", "0") == "1"  # seed an empty table at server start (demos only)
+UNITS_SEARCH_MAX_LIMIT = 100
+UNITS_PER_FLOOR = 8
+
+INVENTORY_SEARCH_LATENCY = Histogram("riverstone_inventory_search_seconds", "Unit inventory search latency")
+
+PRICE_PATTERN = re.compile(r"\$([\d,.]+)\s*(m|k)?", re.IGNORECASE)
+CARS_PATTERN = re.compile(r"(\d+)\s*cars?\s+included")
+
+
+def parse_price(text):
+    """Dollars from a knowledge-pack price string ("from $845,000 (1 car included)", "from $1.05m")."""
+    match = PRICE_PATTERN.search(text or "")
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    scale = {"m": 1_000_000, "k": 1_000}.get((match.group(2) or "").lower(), 1)
+    return int(value * scale)
+
+
+def migrate_units(db):
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS units (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project TEXT NOT NULL,
+        unit TEXT NOT NULL,
+        floor INTEGER NOT NULL,
+        beds INTEGER NOT NULL,
+        baths INTEGER NOT NULL,
+        parking INTEGER NOT NULL,
+        price INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'available',
+        updated_at TEXT,
+        UNIQUE (project, unit)
+    )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_units_updated_at ON units (updated_at)")
+    db.commit()
+
+
+UPSERT_UNIT_SQL = """
+    INSERT INTO units (project, unit, floor, beds, baths, parking, price, status, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (project, unit) DO UPDATE SET floor = excluded.floor, beds = excluded.beds,
+        baths = excluded.baths, parking = excluded.parking, price = excluded.price,
+        status = excluded.status, updated_at = excluded.updated_at
+"""
+
+
+def upsert_units(db, units):
+    """
+    Insert or update (project, unit, floor, beds, baths, parking, price, status) tuples, committing every
+    UPSERT_BATCH_ROWS. An import that fails part-way keeps the batches before it; re-running it is safe.
+    """
+    updated_at = datetime.now(timezone.utc).isoformat()
+    count = 0
+    try:
+        batch = []
+        for unit in units:
+            if unit[7] not in UNIT_STATUSES:
+                raise ValueError(f"Unknown unit status {unit[7]!r}")
+            batch.append((*unit, updated_at))
+            if len(batch) >= UPSERT_BATCH_ROWS:
+                db.executemany(UPSERT_UNIT_SQL, batch)
+                db.commit()
+                count += len(batch)
+                batch = []
+        db.executemany(UPSERT_UNIT_SQL, batch)
+        count += len(batch)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return count
+
+
+def demo_units(pack, per_project, seed=42):
+    """Plausible units per project, priced up from the pack's "from" prices (floor premium, extra car)."""
+    rng = random.Random(seed)
+    bed_mix = (1, 1, 2, 2, 2, 2, 3, 3)
+    for project in pack["projects"]:
+        base = {beds: parse_price(project[f"price_{beds}bed"]) for beds in (1, 2, 3)}
+        cars = {1: 0}
+        for beds in (2, 3):
+            match = CARS_PATTERN.search(project[f"price_{beds}bed"])
+            cars[beds] = int(match.group(1)) if match else beds - 1
+        for i in range(per_project):
+            floor, slot = divmod(i, UNITS_PER_FLOOR)
+            floor += 1
+            beds = bed_mix[slot]
+            parking = cars[beds] + (rng.random() < 0.25)
+            price = base[beds] * (1 + 0.008 * (floor - 1) + rng.uniform(0, 0.04)) + 65000 * (parking - cars[beds])
+            status = rng.choices(UNIT_STATUSES, weights=(70, 10, 20))[0]
+            yield (project["name"], f"{floor}{slot + 1:02d}", floor, beds, 1 if beds == 1 else 2,
+                   parking, int(round(price, -3)), status)
+
+
+def _last_update(db):
+    return db.execute("SELECT MAX(updated_at) FROM units").fetchone()[0]
+
+
+def _load_columns(db):
+    """UnitInventory's columns and group indexes, built from the units table without touching the live ones."""
+    projects = []       # project code -> name
+    project_codes = {}
+    ids = array("I")    # row -> units.id (ascending, so rows can be found by bisect)
+    project_column = array("H")
+    floor_column = array("H")
+    beds_column = array("B")
+    baths_column = array("B")
+    parking_column = array("B")
+    price_column = array("I")
+    status_column = array("B")
+    status_codes = {status: code for code, status in enumerate(UNIT_STATUSES)}
+    for unit_id, project, floor, beds, baths, parking, price, status in db.execute(
+        "SELECT id, project, floor, beds, baths, parking, price, status FROM units ORDER BY id"
+    ):
+        code = project_codes.get(project)
+        if code is None:
+            code = project_codes[project] = len(projects)
+            projects.append(project)
+        ids.append(unit_id)
+        project_column.append(code)
+        floor_column.append(floor)
+        beds_column.append(beds)
+        baths_column.append(baths)
+        parking_column.append(parking)
+        price_column.append(price)
+        status_column.append(status_codes[status])
+
+    # One pass in price order; each group's rows come out already sorted
+    groups = {}  # (status, project, beds, parking) -> (prices, rows), price-ascending
+    for row in sorted(range(len(ids)), key=price_column.__getitem__):
+        key = (status_column[row], project_column[row], beds_column[row], parking_column[row])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = (array("I"), array("I"))
+        group[0].append(price_column[row])
+        group[1].append(row)
+    return {
+        "projects": projects, "_project_codes": project_codes, "ids": ids, "project": project_column,
+        "floor": floor_column, "beds": beds_column, "baths": baths_column, "parking": parking_column,
+        "price": price_column, "status": status_column, "groups": groups,
+    }
+
+
+def seed_demo_units(db, pack=KNOWLEDGE_PACK, per_project=INVENTORY_DEMO_UNITS):
+    """Fill an empty units table with demo inventory; a no-op once real units are imported."""
+    if db.execute("SELECT 1 FROM units LIMIT 1").fetchone():
+        return 0
+    return upsert_units(db, demo_units(pack, per_project))
+
+
+class UnitInventory:
+    def __init__(self, db, pack=KNOWLEDGE_PACK):
+        self.db = db
+        self._suburb_of = {project["name"]: project["suburb"] for project in pack["projects"]}
+        self._lock = threading.Lock()  # held by searches, set_status and the swap-in of reloaded columns
+        self._reloader = None
+        self._status_changes = []  # set_status() calls made while a background reload runs
+        self.reload()
+
+    def refresh(self):
+        """
+        Start a reload if another connection has changed the units table since the last load; returns
+        True if one was started. File databases reload in the background; :memory: ones right away.
+        """
+        data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        if _last_update(self.db) == self._updated_at or (self._reloader and self._reloader.is_alive()):
+            return False
+        path = self.db.execute("PRAGMA database_list").fetchone()[2]
+        if not path:
+            self.reload()
+            return True
+        self._status_changes = []
+        self._reloader = threading.Thread(target=self._reload_from, args=(path,), name="inventory-reload", daemon=True)
+        self._reloader.start()
+        return True
+
+    def wait_for_reload(self, timeout=None):
+        if self._reloader:
+            self._reloader.join(timeout)
+
+    def _reload_from(self, path):
+        db = sqlite3.connect(path)
+        try:
+            self.reload(db)
+        except Exception as e:
+            logging.warning(f"Inventory reload failed: {type(e).__name__} - {e}")
+        finally:
+            db.close()
+
+    def reload(self, db=None):
+        """Rebuild the columns and group indexes from the units table, then swap them in."""
+        db = db or self.db
+        updated_at = _last_update(db)
+        columns = _load_columns(db)
+        with self._lock:
+            self.__dict__.update(columns, _updated_at=updated_at)
+            if db is self.db:
+                self._data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+            # Status changes made while the columns were being read may be missing from them
+            for unit_id, status in self._status_changes:
+                self._move(unit_id, status)
+            self._status_changes = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _key(self, row):
+        return self.status[row], self.project[row], self.beds[row], self.parking[row]
+
+    def _project_filter(self, projects, suburbs):
+        """Project codes allowed by name/suburb filters (case-insensitive), or None for all."""
+        if not projects and not suburbs:
+            return None
+        wanted = {name.lower() for name in projects or ()}
+        suburbs = {suburb.lower() for suburb in suburbs or ()}
+        return {
+            code for code, name in enumerate(self.projects)
+            if name.lower() in wanted or self._suburb_of.get(name, "").lower() in suburbs
+        }
+
+    def search(self, max_price=None, min_price=0, beds=None, min_parking=0, projects=None, suburbs=None,
+               min_floor=None, status="available", limit=20):
+        """
+        Cheapest matching units first. Returns (units, total); total is None when min_floor is given.
+        beds and min_parking match exactly / at least; projects and suburbs are alternatives.
+        """
+        started = time.perf_counter()
+        self.refresh()
+        status_code = UNIT_STATUSES.index(status)
+        with self._lock:
+            units, total = self._search(status_code, max_price, min_price, beds, min_parking, projects, suburbs,
+                                        min_floor, limit)
+        INVENTORY_SEARCH_LATENCY.observe(time.perf_counter() - started)
+        return units, total
+
+    def _search(self, status_code, max_price, min_price, beds, min_parking, projects, suburbs, min_floor, limit):
+        project_codes = self._project_filter(projects, suburbs)
+        max_price = 2 ** 32 - 1 if max_price is None else max_price
+        ranges = []
+        total = 0
+        for (group_status, project, group_beds, parking), (prices, rows) in self.groups.items():
+            if (group_status != status_code or (beds is not None and group_beds != beds) or parking < min_parking
+                    or (project_codes is not None and project not in project_codes)):
+                continue
+            lo, hi = bisect_left(prices, min_price), bisect_right(prices, max_price)
+            if lo < hi:
+                ranges.append((prices, rows, lo, hi))
+                total += hi - lo
+        streams = [zip(islice(prices, lo, hi), islice(rows, lo, hi)) for prices, rows, lo, hi in ranges]
+        matches = merge(*streams)
+        if min_floor is not None:
+            floor = self.floor
+            matches = (match for match in matches if floor[match[1]] >= min_floor)
+            total = None
+        rows = [row for _, row in islice(matches, limit)]
+        return self._describe(rows), total
+
+    def _describe(self, rows):
+        if not rows:
+            return []
+        labels = dict(self.db.execute(
+            f"SELECT id, unit FROM units WHERE id IN ({', '.join('?' * len(rows))})", [self.ids[row] for row in rows]
+        ).fetchall())
+        units = []
+        for row in rows:
+            project = self.projects[self.project[row]]
+            units.append({
+                "id": self.ids[row],
+                "project": project,
+                "suburb": self._suburb_of.get(project),
+                "unit": labels.get(self.ids[row]),
+                "floor": self.floor[row],
+                "beds": self.beds[row],
+                "baths": self.baths[row],
+                "parking": self.parking[row],
+                "price": self.price[row],
+                "status": UNIT_STATUSES[self.status[row]],
+            })
+        return units
+
+    def set_status(self, unit_id, status):
+        """Mark a unit available/reserved/sold in the table and move it between groups. Returns False if unknown."""
+        UNIT_STATUSES.index(status)
+        self.refresh()
+        with self._lock:
+            row = bisect_left(self.ids, unit_id)
+            if row == len(self.ids) or self.ids[row] != unit_id:
+                return False
+            updated_at = datetime.now(timezone.utc).isoformat()
+            self.db.execute("UPDATE units SET status = ?, updated_at = ? WHERE id = ?", (status, updated_at, unit_id))
+            self.db.commit()
+            self._updated_at = max(self._updated_at or "", updated_at)
+            if self._reloader and self._reloader.is_alive():
+                self._status_changes.append((unit_id, status))
+            self._move(unit_id, status)
+        return True
+
+    def _move(self, unit_id, status):
+        """Move a unit to another status group in memory (caller holds the lock)."""
+        status_code = UNIT_STATUSES.index(status)
+        row = bisect_left(self.ids, unit_id)
+        if row == len(self.ids) or self.ids[row] != unit_id or self.status[row] == status_code:
+            return
+        prices, rows = self.groups[self._key(row)]
+        position = bisect_left(prices, self.price[row])
+        while rows[position] != row:
+            position += 1
+        del prices[position], rows[position]
+        self.status[row] = status_code
+        prices, rows = self.groups.setdefault(self._key(row), (array("I"), array("I")))
+        position = bisect_right(prices, self.price[row])
+        prices.insert(position, self.price[row])
+        rows.insert(position, row)
+
+
+def format_unit(unit):
+    """One prompt line per unit, e.g. "Yarra Edge 1203 (Footscray): 2-bed, 2-bath, 1 car, level 12, $795,000"."""
+    cars = f"{unit['parking']} car" + ("s" if unit["parking"] != 1 else "")
+    return (f"{unit['project']} {unit['unit']} ({unit['suburb']}): {unit['beds']}-bed, {unit['baths']}-bath, "
+            f"{cars}, level {unit['floor']}, ${unit['price']:,}")
+
+
+def read_units(path):
+    """Rows of a units CSV with a header (status defaults to available)."""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield (row["project"], row["unit"], int(row["floor"]), int(row["beds"]), int(row["baths"]),
+                   int(row["parking"]), int(row["price"]), row.get("status") or "available")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("import", help="upsert units from a CSV file").add_argument("path")
+    seed = commands.add_parser("seed", help="generate demo units from the knowledge pack")
+    seed.add_argument("--per-project", type=int, default=INVENTORY_DEMO_UNITS)
+    search = commands.add_parser("search")
+    search.add_argument("--max-price", type=int)
+    search.add_argument("--min-price", type=int, default=0)
+    search.add_argument("--beds", type=int)
+    search.add_argument("--min-parking", type=int, default=0)
+    search.add_argument("--suburb", action="append")
+    search.add_argument("--min-floor", type=int)
+    search.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    db = sqlite3.connect(args.db)
+    migrate_units(db)
+    started = time.perf_counter()
+    if args.command == "import":
+        print(f"Upserted {upsert_units(db, read_units(args.path))} units in {time.perf_counter() - started:.1f}s")
+    elif args.command == "seed":
+        count = upsert_units(db, demo_units(KNOWLEDGE_PACK, args.per_project))
+        print(f"Upserted {count} units in {time.perf_counter() - started:.1f}s")
+    else:
+        inventory = UnitInventory(db)
+        loaded = time.perf_counter()
+        units, total = inventory.search(
+            max_price=args.max_price, min_price=args.min_price, beds=args.beds, min_parking=args.min_parking,
+            suburbs=args.suburb, min_floor=args.min_floor, limit=args.limit
+        )
+        searched = time.perf_counter()
+        print(json.dumps({"total": total, "units": units, "load_s": round(loaded - started, 2),
+                          "search_ms": round((searched - loaded) * 1000, 3)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# ---------------------------
+# Knowledge pack
+# ---------------------------
+# Shared by the FastAPI backend (voice_agent.py) and the Streamlit frontend (app.py),
+# so keep this module free of API clients and heavy imports.
+
+KNOWLEDGE_PACK = {
+    "developer": "Harbourline Developments",
+    "projects": [
+        {
+            "name": "Riverstone Place",
+            "suburb": "Abbotsford",
+            "price_1bed": "from $585,000",
+            "price_2bed": "from $845,000 (1 car included)",
+            "price_3bed": "from $1.28m (2 cars included)",
+            "strata": "2.8–6.2k/yr",
+            "completion": "Q4 2027",
+            "lifestyle": "Quiet, leafy, 10 min to CBD, near Yarra River trails",
+            "tagline": "Leafy, riverside living",
+            "image": "images/riverstone.png"
+        },
+        {
+            "name": "Harbourview Towers",
+            "suburb": "Richmond",
+            "price_1bed": "from $720,000",
+            "price_2bed": "from $1.05m",
+            "price_3bed": "from $1.65m",
+            "strata": "3.8–7.5k/yr",
+            "completion": "Q2 2027",
+            "lifestyle": "Vibrant, cafes, shops, 5 min walk to train & MCG",
+            "tagline": "Vibrant & central",
+            "image": "images/harbourview.png"
+        },
+        {
+            "name": "Yarra Edge",
+            "suburb": "Footscray",
+            "price_1bed": "from $520,000",
+            "price_2bed": "from $780,000",
+            "price_3bed": "from $1.15m",
+            "strata": "2.5–5.1k/yr",
+            "completion": "Q3 2026",
+            "lifestyle": "Up-and-coming, multicultural food scene, best value, near Footscray Station",
+            "tagline": "Best value + food scene",
+            "image": "images/yarra_edge.png"
+        },
+        {
+            "name": "Collingwood Quarter",
+            "suburb": "Collingwood",
+            "price_1bed": "from $635,000",
+            "price_2bed": "from $920,000",
+            "price_3bed": "from $1.45m",
+            "strata": "3.2–6.8k/yr",
+            "completion": "Q1 2027",
+            "lifestyle": "Hip street art, breweries, trams everywhere, young professional vibe",
+            "tagline": "Hip & creative",
+            "image": "images/collingwood.png"
+        }
+    ],
+    "faqs": [
+        {
+            "question": "How much deposit do I need for an off-the-plan apartment?",
+            "answer": "Most buyers pay a 10% deposit on signing, held in trust until settlement; the sales team can confirm options for each project."
+        },
+        {
+            "question": "When do I pay the balance?",
+            "answer": "The balance is due at settlement, after completion and the final inspection."
+        },
+        {
+            "question": "Can I visit a display suite?",
+            "answer": "Yes — the display suite at 123 Swan St, Richmond is open for booked visits, or we can do a video walkthrough."
+        },
+        {
+            "question": "Is parking included?",
+            "answer": "Riverstone Place includes car parks with 2-bed and 3-bed apartments; other projects offer parking as an option."
+        },
+        {
+            "question": "Are the apartments suitable for investors?",
+            "answer": "Yes, all projects suit owner-occupiers and investors; rental appraisals are available from the sales team."
+        },
+        {
+            "question": "Can you help with finance, stamp duty or legal advice?",
+            "answer": "We can't give finance or legal advice — please speak to a broker or conveyancer, or email the sales team for referrals."
+        }
+    ],
+    "handoff_email": "sales@harbourline.com.au",
+    "display_suite": "123 Swan St, Richmond",
+    "hero_image": "images/hero_img.jpg"
+}
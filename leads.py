@@ -0,0 +1,305 @@
+"""
+Lead identity resolution, merging and the one-off dedup job for existing databases.
+
+    python -m leads dedup --db leads.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from pydantic_core import from_json, to_json
+from suppression import normalise_email, normalise_phone
+from transcripts import new_transcript_id
+
+# ---------------------------
+# Lead identity
+# ---------------------------
+# A buyer is one row in leads. identity is the normalised phone number (the email when there
+# is no number) behind a unique index; email_key lets a caller on a new number find their lead.
+# Repeat calls merge qualification updates into that row and append the exchange to its transcript
+# (transcripts.py). Databases that still have the older lead_turns table get its rows moved into the
+# transcript store once, at startup (migrate_lead_turns).
+LEAD_COLUMNS = {
+    "name": "TEXT",
+    "email": "TEXT",
+    "interest_score": "INTEGER",
+    "timeframe": "TEXT",
+    "identity": "TEXT",
+    "email_key": "TEXT",
+    "updated_at": "TEXT",
+    "call_count": "INTEGER NOT NULL DEFAULT 1",
+    "transcript_id": "TEXT",
+}
+DEDUP_CHUNK_SIZE = 10000
+
+
+def ensure_columns(db, table, columns):
+    """Add columns missing from an existing table (lightweight migration for older leads.db files)."""
+    existing = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def migrate_leads(db):
+    ensure_columns(db, "leads", LEAD_COLUMNS)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_leads_score_timeframe ON leads (interest_score, timeframe)")
+    # Rows logged before identities existed have NULL identity until `python -m leads dedup` runs
+    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_identity ON leads (identity)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_leads_email_key ON leads (email_key)")
+    db.commit()
+
+
+def migrate_lead_turns(db, store):
+    """
+    Move lead_turns rows into the transcript store and drop the table; returns the turns moved (0 once
+    done). The moved turns' index rows are renumbered below zero so they read back ahead of any turns
+    the lead has logged to the store since.
+    """
+    if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lead_turns'").fetchone():
+        return 0
+    first_id = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM transcript_turns").fetchone()[0]
+    moved = 0
+    try:
+        lead_id = transcript_id = None
+        for turn_lead_id, timestamp, user_message, agent_reply in db.execute(
+            "SELECT lead_id, timestamp, user_message, agent_reply FROM lead_turns ORDER BY lead_id, id"
+        ).fetchall():
+            if turn_lead_id != lead_id:
+                lead_id = turn_lead_id
+                row = db.execute("SELECT transcript_id FROM leads WHERE id = ?", (lead_id,)).fetchone()
+                if row is None:
+                    transcript_id = None  # lead deleted: nothing to attach the turns to
+                    continue
+                transcript_id = row[0]
+                if transcript_id is None:
+                    transcript_id = new_transcript_id()
+                    db.execute("UPDATE leads SET transcript_id = ?, transcript_url = ? WHERE id = ?",
+                               (transcript_id, f"/transcripts/{transcript_id}", lead_id))
+            if transcript_id is not None:
+                store.append(transcript_id, {"timestamp": timestamp, "user": user_message, "agent": agent_reply})
+                moved += 1
+        db.execute("UPDATE transcript_turns SET id = id - ? WHERE id >= ?", (first_id + moved, first_id))
+        db.execute("DROP TABLE lead_turns")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return moved
+
+
+def lead_keys(phone, email):
+    """(identity, email_key) for a caller; either may be None."""
+    phone_key = normalise_phone(phone)
+    email_key = normalise_email(email)
+    email_key = email_key if "@" in email_key else None
+    return (phone_key or email_key or None), email_key
+
+
+def find_lead(db, identity, email_key):
+    """Id of the lead this caller already has (by number first, then email), or None."""
+    if identity:
+        row = db.execute("SELECT id FROM leads WHERE identity = ?", (identity,)).fetchone()
+        if row:
+            return row[0]
+    if email_key:
+        row = db.execute("SELECT id FROM leads WHERE email_key = ? ORDER BY id LIMIT 1", (email_key,)).fetchone()
+        if row:
+            return row[0]
+    return None
+
+
+# Columns read for merging, in this order
+MERGE_FIELDS = ("name", "email", "summary", "qualification", "booking", "compliance_flags",
+                "interest_score", "transcript_url", "recording_url")
+
+
+def merge_lead(existing, update):
+    """
+    Merge a newer lead dict into an existing one (both with MERGE_FIELDS, JSON fields decoded).
+    Newer non-empty values win; qualification is merged key by key; compliance flags accumulate;
+    a confirmed booking is kept until a new one replaces it; interest_score keeps the highest seen.
+    """
+    merged = dict(existing)
+    for field in ("name", "email", "summary", "transcript_url", "recording_url"):
+        if update.get(field):
+            merged[field] = update[field]
+    merged["qualification"] = dict(existing.get("qualification") or {})
+    merged["qualification"].update(
+        {key: value for key, value in (update.get("qualification") or {}).items() if value not in (None, "", [])}
+    )
+    if (update.get("booking") or {}).get("ok") or not (existing.get("booking") or {}).get("ok"):
+        merged["booking"] = update.get("booking") or existing.get("booking") or {}
+    merged["compliance_flags"] = list(dict.fromkeys(
+        (existing.get("compliance_flags") or []) + (update.get("compliance_flags") or [])
+    ))
+    scores = [score for score in (existing.get("interest_score"), update.get("interest_score")) if score is not None]
+    merged["interest_score"] = max(scores) if scores else None
+    return merged
+
+
+def decode_row(row):
+    lead = dict(zip(MERGE_FIELDS, row))
+    for field in ("qualification", "booking", "compliance_flags"):
+        lead[field] = from_json(lead[field]) if lead[field] else None
+    return lead
+
+
+def encode_lead(lead):
+    """Column values for MERGE_FIELDS plus timeframe; the JSON columns are encoded by pydantic-core."""
+    return (
+        lead.get("name"), lead.get("email"), lead["summary"], to_json(lead["qualification"]).decode(),
+        to_json(lead["booking"]).decode(), to_json(lead["compliance_flags"]).decode(), lead.get("interest_score"),
+        lead["transcript_url"], lead["recording_url"], (lead["qualification"] or {}).get("timeframe"),
+    )
+
+
+def load_lead(db, lead_id):
+    return decode_row(db.execute(f"SELECT {', '.join(MERGE_FIELDS)} FROM leads WHERE id = ?", (lead_id,)).fetchone())
+
+
+SAVE_MERGED_SQL = f"""
+    UPDATE leads SET {', '.join(f'{field} = ?' for field in MERGE_FIELDS)}, timeframe = ?,
+        updated_at = ?, call_count = call_count + ?
+    WHERE id = ?
+"""
+
+
+def save_merged(db, lead_id, lead, timestamp, extra_calls=1):
+    db.execute(SAVE_MERGED_SQL, (*encode_lead(lead), timestamp, extra_calls, lead_id))
+
+
+# ---------------------------
+# One-off dedup of an existing leads.db
+# ---------------------------
+def dedup_leads(db, chunk_size=DEDUP_CHUNK_SIZE):
+    """
+    Merge duplicate leads in place and backfill identity/email_key. Returns counts.
+
+    One pass over (id, caller_cli, email) builds survivor maps keyed by phone and email
+    (hash join, O(n)); duplicate rows are then streamed sorted by survivor and merged group
+    by group, child rows are re-pointed through a temp mapping table, and duplicates deleted.
+    """
+    migrate_leads(db)
+    survivor_by_identity = {}
+    survivor_by_email = {}
+    merges = []      # (duplicate id, survivor id)
+    backfill = []    # (identity, email_key, id) for surviving rows missing keys
+    for lead_id, caller_cli, email, identity in db.execute(
+        "SELECT id, caller_cli, email, identity FROM leads ORDER BY id"
+    ):
+        new_identity, email_key = lead_keys(caller_cli, email)
+        survivor = survivor_by_identity.get(new_identity) or (email_key and survivor_by_email.get(email_key))
+        if survivor:
+            merges.append((lead_id, survivor))
+            continue
+        if new_identity:
+            survivor_by_identity[new_identity] = lead_id
+        if email_key:
+            survivor_by_email.setdefault(email_key, lead_id)
+        if identity != new_identity:
+            backfill.append((new_identity, email_key, lead_id))
+    del survivor_by_identity, survivor_by_email
+
+    try:
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS lead_merge (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)")
+        db.execute("DELETE FROM lead_merge")
+        db.executemany("INSERT INTO lead_merge (old_id, new_id) VALUES (?, ?)", merges)
+
+        # Survivor rows first in each group (they are the lowest id), then their duplicates in id order.
+        # Ordering by group_id goes through SQLite's sorter, so the updates below never race this read.
+        rows = db.execute(f"""
+            SELECT COALESCE(m.new_id, l.id) AS group_id, l.id, l.timestamp, {', '.join('l.' + f for f in MERGE_FIELDS)}
+            FROM leads l LEFT JOIN lead_merge m ON m.old_id = l.id
+            WHERE l.id IN (SELECT old_id FROM lead_merge) OR l.id IN (SELECT new_id FROM lead_merge)
+            ORDER BY group_id, l.id
+        """)
+        group_id = merged = None
+        extra_calls = 0
+        updates = []
+        for row_group, lead_id, timestamp, *fields in rows:
+            lead = decode_row(fields)
+            if row_group != group_id:
+                if group_id is not None:
+                    updates.append((group_id, merged, last_seen, extra_calls))
+                group_id, merged, extra_calls = row_group, lead, 0
+            else:
+                merged = merge_lead(merged, lead)
+                extra_calls += 1
+            last_seen = timestamp
+            if len(updates) >= chunk_size:
+                _save_groups(db, updates)
+                updates = []
+        if group_id is not None:
+            updates.append((group_id, merged, last_seen, extra_calls))
+        _save_groups(db, updates)
+
+        for table in ("llm_usage", "followups"):
+            if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+                db.execute(f"""
+                    UPDATE {table} SET lead_id = (SELECT new_id FROM lead_merge WHERE old_id = {table}.lead_id)
+                    WHERE lead_id IN (SELECT old_id FROM lead_merge)
+                """)
+        _merge_transcripts(db)
+        db.execute("DELETE FROM leads WHERE id IN (SELECT old_id FROM lead_merge)")
+        db.executemany("UPDATE leads SET identity = ?, email_key = ? WHERE id = ?", backfill)
+        db.execute("""
+            UPDATE leads SET timeframe = json_extract(qualification, '$.timeframe')
+            WHERE timeframe IS NULL AND json_valid(qualification)
+        """)
+        db.execute("DROP TABLE lead_merge")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"merged": len(merges), "keys_backfilled": len(backfill)}
+
+
+def _merge_transcripts(db):
+    """
+    Give each survivor one transcript holding its duplicates' turns: a survivor without a transcript
+    adopts its earliest duplicate's, the other duplicates' turns are re-pointed to it (they keep their
+    append order), and transcript_url is set from the survivor's transcript_id.
+    """
+    db.execute("""
+        UPDATE leads SET transcript_id = (
+            SELECT d.transcript_id FROM lead_merge m JOIN leads d ON d.id = m.old_id
+            WHERE m.new_id = leads.id AND d.transcript_id IS NOT NULL ORDER BY d.id LIMIT 1
+        )
+        WHERE transcript_id IS NULL AND id IN (SELECT new_id FROM lead_merge)
+    """)
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transcript_turns'").fetchone():
+        db.execute("""
+            UPDATE transcript_turns SET transcript_id = (
+                SELECT s.transcript_id FROM leads d JOIN lead_merge m ON m.old_id = d.id JOIN leads s ON s.id = m.new_id
+                WHERE d.transcript_id = transcript_turns.transcript_id
+            )
+            WHERE transcript_id IN (
+                SELECT d.transcript_id FROM lead_merge m JOIN leads d ON d.id = m.old_id WHERE d.transcript_id IS NOT NULL
+            )
+        """)
+    db.execute("""
+        UPDATE leads SET transcript_url = '/transcripts/' || transcript_id
+        WHERE transcript_id IS NOT NULL AND id IN (SELECT new_id FROM lead_merge)
+    """)
+
+
+def _save_groups(db, updates):
+    db.executemany(SAVE_MERGED_SQL, [
+        (*encode_lead(lead), timestamp, extra_calls, lead_id) for lead_id, lead, timestamp, extra_calls in updates
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["dedup"])
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    result = dedup_leads(sqlite3.connect(args.db))
+    print(json.dumps(dict(result, elapsed_s=round(time.perf_counter() - started, 1))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# ---------------------------
+# In-process metrics
+# ---------------------------
+# Tiny Prometheus-compatible counters/gauges/histograms with no external dependency.
+# Set METRICS_ENABLED=false to turn every timer into a no-op.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() != "false"
+
+# Seconds; covers sub-ms local stages up to slow LLM calls near the client timeout
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0)
+
+_registry = {}  # name -> metric, in registration order
+_lock = threading.Lock()
+
+
+def _register(metric):
+    """
+    One series per name: registering a name again replaces the earlier metric (e.g. a callback gauge of
+    a component that has been re-created) instead of rendering it twice.
+    """
+    with _lock:
+        existing = _registry.get(metric.name)
+        if existing is not None and type(existing) is not type(metric):
+            raise ValueError(f"Metric {metric.name} is already registered as a {type(existing).__name__}")
+        _registry[metric.name] = metric
+
+
+def _format_labels(label_names, label_values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        _register(self)
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge whose value is either set explicitly or read from a callback at scrape time. With label_names,
+    the callback returns a dict of label values (tuples) -> value.
+    """
+
+    def __init__(self, name, help_text, label_names=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.callback = callback
+        self._values = {}
+        _register(self)
+
+    def set(self, value, *label_values):
+        self._values[label_values] = value
+
+    def value(self, *label_values):
+        if self.callback:
+            return self.callback().get(label_values, 0) if self.label_names else self.callback()
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        values = self._values
+        if self.callback and self.label_names:
+            values = self.callback()
+        elif self.callback:
+            lines.append(f"{self.name} {self.callback()}")
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts (+Inf last), sum, count]
+        _register(self)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def quantile(self, q, *label_values):
+        """Approximate quantile (upper bucket bound) for quick summaries and tests."""
+        series = self._series.get(label_values)
+        if not series or not series[2]:
+            return 0.0
+        target = q * series[2]
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), series[0]):
+            running += bucket_count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render_prometheus():
+    lines = []
+    for metric in list(_registry.values()):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Request tracing
+# ---------------------------
+STAGE_LATENCY = Histogram(
+    "riverstone_stage_duration_seconds",
+    "Latency of each request-handling stage",
+    label_names=("stage",),
+)
+
+_current_trace = ContextVar("riverstone_trace", default=None)
+
+
+class Trace:
+    """Per-request span collector; stages recorded while it is active are attached to it."""
+
+    __slots__ = ("name", "start", "spans", "_token")
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.start = time.perf_counter()
+        self._token = _current_trace.set(self)
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.start
+        STAGE_LATENCY.observe(elapsed, self.name)
+        _current_trace.reset(self._token)
+        self.spans.append((self.name, elapsed))
+        return elapsed
+
+    def server_timing(self):
+        """Spans formatted for the Server-Timing response header (milliseconds)."""
+        return ", ".join(f"{name};dur={duration * 1000:.1f}" for name, duration in self.spans)
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        STAGE_LATENCY.observe(elapsed, self.stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.stage, elapsed))
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def stage_timer(stage):
+    """Context manager timing one stage into STAGE_LATENCY (and the active Trace, if any)."""
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(stage)
+
+
+def start_trace(name):
+    return Trace(name) if METRICS_ENABLED else None
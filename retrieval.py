@@ -0,0 +1,204 @@
+import math
+import os
+import re
+import time
+from array import array
+from heapq import nlargest
+from metrics import Histogram
+
+# ---------------------------
+# Prompt grounding (BM25)
+# ---------------------------
+# Small in-process inverted index over project listings, lifestyle blurbs and FAQs. Term weights
+# are precomputed per posting (BM25 tf/length part) and each posting list is kept sorted by weight,
+# so a query only reads the top RETRIEVAL_POSTINGS_PER_TERM entries of each term (impact-ordered
+# early termination) — query cost stays flat as the catalogue grows. Added documents land in a
+# small unsorted delta that is scanned in full and merged into the postings of just the terms it
+# touches once it grows past RETRIEVAL_DELTA_LIMIT; removed documents are tombstoned and dropped
+# from a posting list whenever it is re-merged. compact() rebuilds everything (and refreshes the
+# average document length the weights were computed with).
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 6))
+RETRIEVAL_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", 300))
+RETRIEVAL_POSTINGS_PER_TERM = int(os.getenv("RETRIEVAL_POSTINGS_PER_TERM", 400))
+RETRIEVAL_DELTA_LIMIT = 500
+BM25_K1 = 1.2
+BM25_B = 0.75
+CHARS_PER_TOKEN = 4  # rough English average; only used to keep snippets inside the budget
+
+RETRIEVAL_LATENCY = Histogram("riverstone_retrieval_seconds", "BM25 query latency")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its me my of on or our so that the "
+    "their them there they this to was we what when where which who will with would you your hi hello".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class BM25Index:
+    def __init__(self, documents=()):
+        """documents: iterable of (doc_id, text)."""
+        self._ids = []          # doc index -> doc_id
+        self._texts = []        # doc index -> text
+        self._lengths = array("I")
+        self._index_of = {}     # doc_id -> doc index
+        self._removed = set()   # tombstoned doc indexes
+        self._df = {}           # term -> live document frequency
+        self._postings = {}     # term -> (array of doc indexes, array of weights), weight-descending
+        self._delta = {}        # term -> {doc index: tf}, documents added since the last merge
+        self._delta_docs = 0
+        self._total_length = 0
+        self._avg_length = 1.0
+        for doc_id, text in documents:
+            self._append(doc_id, text)
+        self._merge()
+
+    def __len__(self):
+        return len(self._index_of)
+
+    def _append(self, doc_id, text):
+        if doc_id in self._index_of:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        doc = len(self._ids)
+        self._ids.append(doc_id)
+        self._texts.append(text)
+        self._lengths.append(len(tokens))
+        self._index_of[doc_id] = doc
+        self._total_length += len(tokens)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            self._delta.setdefault(term, {})[doc] = tf
+            self._df[term] = self._df.get(term, 0) + 1
+
+    def _weight(self, tf, length):
+        return tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / self._avg_length))
+
+    def _merge(self):
+        """Rebuild the sorted postings from scratch (startup, or when the delta gets large)."""
+        self._avg_length = self._total_length / max(len(self), 1)
+        by_term = {}
+        for doc, (doc_id, text) in enumerate(zip(self._ids, self._texts)):
+            if doc in self._removed:
+                continue
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            length = self._lengths[doc]
+            for term, tf in counts.items():
+                by_term.setdefault(term, []).append((self._weight(tf, length), doc))
+        self._postings = {}
+        for term, entries in by_term.items():
+            entries.sort(reverse=True)
+            self._postings[term] = (array("I", (doc for _, doc in entries)), array("f", (w for w, _ in entries)))
+        self._delta = {}
+        self._delta_docs = 0
+
+    def add(self, doc_id, text):
+        """Add or replace one document."""
+        self._append(doc_id, text)
+        self._delta_docs += 1
+        if self._delta_docs > RETRIEVAL_DELTA_LIMIT:
+            self._merge_delta()
+
+    def _merge_delta(self):
+        """Merge delta documents into the sorted postings of the terms they contain."""
+        removed = self._removed
+        for term, tfs in self._delta.items():
+            entries = [(self._weight(tf, self._lengths[doc]), doc) for doc, tf in tfs.items() if doc not in removed]
+            if term in self._postings:
+                docs, weights = self._postings[term]
+                entries.extend((weight, doc) for doc, weight in zip(docs, weights) if doc not in removed)
+            entries.sort(reverse=True)
+            self._postings[term] = (array("I", (doc for _, doc in entries)), array("f", (w for w, _ in entries)))
+        self._delta = {}
+        self._delta_docs = 0
+
+    def remove(self, doc_id):
+        doc = self._index_of.pop(doc_id, None)
+        if doc is None:
+            return
+        self._removed.add(doc)
+        self._total_length -= self._lengths[doc]
+        for term in set(tokenize(self._texts[doc])):
+            self._df[term] -= 1
+
+    def compact(self):
+        """Fold the delta into the sorted postings and drop removed documents."""
+        if self._removed:
+            live = [(self._ids[doc], self._texts[doc]) for doc in range(len(self._ids)) if doc not in self._removed]
+            self.__init__(live)
+        else:
+            self._merge()
+
+    def search(self, query, k=RETRIEVAL_TOP_K):
+        """Top-k (score, doc_id, text), best first."""
+        started = time.perf_counter()
+        n = len(self)
+        scores = {}
+        limit = RETRIEVAL_POSTINGS_PER_TERM
+        for term in set(tokenize(query)):
+            df = self._df.get(term)
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            postings = self._postings.get(term)
+            if postings:
+                docs, weights = postings
+                for doc, weight in zip(docs[:limit], weights[:limit]):
+                    scores[doc] = scores.get(doc, 0.0) + idf * weight
+            for doc, tf in self._delta.get(term, {}).items():
+                scores[doc] = scores.get(doc, 0.0) + idf * self._weight(tf, self._lengths[doc])
+        removed = self._removed
+        best = nlargest(k, ((score, doc) for doc, score in scores.items() if doc not in removed))
+        RETRIEVAL_LATENCY.observe(time.perf_counter() - started)
+        return [(score, self._ids[doc], self._texts[doc]) for score, doc in best]
+
+    def snippets(self, query, token_budget=RETRIEVAL_TOKEN_BUDGET, k=RETRIEVAL_TOP_K):
+        """Texts of the best matches, in rank order, that fit together inside token_budget."""
+        chosen = []
+        used = 0
+        for _, _, text in self.search(query, k):
+            cost = estimate_tokens(text)
+            if used + cost > token_budget:
+                continue
+            chosen.append(text)
+            used += cost
+        return chosen
+
+
+# ---------------------------
+# Knowledge pack documents
+# ---------------------------
+def project_documents(project):
+    """(doc_id, text) pairs for one project: a listing summary and a lifestyle blurb."""
+    name, suburb = project["name"], project["suburb"]
+    key = name.lower().replace(" ", "-")
+    listing = (
+        f"{name} ({suburb}) apartments: 1-bed {project['price_1bed']}, 2-bed {project['price_2bed']}, "
+        f"3-bed {project['price_3bed']}. Strata {project['strata']}. Completion {project['completion']}."
+    )
+    lifestyle = f"{name} ({suburb}) lifestyle: {project['lifestyle']}. {project['tagline']}."
+    return [(f"listing:{key}", listing), (f"lifestyle:{key}", lifestyle)]
+
+
+def knowledge_documents(pack):
+    documents = []
+    for project in pack["projects"]:
+        documents.extend(project_documents(project))
+    for number, faq in enumerate(pack.get("faqs", [])):
+        documents.append((f"faq:{number}", f"FAQ: {faq['question']} {faq['answer']}"))
+    return documents
+
+
+def build_knowledge_index(pack):
+    return BM25Index(knowledge_documents(pack))
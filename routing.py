@@ -0,0 +1,73 @@
+from metrics import Counter, Histogram
+
+# ---------------------------
+# Model tiering
+# ---------------------------
+# Cheap, fast models serve low-value browsing; hot leads get the stronger model and room to answer.
+# max_output_tokens is the visible reply budget; Gemini's thinking budget is added on top of it.
+MODEL_TIERS = {
+    "lite": {
+        "gemini_model": "gemini-2.5-flash-lite",
+        "mistral_model": "mistral-small-latest",
+        "max_output_tokens": 200,
+        "temperature": 0.6,
+        "thinking_budget": 0,
+    },
+    "standard": {
+        "gemini_model": "gemini-2.5-flash",
+        "mistral_model": "mistral-small-latest",
+        "max_output_tokens": 350,
+        "temperature": 0.7,
+        "thinking_budget": 0,
+    },
+    "premium": {
+        "gemini_model": "gemini-2.5-flash",
+        "mistral_model": "mistral-medium-latest",
+        "max_output_tokens": 700,
+        "temperature": 0.7,
+        "thinking_budget": 512,
+    },
+}
+
+# Tier forced on clients that are over their daily token budget (see usage.py)
+BUDGET_TIER = "lite"
+
+LONG_MESSAGE_CHARS = 280
+
+BOOKING_WORDS = ["visit", "appointment", "book", "inspect", "display suite"]
+HANDOFF_WORDS = ["human", "speak to someone", "sales team", "call me"]
+QUESTION_WORDS = ["how", "what", "when", "where", "which", "why", "is there", "can i", "does"]
+
+TIER_LATENCY = Histogram(
+    "riverstone_tier_llm_duration_seconds",
+    "LLM response latency by routing tier",
+    label_names=("tier",),
+)
+TIER_REQUESTS = Counter(
+    "riverstone_tier_requests_total",
+    "Requests routed to each model tier",
+    label_names=("tier",),
+)
+
+
+def classify_intent(msg_clean: str) -> str:
+    """Coarse intent from a sanitized message: booking, handoff, question or browse."""
+    if any(word in msg_clean for word in BOOKING_WORDS):
+        return "booking"
+    if any(word in msg_clean for word in HANDOFF_WORDS):
+        return "handoff"
+    if any(msg_clean.startswith(word) or f" {word} " in f" {msg_clean} " for word in QUESTION_WORDS):
+        return "question"
+    return "browse"
+
+
+def choose_tier(interest_score: int, msg_clean: str, intent: str, history_turns: int = 0) -> str:
+    if interest_score >= 6 or intent in ("booking", "handoff"):
+        return "premium"
+    if interest_score >= 3 or intent == "question" or len(msg_clean) > LONG_MESSAGE_CHARS or history_turns >= 3:
+        return "standard"
+    return "lite"
+
+
+def route_for(tier: str) -> dict:
+    return dict(MODEL_TIERS[tier], tier=tier)
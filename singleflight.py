@@ -0,0 +1,69 @@
+import asyncio
+from metrics import Counter, Gauge
+
+# ---------------------------
+# Single-flight
+# ---------------------------
+# Concurrent callers with the same key await one shared task instead of each
+# doing the work. The shared task is detached from any single caller: a caller
+# that is cancelled (e.g. its client disconnected) just stops waiting, and the
+# task is only cancelled once nobody is waiting on it any more. Exactly one of the callers that
+# receive a result is its owner (the leader, or a follower if the leader went away), so per-call
+# costs such as LLM usage are charged once however the waiters come and go.
+
+SINGLEFLIGHT_CALLS = Counter(
+    "riverstone_singleflight_total",
+    "Single-flight outcomes: leader (did the work), coalesced (shared a result), abandoned (all waiters left)",
+    label_names=("group", "result"),
+)
+_groups = {}  # name -> SingleFlight
+SINGLEFLIGHT_INFLIGHT = Gauge(
+    "riverstone_singleflight_inflight",
+    "Distinct in-flight keys per single-flight group",
+    label_names=("group",),
+    callback=lambda: {(name,): len(group._inflight) for name, group in list(_groups.items())},
+)
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}  # key -> [task, waiter count, result owned]
+        _groups[name] = self
+
+    def inflight(self):
+        return len(self._inflight)
+
+    async def do(self, key, factory):
+        """
+        Run factory() (a coroutine function) once per key among concurrent callers.
+        Returns (result, owner): owner is True for exactly one caller that got the result.
+        """
+        entry = self._inflight.get(key)
+        leader = entry is None
+        if leader:
+            task = asyncio.ensure_future(factory())
+            entry = self._inflight[key] = [task, 0, False]
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            SINGLEFLIGHT_CALLS.inc(self.name, "leader")
+        else:
+            SINGLEFLIGHT_CALLS.inc(self.name, "coalesced")
+        task = entry[0]
+        entry[1] += 1
+        try:
+            result = await asyncio.shield(task)
+            owner = not entry[2]
+            entry[2] = True
+            return result, owner
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
+                SINGLEFLIGHT_CALLS.inc(self.name, "abandoned")
+
+    def _forget(self, key, task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters already re-raised it
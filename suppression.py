@@ -0,0 +1,350 @@
+"""
+Do-not-call suppression list.
+
+    python -m suppression import acma_dnc.csv --source acma      # one number/email per line, or CSV first column
+    python -m suppression add 0412345678 someone@example.com
+    python -m suppression check 0412345678
+"""
+import argparse
+import csv
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from metrics import Counter, Gauge
+
+# ---------------------------
+# Do-not-call suppression
+# ---------------------------
+# Numbers and emails are stored normalised ("p:0412345678", "e:name@example.com") in the
+# do_not_call table and mirrored in memory, so /call can refuse a suppressed caller before rate
+# limiting, scoring or any LLM call. Lists up to SUPPRESSION_SET_LIMIT entries live in a set;
+# larger ones (national DNC registers) are held as a Bloom filter, saved alongside the table, and
+# only Bloom hits are confirmed against the table's unique index. Rows added by other processes
+# (bulk imports, other workers) are picked up incrementally every SUPPRESSION_REFRESH_SECONDS, on a
+# background thread with its own connection: lookups keep using the current set/filter meanwhile,
+# and a rebuilt one is swapped in whole. Bulk imports commit every chunk so the write lock is only
+# ever held for one chunk's inserts.
+SUPPRESSION_SET_LIMIT = int(os.getenv("SUPPRESSION_SET_LIMIT", 500000))
+SUPPRESSION_REFRESH_SECONDS = float(os.getenv("SUPPRESSION_REFRESH_SECONDS", 30))
+SUPPRESSION_FALSE_POSITIVE_RATE = 0.01  # hits are confirmed in SQLite, so 1% only costs a lookup
+IMPORT_CHUNK_SIZE = 50000
+
+SUPPRESSION_CHECKS = Counter(
+    "riverstone_suppression_checks_total",
+    "Do-not-call lookups by result: clear, bloom_false_positive, suppressed",
+    label_names=("result",),
+)
+
+NON_DIGITS = re.compile(r"\D")
+
+
+def normalise_phone(phone):
+    """Digits only, Australian numbers in national format (+61 412 345 678 -> 0412345678)."""
+    digits = NON_DIGITS.sub("", phone or "")
+    if digits.startswith("61") and len(digits) == 11:
+        digits = "0" + digits[2:]
+    return digits
+
+
+def normalise_email(email):
+    return (email or "").strip().lower()
+
+
+def identity_keys(phone=None, email=None):
+    keys = []
+    phone = normalise_phone(phone)
+    if phone:
+        keys.append("p:" + phone)
+    email = normalise_email(email)
+    if "@" in email:
+        keys.append("e:" + email)
+    return keys
+
+
+def parse_entry(value):
+    """Identity key for one raw list entry (phone number or email)."""
+    value = value.strip()
+    keys = identity_keys(email=value) if "@" in value else identity_keys(phone=value)
+    return keys[0] if keys else None
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (k positions sliced from one blake2b digest)."""
+
+    def __init__(self, capacity, false_positive_rate=SUPPRESSION_FALSE_POSITIVE_RATE, hashes=None, bits=None):
+        self.capacity = max(capacity, 1)
+        size = max(64, int(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(size / self.capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+        self.size = len(self.bits) * 8
+        self._unpack = struct.Struct(f"<{self.hashes}I").unpack
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.hashes).digest()
+        return [value % self.size for value in self._unpack(digest)]
+
+    def add(self, key):
+        self.update((key,))
+
+    def update(self, keys):
+        bits, size, unpack, digest_size = self.bits, self.size, self._unpack, 4 * self.hashes
+        for key in keys:
+            for value in unpack(hashlib.blake2b(key.encode(), digest_size=digest_size).digest()):
+                position = value % size
+                bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class SuppressionList:
+    def __init__(self, db, set_limit=SUPPRESSION_SET_LIMIT, refresh_seconds=SUPPRESSION_REFRESH_SECONDS):
+        self.db = db
+        self.set_limit = set_limit
+        self.refresh_seconds = refresh_seconds
+        db.execute("""
+        CREATE TABLE IF NOT EXISTS do_not_call (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            identity TEXT NOT NULL UNIQUE,
+            source TEXT,
+            added_at TEXT
+        )
+        """)
+        # Saved Bloom filter, so a restart only replays rows added after last_id
+        db.execute("""
+        CREATE TABLE IF NOT EXISTS do_not_call_bloom (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_id INTEGER,
+            capacity INTEGER,
+            hashes INTEGER,
+            bits BLOB
+        )
+        """)
+        db.commit()
+        self._keys = None
+        self._bloom = None
+        self._last_id = 0
+        self._refreshed_at = 0.0
+        self._refresher = None
+        self.reload()
+        Gauge("riverstone_suppression_entries", "Do-not-call entries loaded in memory", callback=lambda: self.loaded)
+
+    def reload(self, rebuild=False, db=None):
+        """Rebuild the in-memory view from the table (set, or Bloom filter for very large lists), then swap it in."""
+        db = db or self.db
+        count = db.execute("SELECT COUNT(*) FROM do_not_call").fetchone()[0]
+        if count <= self.set_limit:
+            last_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM do_not_call").fetchone()[0]
+            keys = {identity for (identity,) in db.execute("SELECT identity FROM do_not_call WHERE id <= ?", (last_id,))}
+            bloom = None
+        else:
+            keys = None
+            saved = None if rebuild else db.execute(
+                "SELECT last_id, capacity, hashes, bits FROM do_not_call_bloom WHERE id = 1"
+            ).fetchone()
+            if saved and saved[1] >= count:
+                last_id = saved[0]
+                bloom = BloomFilter(saved[1], hashes=saved[2], bits=saved[3])
+            else:
+                # Headroom for incremental additions before the false-positive rate degrades
+                bloom = BloomFilter(count * 2)
+                last_id = 0
+            last_id = self._catch_up(db, last_id, keys, bloom)
+        # Readers check _keys first, so the new filter is in place before the set goes away
+        self._bloom = bloom
+        self._keys = keys
+        # Rows committed while the view was being built (e.g. an unsubscribe via add())
+        self._last_id = self._catch_up(db, last_id, keys, bloom)
+        self.loaded = count
+        if bloom is not None:
+            self.save_bloom(db)
+        self._refreshed_at = time.monotonic()
+
+    def save_bloom(self, db=None):
+        db = db or self.db
+        db.execute(
+            "INSERT OR REPLACE INTO do_not_call_bloom (id, last_id, capacity, hashes, bits) VALUES (1, ?, ?, ?, ?)",
+            (self._last_id, self._bloom.capacity, self._bloom.hashes, bytes(self._bloom.bits))
+        )
+        db.commit()
+
+    @staticmethod
+    def _catch_up(db, last_id, keys, bloom):
+        """Add rows past last_id to the set/filter a chunk at a time; returns the new last_id."""
+        rows = db.execute("SELECT id, identity FROM do_not_call WHERE id > ? ORDER BY id", (last_id,))
+        while True:
+            chunk = rows.fetchmany(IMPORT_CHUNK_SIZE)
+            if not chunk:
+                return last_id
+            last_id = chunk[-1][0]
+            (keys if keys is not None else bloom).update(identity for _, identity in chunk)
+
+    def refresh(self, db=None):
+        """Pull rows added since the last load (e.g. by a bulk import in another process)."""
+        db = db or self.db
+        self._refreshed_at = time.monotonic()
+        last_id = self._catch_up(db, self._last_id, self._keys, self._bloom)
+        if last_id == self._last_id:
+            return
+        self._last_id = last_id
+        self.loaded = db.execute("SELECT COUNT(*) FROM do_not_call").fetchone()[0]
+        if self._keys is not None and self.loaded > self.set_limit:
+            self.reload(db=db)
+        elif self._bloom is not None and self.loaded > self._bloom.capacity:
+            self.reload(rebuild=True, db=db)
+
+    def _refresh_in_background(self):
+        """refresh() on a thread with its own connection; :memory: databases refresh inline."""
+        self._refreshed_at = time.monotonic()
+        if self._refresher and self._refresher.is_alive():
+            return
+        path = self.db.execute("PRAGMA database_list").fetchone()[2]
+        if not path:
+            self.refresh()
+            return
+        self._refresher = threading.Thread(target=self._refresh_from, args=(path,), name="suppression-refresh", daemon=True)
+        self._refresher.start()
+
+    def _refresh_from(self, path):
+        db = sqlite3.connect(path)
+        try:
+            self.refresh(db)
+        except Exception as e:
+            logging.warning(f"Suppression list refresh failed: {type(e).__name__} - {e}")
+        finally:
+            db.close()
+
+    def wait_for_refresh(self, timeout=None):
+        if self._refresher:
+            self._refresher.join(timeout)
+
+    def _contains(self, identity):
+        if self._keys is not None:
+            return identity in self._keys
+        if identity not in self._bloom:
+            return False
+        found = self.db.execute("SELECT 1 FROM do_not_call WHERE identity = ?", (identity,)).fetchone() is not None
+        if not found:
+            SUPPRESSION_CHECKS.inc("bloom_false_positive")
+        return found
+
+    def is_suppressed(self, phone=None, email=None):
+        if time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            self._refresh_in_background()
+        suppressed = any(self._contains(identity) for identity in identity_keys(phone, email))
+        SUPPRESSION_CHECKS.inc("suppressed" if suppressed else "clear")
+        return suppressed
+
+    def _insert(self, identities, source):
+        added_at = datetime.now(timezone.utc).isoformat()
+        before = self.db.total_changes
+        self.db.executemany(
+            "INSERT OR IGNORE INTO do_not_call (identity, source, added_at) VALUES (?, ?, ?)",
+            [(identity, source, added_at) for identity in identities]
+        )
+        return self.db.total_changes - before
+
+    def add(self, identities, source="manual"):
+        """Persist identity keys (see identity_keys/parse_entry); returns how many were new."""
+        identities = [identity for identity in identities if identity]
+        if not identities:
+            return 0
+        added = self._insert(identities, source)
+        self.db.commit()
+        if added:
+            # Straight into the in-memory view; the background refresh picks the rows up again harmlessly
+            (self._keys if self._keys is not None else self._bloom).update(identities)
+            self.loaded += added
+        return added
+
+    def remove(self, identities):
+        """Delete entries (e.g. listed in error). Other processes keep suppressing them until they restart."""
+        self.db.executemany("DELETE FROM do_not_call WHERE identity = ?", [(identity,) for identity in identities])
+        self.db.commit()
+        if self._keys is not None:
+            self._keys.difference_update(identities)
+        # Bloom mode needs nothing: hits are confirmed against the table
+        self.loaded = self.db.execute("SELECT COUNT(*) FROM do_not_call").fetchone()[0]
+
+    def bulk_import(self, entries, source="import", chunk_size=IMPORT_CHUNK_SIZE):
+        """
+        Import raw numbers/emails from any iterable, committing every chunk_size entries; returns (read, added).
+        Entries are INSERT OR IGNOREd, so an import that fails part-way can simply be re-run.
+        """
+        read = added = 0
+        chunk = []
+        # Sorted chunks keep unique-index inserts local instead of random page writes
+        cache_size = self.db.execute("PRAGMA cache_size").fetchone()[0]
+        self.db.execute("PRAGMA cache_size = -262144")  # 256 MiB while importing
+        try:
+            for entry in entries:
+                read += 1
+                identity = parse_entry(entry)
+                if identity:
+                    chunk.append(identity)
+                if len(chunk) >= chunk_size:
+                    added += self._insert(sorted(chunk), source)
+                    self.db.commit()
+                    chunk = []
+            if chunk:
+                added += self._insert(sorted(chunk), source)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            self.db.execute(f"PRAGMA cache_size = {cache_size}")
+        self.refresh()
+        if self._bloom is not None:
+            self.save_bloom()
+        return read, added
+
+
+def read_entries(path):
+    """First column of each CSV row; header rows simply fail to parse and are skipped."""
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if row:
+                yield row[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_cmd = commands.add_parser("import", help="bulk import a DNC file")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--source", default="import")
+    for name in ("add", "remove", "check"):
+        commands.add_parser(name).add_argument("entries", nargs="+", help="phone numbers or emails")
+    args = parser.parse_args(argv)
+
+    suppression = SuppressionList(sqlite3.connect(args.db))
+    if args.command == "import":
+        started = time.perf_counter()
+        read, added = suppression.bulk_import(read_entries(args.path), source=args.source)
+        print(f"Read {read} entries, added {added} in {time.perf_counter() - started:.1f}s")
+    elif args.command == "add":
+        print(f"Added {suppression.add([parse_entry(entry) for entry in args.entries])}")
+    elif args.command == "remove":
+        suppression.remove([parse_entry(entry) for entry in args.entries])
+    else:
+        for entry in args.entries:
+            suppressed = suppression.is_suppressed(email=entry) if "@" in entry else suppression.is_suppressed(phone=entry)
+            print(entry, "suppressed" if suppressed else "clear")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Durable background tasks for post-response work (lead logging, CRM pushes, ...).
+
+    python -m tasks stats
+    python -m tasks retry-dead      # give dead-lettered tasks another round of attempts
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import time
+from pydantic_core import from_json, to_json
+from metrics import Counter, Gauge, Histogram
+
+# ---------------------------
+# Background task queue
+# ---------------------------
+# enqueue() commits a row to the tasks table before the response is sent, so work survives a
+# crash or restart. Due tasks are claimed and executed by up to TASK_WORKERS concurrent workers:
+# right after each response (run_due as a response background task) and by a poller that picks up
+# retries and whatever a previous process left behind. A finished task's row is deleted in the same
+# commit as a synchronous handler's own writes, so local DB work is applied exactly once; handlers
+# with external side effects are at-least-once and must be idempotent. Failures retry with
+# exponential backoff and are dead-lettered (status "dead") after TASK_MAX_ATTEMPTS.
+# Claims are held in memory rather than written back (one commit fewer per task), which assumes
+# one server process per database — the same assumption as the shared connection in voice_agent.
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", 4))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", 5))
+TASK_RETRY_BACKOFF_SECONDS = float(os.getenv("TASK_RETRY_BACKOFF_SECONDS", 2))
+TASK_POLL_SECONDS = float(os.getenv("TASK_POLL_SECONDS", 1))
+TASK_CLAIM_BATCH = 100
+
+TASKS = Counter(
+    "riverstone_tasks_total",
+    "Background task outcomes by kind: done, retried, dead",
+    label_names=("kind", "outcome"),
+)
+TASK_LAG = Histogram(
+    "riverstone_task_lag_seconds",
+    "Delay between a task becoming due and a worker starting it",
+    label_names=("kind",),
+)
+TASK_DURATION = Histogram("riverstone_task_seconds", "Background task run time", label_names=("kind",))
+
+
+class TaskQueue:
+    def __init__(self, db, workers=TASK_WORKERS, max_attempts=TASK_MAX_ATTEMPTS,
+                 backoff_seconds=TASK_RETRY_BACKOFF_SECONDS, poll_seconds=TASK_POLL_SECONDS, export_metrics=True):
+        self.db = db
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.handlers = {}
+        self._slots = asyncio.Semaphore(workers)
+        self._poller = None
+        self._running = set()  # claimed task ids
+        db.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_after REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_error TEXT
+        )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks (status, run_after)")
+        db.commit()
+        if export_metrics:
+            Gauge("riverstone_task_queue_depth", "Background tasks waiting to run", callback=self.depth)
+            Gauge("riverstone_task_queue_lag_seconds", "Age of the oldest due background task", callback=self.lag)
+
+    def handler(self, kind):
+        """Register a sync or async handler(payload) for a task kind."""
+        def register(func):
+            self.handlers[kind] = func
+            return func
+        return register
+
+    def enqueue(self, kind, payload, delay=0.0):
+        """Persist a task (JSON-serialisable payload); returns its id."""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for task kind {kind!r}")
+        now = time.time()
+        task_id = self.db.execute(
+            "INSERT INTO tasks (kind, payload, run_after, created_at) VALUES (?, ?, ?, ?)",
+            (kind, to_json(payload).decode(), now + delay, now)
+        ).lastrowid
+        self.db.commit()
+        return task_id
+
+    def depth(self):
+        return self.db.execute("SELECT COUNT(*) FROM tasks WHERE status = 'pending'").fetchone()[0]
+
+    def lag(self):
+        oldest = self.db.execute(
+            "SELECT MIN(run_after) FROM tasks WHERE status = 'pending' AND run_after <= ?", (time.time(),)
+        ).fetchone()[0]
+        return round(time.time() - oldest, 3) if oldest else 0.0
+
+    def _claim(self, limit):
+        """Claim up to limit due tasks that no worker is running yet."""
+        rows = self.db.execute(
+            "SELECT id, kind, payload, attempts, run_after FROM tasks WHERE status = 'pending' AND run_after <= ? "
+            "ORDER BY run_after LIMIT ?", (time.time(), limit + len(self._running))
+        ).fetchall()
+        claimed = [row for row in rows if row[0] not in self._running][:limit]
+        self._running.update(row[0] for row in claimed)
+        return claimed
+
+    async def run_due(self, limit=TASK_CLAIM_BATCH):
+        """Claim and run every task that is due now (up to limit); returns how many ran."""
+        tasks = self._claim(limit)
+        await asyncio.gather(*(self._run(*task) for task in tasks))
+        return len(tasks)
+
+    async def drain(self):
+        """Run due tasks until none are left (tests, CLI and shutdown)."""
+        while await self.run_due():
+            pass
+
+    async def _run(self, task_id, kind, payload, attempts, run_after):
+        try:
+            async with self._slots:
+                await self._execute(task_id, kind, payload, attempts, run_after)
+        finally:
+            self._running.discard(task_id)
+
+    async def _execute(self, task_id, kind, payload, attempts, run_after):
+        started = time.time()
+        TASK_LAG.observe(max(0.0, started - run_after), kind)
+        try:
+            result = self.handlers[kind](from_json(payload))
+            if inspect.isawaitable(result):
+                await result
+            self.db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self.db.commit()
+            TASKS.inc(kind, "done")
+        except Exception as e:
+            self.db.rollback()
+            attempts += 1
+            if attempts >= self.max_attempts:
+                logging.error(f"Task {task_id} ({kind}) failed {attempts} times, dead-lettered: {e}")
+                self.db.execute(
+                    "UPDATE tasks SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, str(e), task_id)
+                )
+                TASKS.inc(kind, "dead")
+            else:
+                retry_in = self.backoff_seconds * 2 ** (attempts - 1)
+                logging.warning(f"Task {task_id} ({kind}) failed, retrying in {retry_in:.0f}s: {e}")
+                self.db.execute(
+                    "UPDATE tasks SET attempts = ?, run_after = ?, last_error = ? WHERE id = ?",
+                    (attempts, time.time() + retry_in, str(e), task_id)
+                )
+                TASKS.inc(kind, "retried")
+            self.db.commit()
+        TASK_DURATION.observe(time.time() - started, kind)
+
+    def start(self):
+        """Start the poller on the running event loop (it also runs tasks a previous process left pending)."""
+        leftover = self.depth()
+        if leftover:
+            logging.info(f"{leftover} background tasks pending from a previous run")
+        self._poller = asyncio.get_running_loop().create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            try:
+                if not await self.run_due():
+                    await asyncio.sleep(self.poll_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Task poller error: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def stop(self):
+        if self._poller:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+
+    def stats(self):
+        return {status: count for status, count in self.db.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status")}
+
+    def retry_dead(self):
+        count = self.db.execute(
+            "UPDATE tasks SET status = 'pending', attempts = 0, run_after = ? WHERE status = 'dead'", (time.time(),)
+        ).rowcount
+        self.db.commit()
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    parser.add_argument("command", choices=["stats", "retry-dead"])
+    args = parser.parse_args(argv)
+    queue = TaskQueue(sqlite3.connect(args.db))
+    if args.command == "stats":
+        print(json.dumps(queue.stats()))
+    else:
+        print(f"Requeued {queue.retry_dead()} dead tasks; the server picks them up within {TASK_POLL_SECONDS:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# voice_agent opens leads.db and the transcript directory at import time: keep both out of the checkout
+_data_dir = tempfile.mkdtemp(prefix="riverstone-tests-")
+atexit.register(shutil.rmtree, _data_dir, ignore_errors=True)
+os.environ["LEADS_DB_PATH"] = os.path.join(_data_dir, "leads.db")
+os.environ["TRANSCRIPT_DIR"] = os.path.join(_data_dir, "transcripts")
@@ -0,0 +1,82 @@
+import asyncio
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from admission import AdmissionController
+
+client = TestClient(voice_agent.app)
+
+def controller(**kwargs):
+    return AdmissionController(export_metrics=False, **kwargs)
+
+def test_queue_hands_over_slots_and_sheds_when_full():
+    async def scenario():
+        admission = controller(initial_limit=1, min_limit=1, queue_size=1, queue_timeout=1)
+        assert await admission.acquire()
+        waiting = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        assert not await admission.acquire()  # queue full
+        admission.release()
+        assert await waiting and admission.in_flight == 1
+        admission.release()
+        assert admission.in_flight == 0
+
+        slow = controller(initial_limit=1, min_limit=1, queue_size=1, queue_timeout=0.01)
+        assert await slow.acquire()
+        assert not await slow.acquire()  # waited, timed out
+        assert not slow._waiters
+    asyncio.run(scenario())
+
+def test_limit_adapts_to_latency():
+    admission = controller(initial_limit=20, min_limit=4, max_limit=200)
+    admission.in_flight = 20  # fully used
+    for _ in range(50):
+        admission.observe(0.5)
+    grown = admission.limit
+    assert grown > 20
+    for _ in range(30):
+        admission.observe(5.0)  # provider slowed down 10x
+    assert admission.limit < grown / 2
+    admission.in_flight = 1
+    before = admission.limit
+    for _ in range(50):
+        admission.observe(0.5)
+    assert admission.limit <= before  # idle: never grows
+
+def test_saturated_call_gets_degraded_reply_with_booking(monkeypatch):
+    saturated = controller(initial_limit=1, min_limit=1, queue_size=0)
+    saturated.in_flight = 1
+    monkeypatch.setattr(voice_agent, "llm_admission", saturated)
+    voice_agent.request_log.clear()
+    response = client.post("/call", json={
+        "name": "Spike Buyer", "phone": "0412 000 043", "email": "spike@example.com",
+        "message": "I want to book a visit to the display suite", "budget": 1200000, "beds": 2,
+        "parking": 1, "timeframe": "0-3 months", "owner_occ": True, "finance_status": "Pre-approved",
+        "preferred_suburbs": ["Richmond"],
+    })
+    body = response.json()
+    assert body["degraded"] and body["response"] == voice_agent.STATIC_FALLBACK_REPLY
+    assert body["booking"]["ok"] and body["lead_logged"]
+    assert "Retry-After" not in response.headers  # already booked: retrying would book twice
+
+def test_degraded_reply_without_booking_can_be_retried(monkeypatch):
+    saturated = controller(initial_limit=1, min_limit=1, queue_size=0)
+    saturated.in_flight = 1
+    monkeypatch.setattr(voice_agent, "llm_admission", saturated)
+    voice_agent.request_log.clear()
+    lead = {
+        "name": "Retry Buyer", "phone": "0412 000 044", "email": "retry@example.com",
+        "message": "What 2-beds do you have?", "budget": 1200000, "beds": 2, "parking": 1,
+        "timeframe": "0-3 months", "owner_occ": True, "finance_status": "Pre-approved",
+        "preferred_suburbs": ["Richmond"],
+    }
+    headers = {"Idempotency-Key": "degraded-retry"}
+    response = client.post("/call", json=lead, headers=headers)
+    assert response.json()["degraded"] and 1 <= int(response.headers["Retry-After"]) <= 30
+
+    saturated.in_flight = 0
+    retry = client.post("/call", json=lead, headers=headers)
+    assert "Idempotent-Replayed" not in retry.headers and not retry.json().get("degraded")
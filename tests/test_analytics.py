@@ -0,0 +1,51 @@
+import sqlite3
+import sys
+import os
+from datetime import date
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from analytics import migrate_rollups, rebuild_rollups, record_call, rollup_keys, rollup_stats
+from benchmarks.export_bench import build
+
+client = TestClient(voice_agent.app)
+
+def test_rollup_keys_map_suburbs_to_projects():
+    assert rollup_keys(["richmond ", "Richmond", "Nowhere"]) == [
+        ("all", ""), ("suburb", "Richmond"), ("suburb", "Nowhere"), ("project", "Harbourview Towers")
+    ]
+    assert rollup_keys(None) == [("all", "")]
+
+def test_record_call_and_stats():
+    db = sqlite3.connect(":memory:")
+    migrate_rollups(db)
+    lead = {"qualification": {"suburbs": ["Richmond", "Abbotsford"]}, "events": ["lead.booked"]}
+    record_call(db, lead, "2026-03-02T10:00:00+10:00", new_lead=True)
+    record_call(db, dict(lead, events=["lead.handoff"]), "2026-03-03T09:00:00+10:00", new_lead=False)
+    record_call(db, {"qualification": {}, "events": []}, "2026-01-01T09:00:00+10:00", new_lead=True)  # too old
+    stats = rollup_stats(db, days=7, today=date(2026, 3, 3))
+    assert stats["totals"] == {"calls": 2, "leads": 1, "bookings": 1, "handoffs": 1,
+                               "booking_rate": 0.5, "handoff_rate": 0.5}
+    assert [day["day"] for day in stats["by_day"]] == ["2026-03-02", "2026-03-03"]
+    assert stats["by_suburb"]["Richmond"]["calls"] == 2 and stats["by_project"]["Riverstone Place"]["bookings"] == 1
+
+def test_rebuild_matches_leads_table():
+    db = build(":memory:", 200)
+    assert rebuild_rollups(db) > 0
+    stats = rollup_stats(db, days=60, today=date(2026, 3, 28))
+    booked = db.execute("SELECT COUNT(*) FROM leads WHERE booking LIKE '%\"ok\": true%'").fetchone()[0]
+    assert stats["totals"]["leads"] == 200 and stats["totals"]["bookings"] == booked
+
+def test_call_updates_stats():
+    before = client.get("/stats?days=1").json()["totals"]
+    voice_agent.request_log.clear()
+    client.post("/call", json={
+        "name": "Stats Buyer", "phone": "0412 000 045", "email": "stats@example.com",
+        "message": "I want to book a visit to the display suite", "budget": 1200000, "beds": 2, "parking": 1,
+        "timeframe": "0-3 months", "owner_occ": True, "finance_status": "Pre-approved", "preferred_suburbs": ["Richmond"],
+    })
+    after = client.get("/stats?days=1").json()
+    assert after["totals"]["calls"] == before["calls"] + 1 and after["totals"]["bookings"] == before["bookings"] + 1
+    assert "Richmond" in after["by_suburb"] and "Harbourview Towers" in after["by_project"]
+    assert client.get("/stats?days=0").status_code == 422
@@ -0,0 +1,71 @@
+import json
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+
+client = TestClient(voice_agent.app, headers={"Authorization": "Bearer batch-secret"})
+voice_agent.BATCH_API_TOKEN = "batch-secret"
+
+LEAD = {
+    "name": "Batch Lead",
+    "phone": "0412999000",
+    "email": "batch@example.com",
+    "message": "Hi, I want to know about 2-bed apartments.",
+    "budget": 900000,
+    "beds": 2,
+    "parking": 1,
+    "timeframe": "3-6 months",
+    "owner_occ": True,
+    "finance_status": "Pre-approved",
+    "preferred_suburbs": ["Abbotsford"],
+}
+
+def parse_ndjson(response):
+    return {row["index"]: row for row in map(json.loads, response.text.splitlines())}
+
+def test_batch_json_list_streams_one_result_per_item():
+    voice_agent.request_log.clear()
+    items = [dict(LEAD, phone=f"04120000{i:02d}") for i in range(5)]
+    items.append(dict(LEAD, phone="0412999555", email="batch-unsub@example.com", message="please unsubscribe me"))
+    items.append({"name": "missing fields"})
+    response = client.post("/call/batch", json=items)
+    assert response.status_code == 200
+    rows = parse_ndjson(response)
+    assert sorted(rows) == list(range(7))
+    assert all(rows[i]["status"] == "ok" and "lead_id" in rows[i] for i in range(5))
+    assert rows[5]["compliance_flags"] == ["unsubscribe_request"] and "lead_id" not in rows[5]
+    assert rows[6]["status"] == "invalid"
+
+def test_batch_ndjson_body():
+    voice_agent.request_log.clear()
+    body = "\n".join(
+        json.dumps(dict(LEAD, phone=f"04130000{i:02d}", email=f"batch{i}@example.com")) for i in range(3)
+    ) + "\nnot json\n"
+    response = client.post("/call/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    rows = parse_ndjson(response)
+    assert [rows[i]["status"] for i in range(4)] == ["ok", "ok", "ok", "invalid"]
+    lead_ids = [rows[i]["lead_id"] for i in range(3)]
+    assert len(set(lead_ids)) == 3
+
+def test_log_leads_bulk_single_transaction():
+    call = voice_agent.CallRequest(**LEAD)
+    records = [(voice_agent.build_lead_data(call, {"ok": False}), [], "bulk-test") for _ in range(3)]
+    lead_ids = voice_agent.log_leads_bulk(records)
+    assert lead_ids == sorted(lead_ids) and len(lead_ids) == 3
+
+def test_batch_needs_token_and_charges_items(monkeypatch):
+    voice_agent.request_log.clear()
+    assert TestClient(voice_agent.app).post("/call/batch", json=[LEAD]).status_code == 403
+    monkeypatch.setattr(voice_agent, "BATCH_RATE_LIMIT_MAX_ITEMS", 2)
+    items = [dict(LEAD, phone=f"04140000{i:02d}", email=f"limit{i}@example.com") for i in range(3)]
+    rows = parse_ndjson(client.post("/call/batch", json=items))
+    assert sorted(row["status"] for row in rows.values()) == ["ok", "ok", "rate_limited"]
+
+def test_batch_rejects_unterminated_ndjson_line(monkeypatch):
+    voice_agent.request_log.clear()
+    monkeypatch.setattr(voice_agent, "BATCH_MAX_LINE_BYTES", 1000)
+    response = client.post("/call/batch", content=b"{" + b" " * 5000, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from benchmarks.load_test import percentile
+from benchmarks.workload import request_mix
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_request_mix_is_replayable():
+    first = list(request_mix(50, seed=7))
+    second = list(request_mix(50, seed=7))
+    assert first == second
+    assert {scenario for scenario, _ in first} >= {"browse", "follow_up"}
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+
+def test_load_test_smoke_with_location_block():
+    """Runs the real app against the stand-in providers in a clean subprocess (no CI shortcut)."""
+    env = {k: v for k, v in os.environ.items() if k not in ("CI", "GEMINI_API_KEY", "MISTRAL_API_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_test", "--profile", "location_block",
+         "--requests", "20", "--concurrency", "4", "--json"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout)
+    assert report["statuses"] == {"200": 20}
+    assert report["provider_calls"]["mistral"]["ok"] == report["provider_calls"]["gemini"]["location_block"]
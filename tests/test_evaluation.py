@@ -0,0 +1,44 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from evaluation import ResponseCache, builtin_corpus, run_evaluation, score_reply, summarize
+from usage import make_usage
+from voice_agent import CallRequest
+
+def call(**overrides):
+    return CallRequest(**dict({
+        "name": "Eval", "phone": "0400000000", "email": "eval@example.com", "message": "Hi", "budget": 800000,
+        "beds": 2, "parking": 1, "timeframe": "3-6 months", "owner_occ": True, "finance_status": "Exploring",
+        "preferred_suburbs": [],
+    }, **overrides))
+
+def test_heuristics():
+    good = score_reply(call(), "Gotcha! Yarra Edge in Footscray has 2-beds from $780k. Want to see the floor plans?")
+    assert all(good.values())
+    bad = score_reply(call(), "**Harbourview Towers** in Richmond is lovely.\n- rooftop pool")
+    assert bad == {"length": True, "ends_with_question": False, "right_project": False, "no_markdown": False}
+    # Follow-up turns don't have to name a project
+    assert score_reply(call(chat_history=[{"user": "Hi", "agent": "Hello"}]), "Yes, one car park. Keen?")["right_project"]
+
+def test_run_caches_replies_by_prompt(tmp_path):
+    calls = []
+
+    async def complete(prompt, route):
+        calls.append(route["gemini_model"])
+        return "Yarra Edge in Footscray fits your budget. Shall I book a visit?", [
+            make_usage("gemini", route["gemini_model"], 900, 40, 0.25)
+        ]
+
+    variants = [{"name": "lite", "tier": "lite"}, {"name": "pushy", "tier": "standard", "instruction": "Push a visit."}]
+    cases = builtin_corpus()[:3]
+    cache = ResponseCache(str(tmp_path))
+    results = asyncio.run(run_evaluation(variants, cases, concurrency=4, cache=cache, complete=complete))
+    assert len(results) == len(calls) == 6 and not any(result["cached"] for result in results)
+    report = summarize(results)
+    assert {row["variant"] for row in report} == {"lite", "pushy"}
+    assert report[0]["latency_p50_ms"] == 250.0 and report[0]["fallbacks"] == 0 and 0 < report[0]["quality"] <= 1
+
+    rerun = asyncio.run(run_evaluation(variants, cases, cache=cache, complete=complete))
+    assert len(calls) == 6 and all(result["cached"] for result in rerun)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import followups
+import voice_agent
+from followups import FollowupScheduler, next_business_open, within_business_hours
+from voice_agent import MELBOURNE_TZ
+
+TUESDAY_11AM = MELBOURNE_TZ.localize(datetime(2026, 3, 3, 11))
+
+def add_lead(phone, score, timeframe="0-3 months", days_old=5, qualification=None):
+    timestamp = (datetime.now(voice_agent.LEAD_TZ) - timedelta(days=days_old)).isoformat()
+    qualification = qualification or {"budget_band": "900000", "beds": 2, "parking": 1, "owner_occ": True,
+                     "timeframe": timeframe, "finance_status": "Pre-approved", "suburbs": ["Abbotsford"]}
+    voice_agent.cursor.execute(
+        "INSERT INTO leads (timestamp, caller_cli, summary, qualification, booking, compliance_flags, name, email, interest_score, timeframe) "
+        "VALUES (?, ?, '', ?, '{}', '[]', 'Follow Up', 'fu@example.com', ?, ?)",
+        (timestamp, phone, qualification if isinstance(qualification, str) else json.dumps(qualification), score, timeframe)
+    )
+    voice_agent.conn.commit()
+
+def statuses(campaign):
+    return dict(voice_agent.conn.execute(
+        "SELECT caller_cli, status FROM followups WHERE campaign = ?", (campaign,)
+    ).fetchall())
+
+def test_campaign_selects_warm_leads_and_respects_do_not_call():
+    add_lead("0400100001", score=6)
+    add_lead("0400100002", score=6, timeframe="12+ months")
+    add_lead("0400100003", score=1)
+    add_lead("0400100004", score=6, days_old=0)
+    add_lead("0400100005", score=3)
+    scheduler = FollowupScheduler(
+        "test-warm", min_score=3, timeframes=["0-3 months"], page_size=1,
+        do_not_call=lambda phone, email: phone == "0400100005", clock=lambda: TUESDAY_11AM
+    )
+    result = asyncio.run(scheduler.run())
+    assert statuses("test-warm") == {"0400100001": "generated", "0400100005": "suppressed"}
+    assert result["generated"] == 1 and result["suppressed"] == 1
+
+def test_campaign_resumes_from_checkpoint():
+    for i in range(5):
+        add_lead(f"04002000{i:02d}", score=7, timeframe="resume-test")
+    first = FollowupScheduler("test-resume", timeframes=["resume-test"], page_size=2, clock=lambda: TUESDAY_11AM)
+    asyncio.run(first.run(limit=3))
+    assert sorted(statuses("test-resume").values()) == ["generated"] * 3 + ["pending"] * 2
+
+    # A fresh scheduler (e.g. after a restart) finishes the pending rows; only newer leads are claimed
+    add_lead("0400200099", score=7, timeframe="resume-test")
+    second = FollowupScheduler("test-resume", timeframes=["resume-test"], page_size=2, clock=lambda: TUESDAY_11AM)
+    result = asyncio.run(second.run())
+    assert result["generated"] == 3
+    assert list(statuses("test-resume").values()) == ["generated"] * 6
+
+def test_invalid_leads_are_skipped_and_usage_is_recorded(monkeypatch):
+    add_lead("0400400001", score=7, timeframe="usage-test")
+    add_lead("0400400002", score=7, timeframe="usage-test", qualification="{not json")
+    add_lead("0400400003", score=7, timeframe="usage-test", qualification={"beds": "lots"})
+
+    async def fake_response(call, usage_log=None, route=None, instruction=None):
+        usage_log.append(voice_agent.make_usage("gemini", "gemini-2.5-flash", 1000, 200, 0.5))
+        return "Hi again!"
+
+    monkeypatch.setattr(followups, "generate_agent_response", fake_response)
+    scheduler = FollowupScheduler("test-usage", timeframes=["usage-test"], clock=lambda: TUESDAY_11AM)
+    result = asyncio.run(scheduler.run())
+    assert result["generated"] == 1 and result["skipped"] == 2
+    assert statuses("test-usage") == {"0400400001": "generated", "0400400002": "skipped", "0400400003": "skipped"}
+    cost = voice_agent.conn.execute(
+        "SELECT SUM(cost_usd) FROM llm_usage WHERE client_id = 'followup:test-usage'"
+    ).fetchone()[0]
+    assert cost > 0
+
+def test_updated_leads_behind_the_cursor_are_claimed():
+    add_lead("0400500001", score=1, timeframe="rescore-test")
+    add_lead("0400500002", score=7, timeframe="rescore-test")
+    scheduler = FollowupScheduler("test-rescore", timeframes=["rescore-test"], clock=lambda: TUESDAY_11AM)
+    asyncio.run(scheduler.run())
+    assert statuses("test-rescore") == {"0400500002": "generated"}
+
+    # A repeat call raises the first lead's score after the cursor has moved past it
+    voice_agent.conn.execute("UPDATE leads SET interest_score = 7, updated_at = ? WHERE caller_cli = '0400500001'",
+                             (datetime.now(voice_agent.LEAD_TZ).isoformat(),))
+    voice_agent.conn.commit()
+    asyncio.run(scheduler.run())
+    assert statuses("test-rescore") == {"0400500001": "generated", "0400500002": "generated"}
+
+def test_outside_business_hours_does_nothing():
+    add_lead("0400300001", score=9, timeframe="hours-test")
+    sunday = MELBOURNE_TZ.localize(datetime(2026, 3, 8, 11))
+    scheduler = FollowupScheduler("test-hours", timeframes=["hours-test"], clock=lambda: sunday)
+    assert asyncio.run(scheduler.run())["generated"] == 0
+    assert not within_business_hours(sunday)
+    assert next_business_open(sunday) == MELBOURNE_TZ.localize(datetime(2026, 3, 9, 9))
+    saturday_evening = MELBOURNE_TZ.localize(datetime(2026, 3, 7, 18))
+    assert next_business_open(saturday_evening) == MELBOURNE_TZ.localize(datetime(2026, 3, 9, 9))
+
+def test_selection_uses_score_index():
+    scheduler = FollowupScheduler("test-plan", timeframes=["0-3 months"], clock=lambda: TUESDAY_11AM)
+    scheduler.db = PlanRecorder(voice_agent.conn)
+    scheduler.select_leads(0)
+    plan = voice_agent.conn.execute("EXPLAIN QUERY PLAN " + scheduler.db.sql, scheduler.db.params).fetchall()
+    assert any("idx_leads_score_timeframe" in row[-1] for row in plan), plan
+
+class PlanRecorder:
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, sql, params=()):
+        self.sql, self.params = sql, params
+        return self.db.execute(sql, params)
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from idempotency import IdempotencyStore
+
+client = TestClient(voice_agent.app)
+
+PAYLOAD = {
+    "name": "Retry Tester",
+    "phone": "0412000111",
+    "email": "retry@example.com",
+    "message": "Hi, I want to know about 2-bed apartments.",
+    "budget": 900000,
+    "beds": 2,
+    "parking": 1,
+    "timeframe": "3-6 months",
+    "owner_occ": True,
+    "finance_status": "Pre-approved",
+    "preferred_suburbs": ["Abbotsford"],
+}
+
+def lead_count():
+    return voice_agent.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+def test_retry_with_same_key_replays_without_new_lead():
+    voice_agent.request_log.clear()
+    headers = {"Idempotency-Key": "test-retry-key-1"}
+    first = client.post("/call", json=PAYLOAD, headers=headers)
+    assert first.status_code == 200
+    leads_after_first = lead_count()
+
+    second = client.post("/call", json=PAYLOAD, headers=headers)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert lead_count() == leads_after_first
+
+def test_same_key_different_body_is_rejected():
+    voice_agent.request_log.clear()
+    headers = {"Idempotency-Key": "test-retry-key-2"}
+    assert client.post("/call", json=PAYLOAD, headers=headers).status_code == 200
+    changed = dict(PAYLOAD, message="Actually, tell me about 3-bed places")
+    assert client.post("/call", json=changed, headers=headers).status_code == 422
+
+def test_store_attaches_to_in_flight_attempt_and_forgets_failures():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"response": "ok"}
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def main():
+        results = await asyncio.gather(store.run("k", "fp", work), store.run("k", "fp", work))
+        try:
+            await store.run("bad", "fp", failing)
+        except RuntimeError:
+            pass
+        return results, "bad" in store._entries
+
+    (first, second), failed_kept = asyncio.run(main())
+    assert len(calls) == 1
+    assert first == ({"response": "ok"}, False) and second == ({"response": "ok"}, True)
+    assert not failed_kept
+
+def test_store_is_bounded():
+    store = IdempotencyStore(ttl_seconds=60, max_entries=3)
+
+    async def work():
+        return 1
+
+    async def main():
+        for i in range(10):
+            await store.run(f"key-{i}", "fp", work)
+
+    asyncio.run(main())
+    assert len(store) == 3
@@ -0,0 +1,103 @@
+import sqlite3
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from inventory import UnitInventory, demo_units, format_unit, migrate_units, parse_price, seed_demo_units, upsert_units
+from knowledge_pack import KNOWLEDGE_PACK
+from voice_agent import CallRequest, matching_units
+
+client = TestClient(voice_agent.app)
+
+UNITS = [
+    ("Yarra Edge", "101", 1, 2, 2, 1, 790000, "available"),
+    ("Yarra Edge", "102", 1, 2, 2, 0, 720000, "available"),
+    ("Yarra Edge", "1201", 12, 2, 2, 1, 880000, "available"),
+    ("Harbourview Towers", "301", 3, 2, 2, 1, 1050000, "available"),
+    ("Riverstone Place", "201", 2, 2, 2, 2, 860000, "sold"),
+    ("Riverstone Place", "202", 2, 1, 1, 0, 590000, "available"),
+]
+
+def make_inventory(units=UNITS):
+    db = sqlite3.connect(":memory:")
+    migrate_units(db)
+    upsert_units(db, units)
+    return UnitInventory(db)
+
+def test_parse_price():
+    assert parse_price("from $845,000 (1 car included)") == 845000
+    assert parse_price("from $1.05m") == 1050000
+    assert parse_price("POA") is None
+
+def test_search_filters_and_orders_by_price():
+    inventory = make_inventory()
+    units, total = inventory.search(max_price=900000, beds=2, min_parking=1)
+    assert [unit["unit"] for unit in units] == ["101", "1201"]
+    assert total == 2
+    units, total = inventory.search(max_price=900000, beds=2, min_parking=1, min_floor=10)
+    assert [unit["unit"] for unit in units] == ["1201"] and total is None
+    units, _ = inventory.search(suburbs=["richmond"])
+    assert [unit["project"] for unit in units] == ["Harbourview Towers"]
+    units, total = inventory.search(status="sold")
+    assert total == 1 and units[0]["unit"] == "201"
+    assert format_unit(units[0]) == "Riverstone Place 201 (Abbotsford): 2-bed, 2-bath, 2 cars, level 2, $860,000"
+
+def test_set_status_moves_unit_between_groups():
+    inventory = make_inventory()
+    first, _ = inventory.search(beds=2, limit=1)
+    assert inventory.set_status(first[0]["id"], "reserved")
+    units, total = inventory.search(beds=2)
+    assert first[0]["id"] not in [unit["id"] for unit in units] and total == 3
+    assert inventory.search(status="reserved")[0][0]["id"] == first[0]["id"]
+    assert inventory.db.execute("SELECT status FROM units WHERE id = ?", (first[0]["id"],)).fetchone()[0] == "reserved"
+    assert not inventory.set_status(999, "sold")
+
+def test_demo_units_start_from_pack_prices():
+    units = list(demo_units(KNOWLEDGE_PACK, per_project=16))
+    yarra_two_beds = [unit for unit in units if unit[0] == "Yarra Edge" and unit[3] == 2]
+    assert min(unit[6] for unit in yarra_two_beds) >= 780000
+    assert len({(unit[0], unit[1]) for unit in units}) == len(units)
+
+def test_refresh_picks_up_writes_from_other_connections(tmp_path):
+    path = str(tmp_path / "units.db")
+    db = sqlite3.connect(path)
+    migrate_units(db)
+    upsert_units(db, UNITS[:2])
+    inventory = UnitInventory(db)
+    assert not inventory.refresh()
+    importer = sqlite3.connect(path)
+    upsert_units(importer, UNITS[2:])
+    inventory.search(beds=2, min_parking=1)  # starts the rebuild on a background thread
+    inventory.wait_for_reload()
+    units, total = inventory.search(beds=2, min_parking=1)
+    assert total == 3 and [unit["unit"] for unit in units] == ["101", "1201", "301"]
+    assert inventory.set_status(units[0]["id"], "reserved") and not inventory.refresh()
+
+def test_prompt_without_unit_stock_falls_back_to_project_prices(monkeypatch):
+    monkeypatch.setattr(voice_agent, "unit_inventory", make_inventory([]))
+    call = CallRequest(
+        name="Empty Stock", phone="0400000002", email="empty@example.com", message="2-bed?", budget=900000,
+        beds=2, parking=1, timeframe="3-6 months", owner_occ=True, finance_status="Pre-approved", preferred_suburbs=[],
+    )
+    prompt = voice_agent.build_prompt(call)
+    assert "None in budget" not in prompt and "from\" prices" in prompt
+
+def test_units_search_endpoint_and_call_grounding():
+    if seed_demo_units(voice_agent.conn):
+        voice_agent.unit_inventory.reload()
+    response = client.get("/units/search", params={"max_price": 900000, "beds": 2, "min_parking": 1, "suburb": "Footscray"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["units"] and all(unit["suburb"] == "Footscray" and unit["price"] <= 900000 for unit in body["units"])
+    assert client.get("/units/search", params={"status": "gone"}).status_code == 400
+    assert client.get("/units/search", params={"limit": 1000}).status_code == 422
+
+    call = CallRequest(
+        name="Unit Test", phone="0400000001", email="units@example.com", message="2-bed with parking?",
+        budget=900000, beds=2, parking=1, timeframe="3-6 months", owner_occ=True,
+        finance_status="Pre-approved", preferred_suburbs=["Footscray"],
+    )
+    units = matching_units(call)
+    assert units and all(unit["price"] <= 900000 and unit["parking"] >= 1 for unit in units)
@@ -0,0 +1,55 @@
+import csv
+import io
+import sys
+import os
+import pytest
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from benchmarks.export_bench import build
+from lead_export import EXPORT_COLUMNS, export_leads
+
+client = TestClient(voice_agent.app)
+
+def exported_csv(db, **kwargs):
+    return list(csv.DictReader(io.StringIO(b"".join(export_leads(db, "csv", **kwargs)).decode())))
+
+def test_csv_export_expands_json_in_chunks():
+    db = build(":memory:", 25)
+    db.execute("UPDATE leads SET qualification = 'not json', compliance_flags = '[\"do_not_call\"]' WHERE id = 3")
+    chunks = list(export_leads(db, "csv", chunk_rows=10))
+    assert len(chunks) == 3  # header + rows arrive chunk by chunk
+    rows = exported_csv(db, chunk_rows=10)
+    assert len(rows) == 25 and list(rows[0]) == [name for name, _ in EXPORT_COLUMNS]
+    assert rows[0]["beds"] in {"1", "2", "3"} and "; " in rows[0]["suburbs"]
+    assert rows[2]["beds"] == "" and rows[2]["compliance_flags"] == "do_not_call"
+    booked = [row for row in rows if row["booked"] == "True"]
+    assert all(row["booking_id"].startswith("RS-") for row in booked)
+    assert len(exported_csv(db, since="2026-03-20")) == sum(row["updated_at"] >= "2026-03-20" for row in rows)
+
+def test_csv_export_neutralises_formulas():
+    db = build(":memory:", 3)
+    db.execute("UPDATE leads SET name = '=HYPERLINK(\"http://x\")', summary = '@SUM(A1)', caller_cli = '+61 412 000 001', email = '-1+1' WHERE id = 1")
+    row = exported_csv(db)[0]
+    assert row["name"] == "'=HYPERLINK(\"http://x\")" and row["summary"] == "'@SUM(A1)"
+    assert row["email"] == "'-1+1"
+    assert row["caller_cli"] == "+61 412 000 001" and row["id"] == "1"
+
+def test_parquet_export_has_one_row_group_per_chunk(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "leads.parquet"
+    path.write_bytes(b"".join(export_leads(build(":memory:", 25), "parquet", chunk_rows=10)))
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_rows == 25 and parquet.metadata.num_row_groups == 3
+    assert parquet.read().column("beds").to_pylist()[0] in {1, 2, 3}
+
+def test_export_endpoint_needs_token(monkeypatch):
+    assert client.get("/leads/export").status_code == 403
+    monkeypatch.setattr(voice_agent, "LEADS_EXPORT_TOKEN", "secret")
+    headers = {"Authorization": "Bearer secret"}
+    assert client.get("/leads/export", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/leads/export?format=xlsx", headers=headers).status_code == 400
+    response = client.get("/leads/export", headers=headers)
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[0].startswith("id,created_at,updated_at,name")
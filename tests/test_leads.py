@@ -0,0 +1,99 @@
+import json
+import sqlite3
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from leads import dedup_leads, merge_lead
+
+client = TestClient(voice_agent.app)
+
+LEAD = {
+    "name": "Repeat Buyer",
+    "phone": "0412 777 001",
+    "email": "Repeat.Buyer@example.com",
+    "message": "Hi, I want to know about 2-bed apartments.",
+    "budget": 900000,
+    "beds": 2,
+    "parking": 1,
+    "timeframe": "6-12 months",
+    "owner_occ": True,
+    "finance_status": "Exploring",
+    "preferred_suburbs": ["Abbotsford"],
+}
+
+def lead_row(identity):
+    return voice_agent.conn.execute(
+        "SELECT id, call_count, timeframe, qualification FROM leads WHERE identity = ?", (identity,)
+    ).fetchone()
+
+def test_repeat_caller_updates_one_lead():
+    voice_agent.request_log.clear()
+    client.post("/call", json=LEAD)
+    client.post("/call", json=dict(LEAD, phone="+61412777001", timeframe="0-3 months", message="Is parking included?"))
+    # New number, same email: still the same buyer
+    client.post("/call", json=dict(LEAD, phone="0499 000 111", email="repeat.buyer@EXAMPLE.com",
+                                   timeframe="0-3 months", finance_status="Pre-approved"))
+
+    lead_id, call_count, timeframe, qualification = lead_row("0412777001")
+    assert call_count == 3 and timeframe == "0-3 months"
+    assert json.loads(qualification)["finance_status"] == "Pre-approved"
+    assert lead_row("0499000111") is None
+    (transcript_id,) = voice_agent.conn.execute("SELECT transcript_id FROM leads WHERE id = ?", (lead_id,)).fetchone()
+    turns = voice_agent.transcript_store.turns(transcript_id)
+    assert [turn["user"] for turn in turns][1] == "Is parking included?" and len(turns) == 3
+
+def test_merge_keeps_booking_flags_and_best_score():
+    existing = {"name": "A", "qualification": {"beds": 2, "timeframe": "3-6 months"}, "booking": {"ok": True, "id": 1},
+                "compliance_flags": ["x"], "interest_score": 6}
+    update = {"name": "", "qualification": {"beds": 3, "timeframe": ""}, "booking": {"ok": False},
+              "compliance_flags": ["y"], "interest_score": 2}
+    merged = merge_lead(existing, update)
+    assert merged["name"] == "A" and merged["booking"]["ok"] and merged["interest_score"] == 6
+    assert merged["qualification"] == {"beds": 3, "timeframe": "3-6 months"}
+    assert merged["compliance_flags"] == ["x", "y"]
+
+def test_dedup_job_merges_legacy_rows_and_repoints_usage():
+    db = sqlite3.connect(":memory:")
+    db.execute("""CREATE TABLE leads (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, caller_cli TEXT, summary TEXT,
+                  qualification TEXT, booking TEXT, compliance_flags TEXT, transcript_url TEXT, recording_url TEXT)""")
+    db.execute("CREATE TABLE llm_usage (id INTEGER PRIMARY KEY AUTOINCREMENT, lead_id INTEGER)")
+    rows = [("0412000001", "3-6 months"), ("+61 412 000 002", "3-6 months"), ("0412000001", "0-3 months"),
+            ("0412-000-002", "0-3 months"), ("0412000003", "12+ months"), ("61412000001", "12+ months")]
+    for i, (phone, timeframe) in enumerate(rows):
+        db.execute("INSERT INTO leads (timestamp, caller_cli, summary, qualification, booking, compliance_flags) "
+                   "VALUES (?, ?, 's', ?, '{\"ok\": false}', '[]')", (f"2026-01-0{i + 1}", phone, json.dumps({"timeframe": timeframe})))
+        db.execute("INSERT INTO llm_usage (lead_id) VALUES (?)", (i + 1,))
+    db.commit()
+
+    assert dedup_leads(db) == {"merged": 3, "keys_backfilled": 3}
+    remaining = db.execute("SELECT id, identity, call_count, timeframe FROM leads ORDER BY id").fetchall()
+    assert remaining == [(1, "0412000001", 3, "12+ months"), (2, "0412000002", 2, "0-3 months"), (5, "0412000003", 1, "12+ months")]
+    assert db.execute("SELECT lead_id, COUNT(*) FROM llm_usage GROUP BY lead_id").fetchall() == [(1, 3), (2, 2), (5, 1)]
+    assert dedup_leads(db) == {"merged": 0, "keys_backfilled": 0}
+
+
+def test_dedup_job_folds_duplicate_transcripts_into_the_survivor(tmp_path):
+    from leads import migrate_leads
+    from transcripts import TranscriptStore
+
+    db = sqlite3.connect(":memory:")
+    db.execute("""CREATE TABLE leads (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, caller_cli TEXT, summary TEXT,
+                  qualification TEXT, booking TEXT, compliance_flags TEXT, transcript_url TEXT, recording_url TEXT)""")
+    migrate_leads(db)
+    store = TranscriptStore(db, directory=str(tmp_path))
+    # The survivor has no transcript yet, so it adopts the first duplicate's and gains the second's turns.
+    for i, transcript_id in enumerate([None, "t-first", "t-second"]):
+        db.execute("INSERT INTO leads (timestamp, caller_cli, summary, qualification, booking, compliance_flags, "
+                   "transcript_id, transcript_url) VALUES (?, '0412000001', 's', '{}', '{\"ok\": false}', '[]', ?, ?)",
+                   (f"2026-01-0{i + 1}", transcript_id, transcript_id and f"/transcripts/{transcript_id}"))
+        if transcript_id:
+            store.append(transcript_id, {"role": "user", "content": f"call {i}"})
+    db.commit()
+
+    assert dedup_leads(db)["merged"] == 2
+    assert db.execute("SELECT id, transcript_id, transcript_url FROM leads").fetchall() == [(1, "t-first", "/transcripts/t-first")]
+    assert [turn["content"] for turn in store.turns("t-first")] == ["call 1", "call 2"]
+    assert store.turns("t-second") == []
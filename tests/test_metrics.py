@@ -0,0 +1,64 @@
+import time
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+import metrics
+
+client = TestClient(voice_agent.app)
+
+def test_histogram_renders_prometheus_buckets():
+    hist = metrics.Histogram("test_latency_seconds", "test", label_names=("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "a")
+    hist.observe(0.5, "a")
+    hist.observe(5.0, "a")
+    text = "\n".join(hist.render())
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{stage="a"} 3' in text
+    assert hist.quantile(0.5, "a") == 1.0
+
+def test_metrics_endpoint_exposes_call_stages():
+    client.post("/call", json={
+        "name": "Test",
+        "phone": "0412345678",
+        "email": "test@example.com",
+        "message": "Hello",
+        "budget": 800000,
+        "beds": 2,
+        "parking": 1,
+        "timeframe": "3-6 months",
+        "owner_occ": True,
+        "finance_status": "Pre-approved",
+        "preferred_suburbs": ["Abbotsford"],
+    })
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "riverstone_stage_duration_seconds_bucket" in response.text
+    assert 'stage="rate_limit"' in response.text
+
+def test_instrumentation_overhead_is_microseconds():
+    # Typically 25-45 us for 7-9 stages; best of several runs, so a busy CI box doesn't fail it
+    stages = ["rate_limit", "scoring", "booking", "prompt_build", "gemini", "llm_total", "log_lead"]
+    iterations = 500
+    runs = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            trace = metrics.start_trace("overhead_probe")
+            for stage in stages:
+                with metrics.stage_timer(stage):
+                    pass
+            trace.finish()
+            trace.server_timing()
+        runs.append((time.perf_counter() - start) / iterations)
+    assert min(runs) < 50e-6
+
+def test_registering_a_name_again_replaces_the_series():
+    metrics.Gauge("riverstone_test_reregistered", "test", callback=lambda: 1)
+    metrics.Gauge("riverstone_test_reregistered", "test", callback=lambda: 2)
+    text = metrics.render_prometheus()
+    assert text.count("# TYPE riverstone_test_reregistered gauge") == 1 and "riverstone_test_reregistered 2" in text
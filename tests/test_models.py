@@ -0,0 +1,42 @@
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from voice_agent import CHAT_HISTORY_MAX_TURNS, CallRequest
+
+client = TestClient(voice_agent.app)
+
+LEAD = {
+    "name": "Model Tester",
+    "phone": "0412888001",
+    "email": "models@example.com",
+    "message": "Hi, I want to know about 2-bed apartments.",
+    "budget": 900000,
+    "beds": 2,
+    "parking": 1,
+    "timeframe": "3-6 months",
+    "owner_occ": True,
+    "finance_status": "Pre-approved",
+    "preferred_suburbs": ["Abbotsford"],
+}
+
+def test_long_history_keeps_recent_turns():
+    history = [{"user": f"question {i}", "agent": "answer"} for i in range(100)]
+    call = CallRequest(**LEAD, chat_history=history)
+    assert len(call.chat_history) == CHAT_HISTORY_MAX_TURNS
+    assert call.chat_history[-1] == {"user": "question 99", "agent": "answer"}
+
+def test_bounds_are_enforced():
+    voice_agent.request_log.clear()
+    assert client.post("/call", json=dict(LEAD, message="x" * 5000)).status_code == 422
+    assert client.post("/call", json=dict(LEAD, chat_history=[{"user": "hi"}])).status_code == 422
+    assert client.post("/call", json=dict(LEAD, preferred_suburbs=["Richmond"] * 21)).status_code == 422
+
+def test_response_shape_is_unchanged():
+    voice_agent.request_log.clear()
+    reply = client.post("/call", json=LEAD).json()
+    assert set(reply) == {"response", "booking", "human_handoff", "lead_logged"}
+    unsubscribe = client.post("/call", json=dict(LEAD, phone="0412888002", email="m2@example.com", message="stop"))
+    assert set(unsubscribe.json()) == {"response", "compliance_flags"}
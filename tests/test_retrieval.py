@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import retrieval
+from knowledge_pack import KNOWLEDGE_PACK
+from retrieval import BM25Index, build_knowledge_index, estimate_tokens
+from voice_agent import CallRequest, grounding_query
+
+DOCS = [
+    ("a", "Riverstone Place Abbotsford 2-bed apartments with parking"),
+    ("b", "Yarra Edge Footscray food scene and markets"),
+    ("c", "Harbourview Towers Richmond city views and parking"),
+]
+
+def test_ranking_prefers_matching_terms():
+    index = BM25Index(DOCS)
+    results = index.search("parking in Abbotsford", k=3)
+    assert [doc_id for _, doc_id, _ in results] == ["a", "c"]
+    assert index.search("nothing relevant", k=3) == []
+
+def test_add_replace_and_remove_through_delta(monkeypatch):
+    monkeypatch.setattr(retrieval, "RETRIEVAL_DELTA_LIMIT", 2)
+    index = BM25Index(DOCS)
+    index.add("d", "Collingwood Quarter warehouse lofts")
+    assert index.search("lofts")[0][1] == "d"
+    index.add("b", "Yarra Edge Footscray riverside lofts")  # replace
+    assert index.search("food scene") == []
+    assert {doc_id for _, doc_id, _ in index.search("lofts")} == {"b", "d"}
+    index.add("e", "Brunswick townhouses")  # past the delta limit: merged into postings
+    assert index._delta == {}
+    index.remove("d")
+    assert [doc_id for _, doc_id, _ in index.search("lofts")] == ["b"]
+    assert len(index) == 4
+    index.compact()
+    assert len(index) == 4 and [doc_id for _, doc_id, _ in index.search("lofts")] == ["b"]
+
+def test_snippets_fit_token_budget():
+    index = build_knowledge_index(KNOWLEDGE_PACK)
+    snippets = index.snippets("parking deposit Abbotsford 2-bed", token_budget=60)
+    assert snippets and sum(estimate_tokens(s) for s in snippets) <= 60
+
+def test_grounding_for_a_call():
+    call = CallRequest(
+        name="Ground Test", phone="0400000000", email="g@example.com", message="Is parking included?",
+        budget=850000, beds=2, parking=1, timeframe="3-6 months", owner_occ=True,
+        finance_status="Pre-approved", preferred_suburbs=["Footscray"],
+    )
+    snippets = build_knowledge_index(KNOWLEDGE_PACK).snippets(grounding_query(call))
+    assert any("Yarra Edge" in snippet for snippet in snippets)
+    assert any("parking" in snippet.lower() for snippet in snippets)
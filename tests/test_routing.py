@@ -0,0 +1,23 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from routing import MODEL_TIERS, choose_tier, classify_intent, route_for
+
+def test_classify_intent():
+    assert classify_intent("id love to book a visit") == "booking"
+    assert classify_intent("can i speak to someone") == "handoff"
+    assert classify_intent("what are the strata fees") == "question"
+    assert classify_intent("hi i want to know about 2bed apartments") == "browse"
+
+def test_tiers_follow_lead_value():
+    assert choose_tier(1, "just looking", "browse") == "lite"
+    assert choose_tier(5, "hi i want to know about 2bed apartments", "browse") == "standard"
+    assert choose_tier(1, "when is completion", "question") == "standard"
+    assert choose_tier(1, "x" * 400, "browse") == "standard"
+    assert choose_tier(8, "book a visit", "booking") == "premium"
+
+def test_cheaper_tiers_have_smaller_budgets():
+    assert MODEL_TIERS["lite"]["max_output_tokens"] < MODEL_TIERS["standard"]["max_output_tokens"] \
+        < MODEL_TIERS["premium"]["max_output_tokens"]
+    assert route_for("lite")["tier"] == "lite"
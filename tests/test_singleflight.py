@@ -0,0 +1,94 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import metrics
+from singleflight import SingleFlight
+
+def test_concurrent_identical_keys_share_one_call():
+    group = SingleFlight("test_share")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "reply"
+
+    async def main():
+        return await asyncio.gather(*(group.do("same", work) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["reply"] * 10
+    assert sum(owner for _, owner in results) == 1
+    assert group.inflight() == 0
+
+def test_leader_cancellation_does_not_cancel_followers_and_they_own_the_result():
+    group = SingleFlight("test_leader_cancel")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "reply"
+
+    async def main():
+        leader = asyncio.ensure_future(group.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    (result, owner), leader_cancelled = asyncio.run(main())
+    assert result == "reply" and owner  # charged to the follower, since the leader never got it
+    assert leader_cancelled
+
+def test_inflight_gauge_is_one_series_per_group():
+    group = SingleFlight("test_gauge")
+
+    async def main():
+        task = asyncio.ensure_future(group.do("key", lambda: asyncio.sleep(0.05)))
+        await asyncio.sleep(0.01)
+        text = metrics.render_prometheus()
+        await task
+        return text
+
+    text = asyncio.run(main())
+    assert 'riverstone_singleflight_inflight{group="test_gauge"} 1' in text
+    assert text.count("# TYPE riverstone_singleflight_inflight gauge") == 1
+
+def test_shared_call_cancelled_when_every_waiter_leaves():
+    group = SingleFlight("test_abandon")
+    state = {"cancelled": False}
+
+    async def work():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def main():
+        waiters = [asyncio.ensure_future(group.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert state["cancelled"]
+    assert group.inflight() == 0
+
+def test_errors_propagate_to_every_waiter():
+    group = SingleFlight("test_errors")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def main():
+        return await asyncio.gather(*(group.do("key", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,85 @@
+import sqlite3
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from suppression import BloomFilter, SuppressionList, normalise_phone, parse_entry
+
+client = TestClient(voice_agent.app)
+
+LEAD = {
+    "name": "Dnc Tester",
+    "phone": "+61 412 555 010",
+    "email": "dnc@example.com",
+    "message": "Hi, I want to know about 2-bed apartments.",
+    "budget": 900000,
+    "beds": 2,
+    "parking": 1,
+    "timeframe": "3-6 months",
+    "owner_occ": True,
+    "finance_status": "Pre-approved",
+    "preferred_suburbs": ["Abbotsford"],
+}
+
+def test_normalisation():
+    assert normalise_phone("+61 412 555 010") == normalise_phone("0412-555-010") == "0412555010"
+    assert parse_entry(" Someone@Example.COM ") == "e:someone@example.com"
+    assert parse_entry("Phone") is None
+
+def test_unsubscribe_is_persisted_and_checked_before_rate_limit():
+    voice_agent.request_log.clear()
+    unsubscribe = client.post("/call", json=dict(LEAD, message="Please stop calling me"))
+    assert unsubscribe.json()["compliance_flags"] == ["unsubscribe_request"]
+
+    # Same number in another format: refused without using a rate-limit slot or logging a lead
+    voice_agent.request_log.clear()
+    leads_before = voice_agent.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+    again = client.post("/call", json=dict(LEAD, phone="0412555010", email="other@example.com"))
+    assert again.json()["compliance_flags"] == ["do_not_call"]
+    assert not voice_agent.request_log
+    assert voice_agent.conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0] == leads_before
+
+def test_only_clear_opt_outs_unsubscribe():
+    for message in ["Stop.", "Please unsubscribe me", "Don't call me again", "stop contacting me"]:
+        assert voice_agent.score_call(voice_agent.CallRequest(**dict(LEAD, message=message)))["unsubscribe"], message
+    for message in ["Is it near a bus stop?", "Non-stop trams to the CBD?", "Can you call me after 5?"]:
+        assert not voice_agent.score_call(voice_agent.CallRequest(**dict(LEAD, message=message)))["unsubscribe"], message
+
+    voice_agent.request_log.clear()
+    reply = client.post("/call", json=dict(LEAD, phone="0412555011", email="bus@example.com",
+                                           message="Is it close to a tram stop?"))
+    assert reply.json().get("compliance_flags") != ["unsubscribe_request"]
+    assert not voice_agent.suppression_list.is_suppressed("0412555011", "bus@example.com")
+
+def test_bulk_import_and_bloom_mode():
+    db = sqlite3.connect(":memory:")
+    suppression = SuppressionList(db, set_limit=1000)
+    entries = ["Phone"] + [f"04{i:08d}" for i in range(5000)] + ["0400000001"]
+    assert suppression.bulk_import(entries, source="test") == (5002, 5000)
+    assert suppression._bloom is not None  # over set_limit → Bloom filter + indexed confirmation
+    assert suppression.is_suppressed(phone="+61 400 004 999")
+    assert not suppression.is_suppressed(phone="0499999999")
+
+    # Rows written by another process are picked up incrementally
+    other = SuppressionList(db, set_limit=1000, refresh_seconds=0)
+    suppression.add(["p:0488888888"])
+    assert other.is_suppressed(phone="0488888888")
+
+def test_file_databases_refresh_in_the_background(tmp_path):
+    path = str(tmp_path / "dnc.db")
+    writer = SuppressionList(sqlite3.connect(path))
+    server = SuppressionList(sqlite3.connect(path), refresh_seconds=0)
+    assert writer.bulk_import([f"04{i:08d}" for i in range(300)], source="test", chunk_size=100) == (300, 300)
+    server.is_suppressed(phone="0400000299")  # starts the refresh on a background thread
+    server.wait_for_refresh()
+    assert server.is_suppressed(phone="0400000299") and server.loaded == 300
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(10000, false_positive_rate=0.01)
+    for i in range(10000):
+        bloom.add(f"in-{i}")
+    assert all(f"in-{i}" in bloom for i in range(10000))
+    false_positives = sum(f"out-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from tasks import TASKS, TaskQueue
+
+client = TestClient(voice_agent.app)
+
+def make_queue(**kwargs):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE effects (value TEXT)")
+    return TaskQueue(db, backoff_seconds=0, export_metrics=False, **kwargs)
+
+def test_failed_tasks_retry_then_dead_letter_and_roll_back():
+    queue = make_queue(max_attempts=3)
+    calls = []
+
+    @queue.handler("flaky")
+    def flaky(payload):
+        calls.append(payload["n"])
+        queue.db.execute("INSERT INTO effects VALUES ('partial')")
+        if len(calls) < 3 or payload["n"] == 2:
+            raise RuntimeError("boom")
+
+    queue.enqueue("flaky", {"n": 1})
+    asyncio.run(queue.drain())
+    assert calls == [1, 1, 1]
+    # Only the successful attempt's write survived
+    assert queue.db.execute("SELECT COUNT(*) FROM effects").fetchone()[0] == 1
+    assert queue.stats() == {}
+
+    queue.enqueue("flaky", {"n": 2})
+    asyncio.run(queue.drain())
+    assert queue.stats() == {"dead": 1}
+    assert TASKS.value("flaky", "dead") >= 1
+    assert queue.retry_dead() == 1 and queue.depth() == 1
+
+def test_unknown_kind_is_rejected():
+    queue = make_queue()
+    try:
+        queue.enqueue("missing", {})
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+def test_claimed_tasks_run_once_and_leftovers_survive_restart():
+    queue = make_queue()
+    seen = []
+    queue.handler("note")(lambda payload: seen.append(payload))
+    queue.enqueue("note", {"id": 7})
+    assert len(queue._claim(10)) == 1
+    assert queue._claim(10) == []  # already claimed by a worker
+    # A process that died mid-task leaves the row pending; the next one runs it
+    restarted = TaskQueue(queue.db, backoff_seconds=0, export_metrics=False)
+    restarted.handler("note")(lambda payload: seen.append(payload))
+    asyncio.run(restarted.drain())
+    assert seen == [{"id": 7}] and restarted.depth() == 0
+
+def test_call_logs_lead_after_response():
+    voice_agent.request_log.clear()
+    response = client.post("/call", json={
+        "name": "Queue Tester", "phone": "0412 000 040", "email": "queue@example.com",
+        "message": "Tell me about 1-bed options", "budget": 600000, "beds": 1, "parking": 0,
+        "timeframe": "6-12 months", "owner_occ": False, "finance_status": "Exploring",
+        "preferred_suburbs": ["Footscray"],
+    })
+    assert response.json()["lead_logged"]
+    # The background task ran once the response was sent
+    assert voice_agent.conn.execute("SELECT COUNT(*) FROM leads WHERE identity = '0412000040'").fetchone()[0] == 1
+    assert voice_agent.task_queue.depth() == 0
+    assert "riverstone_task_queue_depth 0" in client.get("/metrics").text
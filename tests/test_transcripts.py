@@ -0,0 +1,66 @@
+import json
+import sqlite3
+import sys
+import os
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from leads import migrate_lead_turns
+from transcripts import TranscriptStore
+
+client = TestClient(voice_agent.app)
+
+def test_segments_roll_over_and_frames_stay_small(tmp_path):
+    store = TranscriptStore(sqlite3.connect(":memory:"), str(tmp_path), segment_bytes=1000)
+    for i in range(40):
+        store.append("a" if i % 2 else "b", {"timestamp": f"t{i}", "user": f"Is parking included with the 2-bed? ({i})",
+                                             "agent": "Yes, every 2-bed apartment includes one car park."})
+    store.db.commit()
+    turns = store.turns("a")
+    assert len(turns) == 20 and turns[0] == {"timestamp": "t1", "user": "Is parking included with the 2-bed? (1)",
+                                             "agent": "Yes, every 2-bed apartment includes one car park."}
+    stats = store.stats()
+    assert stats["segments"] > 1 and stats["turns"] == 40 and stats["bytes_per_turn"] < 100
+    assert store.turns("missing") == []
+
+    # Reopening continues the last segment; earlier frames are still readable
+    reopened = TranscriptStore(store.db, str(tmp_path), segment_bytes=1000)
+    reopened.append("a", {"timestamp": "t40", "user": "Thanks", "agent": "Talk soon"})
+    assert reopened.stats()["segments"] == stats["segments"] and reopened.turns("a")[-1]["user"] == "Thanks"
+
+def test_lead_links_to_streamed_transcript():
+    voice_agent.request_log.clear()
+    lead = {"name": "Transcript Buyer", "phone": "0412 000 143", "email": "transcript@example.com",
+            "message": "Do the 2-beds have balconies?", "budget": 900000, "beds": 2, "parking": 1,
+            "timeframe": "6-12 months", "owner_occ": True, "finance_status": "Exploring", "preferred_suburbs": []}
+    client.post("/call", json=lead)
+    client.post("/call", json=dict(lead, message="And is parking included?"))
+    transcript_url, recording_url = voice_agent.conn.execute(
+        "SELECT transcript_url, recording_url FROM leads WHERE identity = '0412000143'"
+    ).fetchone()
+    assert transcript_url.startswith("/transcripts/") and recording_url is None
+    response = client.get(transcript_url)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    turns = [json.loads(line) for line in response.text.splitlines()]
+    assert [turn["user"] for turn in turns] == ["Do the 2-beds have balconies?", "And is parking included?"]
+    assert turns[0]["agent"] == "Test response"
+    assert client.get("/transcripts/unknown").status_code == 404
+
+def test_legacy_lead_turns_move_into_the_store(tmp_path):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE leads (id INTEGER PRIMARY KEY, transcript_id TEXT, transcript_url TEXT)")
+    db.execute("CREATE TABLE lead_turns (id INTEGER PRIMARY KEY, lead_id INTEGER, timestamp TEXT, user_message TEXT, agent_reply TEXT)")
+    db.executemany("INSERT INTO leads (id) VALUES (?)", [(1,), (2,)])
+    store = TranscriptStore(db, str(tmp_path))
+    db.execute("UPDATE leads SET transcript_id = 'newer' WHERE id = 2")
+    store.append("newer", {"timestamp": "t3", "user": "new", "agent": "reply"})
+    db.executemany("INSERT INTO lead_turns (lead_id, timestamp, user_message, agent_reply) VALUES (?, ?, ?, ?)",
+                   [(2, "t1", "old 1", "a1"), (1, "t0", "first", "a0"), (2, "t2", "old 2", "a2"), (9, "t0", "gone", "")])
+    db.commit()
+
+    assert migrate_lead_turns(db, store) == 3
+    assert [turn["user"] for turn in store.turns("newer")] == ["old 1", "old 2", "new"]
+    transcript_id, url = db.execute("SELECT transcript_id, transcript_url FROM leads WHERE id = 1").fetchone()
+    assert url == f"/transcripts/{transcript_id}" and store.turns(transcript_id)[0]["user"] == "first"
+    assert migrate_lead_turns(db, store) == 0
@@ -0,0 +1,48 @@
+import sys
+import os
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from usage import UsageTracker, estimate_cost, gemini_usage, make_usage, mistral_usage
+
+def test_usage_extraction_from_provider_responses():
+    gemini_response = SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=1000, candidates_token_count=100, thoughts_token_count=50))
+    usage = gemini_usage(gemini_response, "gemini-2.5-flash", 0.25)
+    assert (usage["input_tokens"], usage["output_tokens"]) == (1000, 150)
+    assert usage["latency_ms"] == 250.0
+    assert usage["cost_usd"] == estimate_cost("gemini-2.5-flash", 1000, 150)
+
+    mistral_response = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=400, completion_tokens=60))
+    usage = mistral_usage(mistral_response, "mistral-small-latest", 0.1)
+    assert (usage["provider"], usage["input_tokens"], usage["output_tokens"]) == ("mistral", 400, 60)
+
+def test_budget_downgrades_then_templates():
+    tracker = UsageTracker(daily_budget=0.001, hard_limit=0.002)
+    assert tracker.budget_action("1.2.3.4") == "normal"
+    tracker.record("1.2.3.4", make_usage("gemini", "gemini-2.5-flash", 2000, 200, 0.2))
+    assert tracker.budget_action("1.2.3.4") == "cheaper_model"
+    tracker.record("1.2.3.4", make_usage("gemini", "gemini-2.5-flash", 2000, 200, 0.2))
+    assert tracker.budget_action("1.2.3.4") == "template"
+    assert tracker.budget_action("5.6.7.8") == "normal"
+
+    summary = tracker.summary("1.2.3.4")
+    assert summary["models"][0]["calls"] == 2
+    assert summary["total_input_tokens"] == 4000
+    assert summary["downgrades"] == {"cheaper_model": 1, "template": 1}
+
+def test_budgets_are_off_without_a_daily_budget():
+    tracker = UsageTracker(daily_budget=0, hard_limit=0)
+    tracker.record("10.0.0.1", make_usage("gemini", "gemini-2.5-flash", 2000, 200, 0.2))
+    assert tracker.budget_action("10.0.0.1") == "normal"
+
+def test_usage_endpoint_needs_the_export_token(monkeypatch):
+    client = TestClient(voice_agent.app)
+    monkeypatch.setattr(voice_agent, "LEADS_EXPORT_TOKEN", None)
+    assert client.get("/usage").status_code == 403
+    monkeypatch.setattr(voice_agent, "LEADS_EXPORT_TOKEN", "secret")
+    assert client.get("/usage", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/usage?client_id=1.2.3.4", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200 and "models" in response.json()
@@ -0,0 +1,74 @@
+import asyncio
+import sqlite3
+import sys
+import os
+import httpx
+from fastapi.testclient import TestClient
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import voice_agent
+from benchmarks.mock_crm import MockCRMServer
+from webhooks import WebhookOutbox, lead_events
+
+LEAD = {"caller_cli": "0412000041", "name": "Hook Tester", "email": "hook@example.com", "interest_score": 7,
+        "summary": "2-bed", "qualification": {"beds": 2}, "booking": {"ok": True, "booking_id": "RS-1"}}
+
+def make_outbox(endpoints, **kwargs):
+    return WebhookOutbox(sqlite3.connect(":memory:"), endpoints=endpoints, backoff_seconds=0, export_metrics=False, **kwargs)
+
+def test_lead_events():
+    assert lead_events({"ok": True}, False) == ["lead.booked"]
+    assert lead_events({"ok": False}, True) == ["lead.handoff"]
+    assert lead_events({"ok": False}, False) == []
+
+def test_batches_are_gzipped_and_delivered_over_one_connection():
+    with MockCRMServer() as crm:
+        outbox = make_outbox([crm.url], batch_size=50)
+        for lead_id in range(120):
+            outbox.emit("lead.booked", lead_id, LEAD, "2026-03-01T10:00:00+10:00")
+        outbox.db.commit()
+
+        async def deliver():
+            delivered = await outbox.flush()
+            await outbox.stop()
+            return delivered
+
+        assert asyncio.run(deliver()) == 120
+    assert crm.batches == 3 and crm.connections == 1
+    assert sorted(event["lead_id"] for event in crm.events) == list(range(120))
+    assert crm.events[0]["lead"]["booking"]["booking_id"] == "RS-1"
+    stats = outbox.stats()[crm.url]
+    assert stats["pending"] == 0 and stats["delivered"] >= 120
+
+def test_retries_then_dead_letters():
+    statuses = iter([503, 200])
+    transport = httpx.MockTransport(lambda request: httpx.Response(next(statuses)))
+    outbox = make_outbox(["http://crm.test/hooks"], transport=transport)
+    outbox.emit("lead.handoff", 1, LEAD, "2026-03-01T10:00:00+10:00")
+    outbox.db.commit()
+    assert asyncio.run(outbox.flush()) == 0  # 503: rescheduled (zero backoff, so due again at once)
+    assert outbox.db.execute("SELECT attempts, status FROM webhook_events").fetchone() == (1, "pending")
+    assert asyncio.run(outbox.flush()) == 1
+    assert outbox.pending() == 0
+
+    rejected = make_outbox(["http://crm.test/hooks"], transport=httpx.MockTransport(lambda request: httpx.Response(400)))
+    rejected.emit("lead.booked", 2, LEAD, "2026-03-01T10:00:00+10:00")
+    asyncio.run(rejected.flush())
+    assert rejected.stats()["http://crm.test/hooks"]["dead"] == 1
+    assert rejected.retry_dead() == 1 and rejected.pending() == 1
+
+def test_booked_call_emits_event_with_its_lead(monkeypatch):
+    monkeypatch.setattr(voice_agent.webhook_outbox, "endpoints", ["http://crm.test/hooks"])
+    voice_agent.request_log.clear()
+    TestClient(voice_agent.app).post("/call", json={
+        "name": "Hot Buyer", "phone": "0412 000 042", "email": "hot@example.com",
+        "message": "I'd love to book a visit to see the display suite", "budget": 1200000, "beds": 2,
+        "parking": 1, "timeframe": "0-3 months", "owner_occ": True, "finance_status": "Pre-approved",
+        "preferred_suburbs": ["Richmond"],
+    })
+    events = voice_agent.conn.execute(
+        "SELECT event FROM webhook_events WHERE endpoint = 'http://crm.test/hooks'"
+    ).fetchall()
+    assert len(events) == 1 and '"type":"lead.booked"' in events[0][0]
+    voice_agent.conn.execute("DELETE FROM webhook_events")
+    voice_agent.conn.commit()
@@ -0,0 +1,178 @@
+"""
+Append-only transcript store: every conversation turn, compressed, outside leads.db.
+
+    python -m transcripts show <transcript_id>
+    python -m transcripts stats
+"""
+import argparse
+import json
+import mmap
+import os
+import secrets
+import sqlite3
+import struct
+import zlib
+from pydantic_core import from_json, to_json
+
+# ---------------------------
+# Segments
+# ---------------------------
+# Turns are appended as frames to numbered segment files under TRANSCRIPT_DIR; a new segment is
+# started once the current one reaches TRANSCRIPT_SEGMENT_BYTES, and nothing is rewritten. A frame
+# is a small header (magic, codec, payload length, CRC32) plus the turn as JSON, deflated against a
+# preset dictionary of call vocabulary so even one short turn compresses well on its own.
+# leads.db keeps only the offset index (transcript_turns: segment, offset, length per turn), written
+# in the caller's transaction: a frame whose lead write rolls back is simply never referenced.
+# Reads memory-map the segment and decompress one frame at a time.
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_SEGMENT_BYTES = int(os.getenv("TRANSCRIPT_SEGMENT_BYTES", 64 * 1024 * 1024))
+FRAME_HEADER = struct.Struct("<2sBII")  # magic, codec, payload length, crc32 of payload
+FRAME_MAGIC = b"RT"
+CODEC_DEFLATE_V1 = 1
+# Frames written with CODEC_DEFLATE_V1 can only be read with exactly this dictionary: extend it
+# under a new codec number, never edit it in place.
+DEFLATE_DICTIONARY_V1 = (
+    b'{"transcript_id":"","timestamp":"2026-01-01T10:00:00.000000+10:00","user":"","agent":""}'
+    b" Harbourline Developments Riverstone Richmond Abbotsford Collingwood Melbourne apartment"
+    b" apartments townhouse one-bedroom 1-bed 2-bed 3-bed bedroom bedrooms bathroom car park parking"
+    b" display suite inspection visit book a time budget price deposit finance pre-approved"
+    b" owner occupier investor settlement completion floor plan balcony views level"
+    b" Thanks for your interest! I'd love to help you find the right home. Would you like to"
+    b" What is your budget? How many bedrooms are you looking for? I can book you in for"
+)
+TRANSCRIPT_ID_BYTES = 12
+
+
+def migrate_transcripts(db):
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS transcript_turns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transcript_id TEXT NOT NULL,
+        segment INTEGER NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL
+    )
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_transcript_turns_transcript ON transcript_turns (transcript_id)")
+    db.commit()
+
+
+def new_transcript_id():
+    """Unguessable id; transcripts are served by id alone."""
+    return secrets.token_hex(TRANSCRIPT_ID_BYTES)
+
+
+def encode_frame(turn):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=DEFLATE_DICTIONARY_V1)
+    payload = compressor.compress(to_json(turn)) + compressor.flush()
+    return FRAME_HEADER.pack(FRAME_MAGIC, CODEC_DEFLATE_V1, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_frame(frame):
+    magic, codec, length, crc = FRAME_HEADER.unpack_from(frame)
+    payload = frame[FRAME_HEADER.size:FRAME_HEADER.size + length]
+    if magic != FRAME_MAGIC or codec != CODEC_DEFLATE_V1 or len(payload) != length or zlib.crc32(payload) != crc:
+        raise ValueError("corrupt transcript frame")
+    decompressor = zlib.decompressobj(-15, zdict=DEFLATE_DICTIONARY_V1)
+    return from_json(decompressor.decompress(payload) + decompressor.flush())
+
+
+class TranscriptStore:
+    def __init__(self, db, directory=TRANSCRIPT_DIR, segment_bytes=TRANSCRIPT_SEGMENT_BYTES):
+        self.db = db
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._segment = None
+        self._file = None
+        self._maps = {}  # segment -> mmap, remapped when the active segment has grown past it
+        migrate_transcripts(db)
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{segment:06d}.seg")
+
+    def _open_segment(self):
+        if self._segment is None:
+            os.makedirs(self.directory, exist_ok=True)
+            segments = [int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".seg")]
+            self._segment = max(segments, default=1)
+        elif self._file.tell() < self.segment_bytes:
+            return
+        else:
+            self._file.close()
+            self._segment += 1
+        self._file = open(self._path(self._segment), "ab")
+        if self._file.tell() >= self.segment_bytes:
+            self._open_segment()
+
+    def append(self, transcript_id, turn):
+        """Append one turn (a JSON-able dict) without committing the index row."""
+        self._open_segment()
+        frame = encode_frame(dict(turn, transcript_id=transcript_id))
+        offset = self._file.tell()
+        self._file.write(frame)
+        self._file.flush()
+        self.db.execute(
+            "INSERT INTO transcript_turns (transcript_id, segment, offset, length) VALUES (?, ?, ?, ?)",
+            (transcript_id, self._segment, offset, len(frame))
+        )
+
+    def locate(self, transcript_id):
+        """(segment, offset, length) of each turn in order; empty for an unknown transcript."""
+        return self.db.execute(
+            "SELECT segment, offset, length FROM transcript_turns WHERE transcript_id = ? ORDER BY id",
+            (transcript_id,)
+        ).fetchall()
+
+    def _map(self, segment, end):
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            with open(self._path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def read(self, locations):
+        """Yield turns for locate() results, decompressing one frame at a time."""
+        for segment, offset, length in locations:
+            turn = decode_frame(self._map(segment, offset + length)[offset:offset + length])
+            turn.pop("transcript_id", None)
+            yield turn
+
+    def turns(self, transcript_id):
+        return list(self.read(self.locate(transcript_id)))
+
+    def stats(self):
+        turns, transcripts, stored = self.db.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT transcript_id), COALESCE(SUM(length), 0) FROM transcript_turns"
+        ).fetchone()
+        segments = sorted(name for name in os.listdir(self.directory) if name.endswith(".seg")) \
+            if os.path.isdir(self.directory) else []
+        return {
+            "transcripts": transcripts,
+            "turns": turns,
+            "segments": len(segments),
+            "segment_bytes": sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments),
+            "indexed_bytes": stored,
+            "bytes_per_turn": round(stored / turns, 1) if turns else None,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["show", "stats"])
+    parser.add_argument("transcript_id", nargs="?")
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    parser.add_argument("--dir", default=TRANSCRIPT_DIR)
+    args = parser.parse_args(argv)
+    store = TranscriptStore(sqlite3.connect(args.db), args.dir)
+    if args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+        return
+    if not args.transcript_id:
+        parser.error("show needs a transcript_id")
+    for turn in store.read(store.locate(args.transcript_id)):
+        print(json.dumps(turn))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+import threading
+from datetime import datetime, timezone
+from metrics import Counter
+
+# ---------------------------
+# Token & cost accounting
+# ---------------------------
+# USD per 1M tokens (input, output). List prices at time of writing — update when they change.
+MODEL_PRICING = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "mistral-small-latest": (0.10, 0.30),
+    "mistral-medium-latest": (0.40, 2.00),
+    "mistral-large-latest": (2.00, 6.00),
+}
+
+# Per-client (IP) daily spend. Over budget → cheapest model tier (routing.BUDGET_TIER);
+# over hard limit → template reply. Off (0) by default: clients are keyed on request.client.host, which
+# behind a proxy is the proxy's address for every caller unless uvicorn is told to trust its
+# X-Forwarded-For (--forwarded-allow-ips), so one busy day would downgrade everyone at once.
+CLIENT_DAILY_BUDGET_USD = float(os.getenv("CLIENT_DAILY_BUDGET_USD", "0"))
+CLIENT_HARD_LIMIT_USD = float(os.getenv("CLIENT_HARD_LIMIT_USD", str(CLIENT_DAILY_BUDGET_USD * 2)))
+
+LLM_TOKENS = Counter(
+    "riverstone_llm_tokens_total",
+    "LLM tokens by provider, model and direction",
+    label_names=("provider", "model", "direction"),
+)
+LLM_COST = Counter(
+    "riverstone_llm_cost_usd_total",
+    "Estimated LLM spend in USD by provider and model",
+    label_names=("provider", "model"),
+)
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def make_usage(provider, model, input_tokens, output_tokens, latency_s, ok=True):
+    return {
+        "provider": provider,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "latency_ms": round(latency_s * 1000, 1),
+        "cost_usd": estimate_cost(model, input_tokens, output_tokens),
+        "ok": ok,
+    }
+
+
+def gemini_usage(response, model, latency_s):
+    """Usage from a google-genai response; thinking tokens are billed as output."""
+    meta = getattr(response, "usage_metadata", None)
+    input_tokens = (getattr(meta, "prompt_token_count", None) or 0) if meta else 0
+    output_tokens = 0
+    if meta:
+        output_tokens = (meta.candidates_token_count or 0) + (getattr(meta, "thoughts_token_count", None) or 0)
+    return make_usage("gemini", model, input_tokens, output_tokens, latency_s)
+
+
+def mistral_usage(response, model, latency_s):
+    usage = getattr(response, "usage", None)
+    input_tokens = (getattr(usage, "prompt_tokens", None) or 0) if usage else 0
+    output_tokens = (getattr(usage, "completion_tokens", None) or 0) if usage else 0
+    return make_usage("mistral", model, input_tokens, output_tokens, latency_s)
+
+
+class UsageTracker:
+    """In-memory usage aggregates by provider/model and per-client daily spend for budgets."""
+
+    def __init__(self, daily_budget=CLIENT_DAILY_BUDGET_USD, hard_limit=CLIENT_HARD_LIMIT_USD):
+        self.daily_budget = daily_budget
+        self.hard_limit = hard_limit
+        self.by_model = {}
+        self.client_spend = {}
+        self.day = None
+        self.downgrades = {"cheaper_model": 0, "template": 0}
+        self._lock = threading.Lock()
+
+    def _roll_day(self):
+        today = datetime.now(timezone.utc).date().isoformat()
+        if today != self.day:
+            self.day = today
+            self.client_spend = {}
+
+    def record(self, client_id, usage):
+        key = (usage["provider"], usage["model"])
+        with self._lock:
+            self._roll_day()
+            totals = self.by_model.get(key)
+            if totals is None:
+                totals = self.by_model[key] = {"calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0,
+                                               "cost_usd": 0.0, "latency_ms_total": 0.0}
+            totals["calls"] += 1
+            totals["errors"] += 0 if usage["ok"] else 1
+            totals["input_tokens"] += usage["input_tokens"]
+            totals["output_tokens"] += usage["output_tokens"]
+            totals["cost_usd"] += usage["cost_usd"]
+            totals["latency_ms_total"] += usage["latency_ms"]
+            self.client_spend[client_id] = self.client_spend.get(client_id, 0.0) + usage["cost_usd"]
+        LLM_TOKENS.inc(*key, "input", amount=usage["input_tokens"])
+        LLM_TOKENS.inc(*key, "output", amount=usage["output_tokens"])
+        LLM_COST.inc(*key, amount=usage["cost_usd"])
+
+    def spend(self, client_id):
+        with self._lock:
+            self._roll_day()
+            return self.client_spend.get(client_id, 0.0)
+
+    def budget_action(self, client_id):
+        """'normal', 'cheaper_model' (over daily budget) or 'template' (over hard limit); always 'normal' with no budget."""
+        if not self.daily_budget:
+            return "normal"
+        spent = self.spend(client_id)
+        if spent >= self.hard_limit:
+            action = "template"
+        elif spent >= self.daily_budget:
+            action = "cheaper_model"
+        else:
+            return "normal"
+        with self._lock:
+            self.downgrades[action] += 1
+        return action
+
+    def summary(self, client_id=None):
+        with self._lock:
+            self._roll_day()
+            models = []
+            for (provider, model), totals in sorted(self.by_model.items()):
+                calls = totals["calls"]
+                models.append({
+                    "provider": provider,
+                    "model": model,
+                    "calls": calls,
+                    "errors": totals["errors"],
+                    "input_tokens": totals["input_tokens"],
+                    "output_tokens": totals["output_tokens"],
+                    "cost_usd": round(totals["cost_usd"], 6),
+                    "avg_latency_ms": round(totals["latency_ms_total"] / calls, 1) if calls else 0.0,
+                })
+            result = {
+                "day": self.day,
+                "models": models,
+                "total_cost_usd": round(sum(m["cost_usd"] for m in models), 6),
+                "total_input_tokens": sum(m["input_tokens"] for m in models),
+                "total_output_tokens": sum(m["output_tokens"] for m in models),
+                "clients_today": len(self.client_spend),
+                "downgrades": dict(self.downgrades),
+                "budget": {"daily_usd": self.daily_budget, "hard_limit_usd": self.hard_limit},
+            }
+            if client_id is not None:
+                result["client"] = {"client_id": client_id, "spend_today_usd": round(self.client_spend.get(client_id, 0.0), 6)}
+        return result
@@ -1,17 +1,44 @@
 import os
+import re
 import json
+import asyncio
+import hashlib
+import hmac
 import string
 import sqlite3
 import time
 import logging
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 import pytz
-from fastapi import FastAPI, Request, HTTPException
-from pydantic import BaseModel
+from fastapi import BackgroundTasks, FastAPI, Request, Response, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Annotated, Optional
+from typing_extensions import TypedDict
+from pydantic import BaseModel, Field, StringConstraints, ValidationError, field_validator
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types as genai_types
 from mistralai.client import Mistral #v2
+from knowledge_pack import KNOWLEDGE_PACK
+from metrics import Counter, render_prometheus, stage_timer, start_trace
+from usage import UsageTracker, gemini_usage, mistral_usage, make_usage
+from singleflight import SingleFlight
+from idempotency import IdempotencyConflict, IdempotencyStore
+from suppression import SuppressionList, identity_keys
+from leads import MERGE_FIELDS, encode_lead, find_lead, lead_keys, load_lead, merge_lead, migrate_lead_turns, migrate_leads, save_merged
+from retrieval import build_knowledge_index
+from tasks import TaskQueue
+from transcripts import TranscriptStore, new_transcript_id
+from lead_export import EXPORT_FORMATS, export_leads
+from analytics import STATS_MAX_DAYS, migrate_rollups, record_call, rollup_stats
+from admission import AdmissionController
+from webhooks import WebhookOutbox, lead_events
+from inventory import (
+    INVENTORY_SEED_DEMO, UNIT_STATUSES, UNITS_SEARCH_MAX_LIMIT, UnitInventory, format_unit, migrate_units, seed_demo_units,
+)
+from routing import BUDGET_TIER, TIER_LATENCY, TIER_REQUESTS, choose_tier, classify_intent, route_for
 
 
 load_dotenv()
@@ -25,6 +52,10 @@ MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 
+# Optional endpoint overrides (e.g. local stand-in servers used by benchmarks/)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL")
+
 if not GEMINI_API_KEY and not MISTRAL_API_KEY:
     if os.getenv("CI") == "true":
         # Skip strict checks in CI
@@ -34,11 +65,16 @@ if not GEMINI_API_KEY and not MISTRAL_API_KEY:
         raise ValueError("Set GEMINI_API_KEY and/or MISTRAL_API_KEY in .env to run the agent")
 
 #Gemini Client
-gemini_client = genai.Client(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None
+gemini_client = None
+if GEMINI_API_KEY:
+    gemini_client = genai.Client(
+        api_key=GEMINI_API_KEY,
+        http_options={"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None
+    )
 
 mistral_client = None
 if MISTRAL_API_KEY:
-    mistral_client = Mistral(api_key=MISTRAL_API_KEY)
+    mistral_client = Mistral(api_key=MISTRAL_API_KEY, server_url=MISTRAL_SERVER_URL)
 else:
     logging.warning("MISTRAL_API_KEY is not set — Mistral fallback will not work")
 
@@ -106,7 +142,7 @@ def generate_tts_audio(text: str) -> BytesIO:
     return None
 '''
 
-# Knowledge pack 
+# Knowledge pack (legacy single-project version — live pack is in knowledge_pack.py)
 '''
 KNOWLEDGE_PACK = {
     "project": "Riverstone Place",
@@ -133,53 +169,6 @@ KNOWLEDGE_PACK = {
     "handoff_email": "sales@riverstoneplace.example"
 }
 '''
-KNOWLEDGE_PACK = {
-    "developer": "Harbourline Developments",
-    "projects": [
-        {
-            "name": "Riverstone Place",
-            "suburb": "Abbotsford",
-            "price_1bed": "from $585,000",
-            "price_2bed": "from $845,000 (1 car included)",
-            "price_3bed": "from $1.28m (2 cars included)",
-            "strata": "2.8–6.2k/yr",
-            "completion": "Q4 2027",
-            "lifestyle": "Quiet, leafy, 10 min to CBD, near Yarra River trails"
-        },
-        {
-            "name": "Harbourview Towers",
-            "suburb": "Richmond",
-            "price_1bed": "from $720,000",
-            "price_2bed": "from $1.05m",
-            "price_3bed": "from $1.65m",
-            "strata": "3.8–7.5k/yr",
-            "completion": "Q2 2027",
-            "lifestyle": "Vibrant, cafes, shops, 5 min walk to train & MCG"
-        },
-        {
-            "name": "Yarra Edge",
-            "suburb": "Footscray",
-            "price_1bed": "from $520,000",
-            "price_2bed": "from $780,000",
-            "price_3bed": "from $1.15m",
-            "strata": "2.5–5.1k/yr",
-            "completion": "Q3 2026",
-            "lifestyle": "Up-and-coming, multicultural food scene, best value, near Footscray Station"
-        },
-        {
-            "name": "Collingwood Quarter",
-            "suburb": "Collingwood",
-            "price_1bed": "from $635,000",
-            "price_2bed": "from $920,000",
-            "price_3bed": "from $1.45m",
-            "strata": "3.2–6.8k/yr",
-            "completion": "Q1 2027",
-            "lifestyle": "Hip street art, breweries, trams everywhere, young professional vibe"
-        }
-    ],
-    "handoff_email": "sales@harbourline.com.au",
-    "display_suite": "123 Swan St, Richmond"
-}
 
 # Appointment slots with ISO datetime
 MELBOURNE_TZ = pytz.timezone("Australia/Melbourne")
@@ -219,28 +208,44 @@ APPOINTMENT_SLOTS = generate_appointment_slots(days_ahead=10)
 # ---------------------------
 # FastAPI Setup
 # ---------------------------
-app = FastAPI(title="Riverstone Voice Agent")
+@asynccontextmanager
+async def lifespan(app):
+    # Post-response work (see tasks.py): requeue anything a previous process left unfinished, then poll
+    task_queue.start()
+    webhook_outbox.start()
+    yield
+    await task_queue.stop()
+    await webhook_outbox.stop()
+
+app = FastAPI(title="Riverstone Voice Agent", lifespan=lifespan)
 
 # ---------------------------
 # Custom Rate Limiter
 # ---------------------------
 request_log = defaultdict(list)
-MAX_REQUESTS = 5       # allowed requests
-WINDOW_SECONDS = 60    # in seconds
+MAX_REQUESTS = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", 5))       # allowed requests
+WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", 60))   # in seconds
 
-def check_rate_limit(client_id: str) -> bool:
+def check_rate_limit(client_id: str, max_requests=MAX_REQUESTS, window_seconds=WINDOW_SECONDS) -> bool:
     now = time.time()
-    window_start = now - WINDOW_SECONDS
+    window_start = now - window_seconds
     request_log[client_id] = [ts for ts in request_log[client_id] if ts > window_start]
-    if len(request_log[client_id]) >= MAX_REQUESTS:
+    if len(request_log[client_id]) >= max_requests:
         return False
     request_log[client_id].append(now)
     return True
 
+def bearer_token_ok(request: Request, token) -> bool:
+    """True if the request sends "Authorization: Bearer <token>"; always False while token is unset."""
+    supplied = request.headers.get("Authorization", "").encode()
+    return bool(token) and hmac.compare_digest(supplied, f"Bearer {token}".encode())
+
 # ---------------------------
 # SQLite Logging
 # ---------------------------
-conn = sqlite3.connect("leads.db", check_same_thread=False)
+LEADS_DB_PATH = os.getenv("LEADS_DB_PATH", "leads.db")
+LEAD_TZ = timezone(timedelta(hours=10))  # lead timestamps are stored as +10:00 ISO strings
+conn = sqlite3.connect(LEADS_DB_PATH, check_same_thread=False)
 cursor = conn.cursor()
 cursor.execute("""
 CREATE TABLE IF NOT EXISTS leads (
@@ -255,51 +260,211 @@ CREATE TABLE IF NOT EXISTS leads (
     recording_url TEXT
 )
 """)
+cursor.execute("""
+CREATE TABLE IF NOT EXISTS llm_usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lead_id INTEGER,
+    timestamp TEXT,
+    client_id TEXT,
+    provider TEXT,
+    model TEXT,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    latency_ms REAL,
+    cost_usd REAL,
+    ok INTEGER
+)
+""")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_llm_usage_lead ON llm_usage (lead_id)")
 conn.commit()
+# Queryable lead attributes and caller identity (one row per buyer); see leads.py
+migrate_leads(conn)
 
-async def log_lead(data):
-    timestamp = datetime.now(timezone(timedelta(hours=10))).isoformat()
-    cursor.execute("""
-        INSERT INTO leads (timestamp, caller_cli, summary, qualification, booking, compliance_flags, transcript_url, recording_url)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        timestamp,
-        data["caller_cli"],
-        data["summary"],
-        json.dumps(data["qualification"]),
-        json.dumps(data["booking"]),
-        json.dumps(data["compliance_flags"]),
-        data["transcript_url"],
-        data["recording_url"]
-    ))
-    conn.commit()
-    return {"ok": True, "logged": True}
+suppression_list = SuppressionList(conn)
+
+# Per-day lead counts for /stats, kept up to date by every lead write (see analytics.py)
+migrate_rollups(conn)
+
+# Conversation turns live in compressed segment files (see transcripts.py); leads.db keeps the offsets
+transcript_store = TranscriptStore(conn)
+migrate_lead_turns(conn, transcript_store)
+
+# Per-unit inventory (see inventory.py); load stock with `python -m inventory import`, picked up without a restart
+migrate_units(conn)
+if INVENTORY_SEED_DEMO:
+    seed_demo_units(conn)
+unit_inventory = UnitInventory(conn)
+
+def _upsert_lead(data, usage, client_id, timestamp):
+    """
+    Insert or merge one lead (plus its conversation turn and LLM usage rows) without committing.
+    Returns (lead_id, merged): repeat callers, matched by number then email, update their existing lead.
+    """
+    identity, email_key = lead_keys(data["caller_cli"], data.get("email"))
+    lead_id = find_lead(conn, identity, email_key)
+    merged = lead_id is not None
+    if merged:
+        save_merged(conn, lead_id, merge_lead(load_lead(conn, lead_id), data), timestamp)
+    else:
+        # encode_lead serializes the JSON columns once, shared with the merge path
+        cursor.execute(f"""
+            INSERT INTO leads (timestamp, caller_cli, identity, email_key, updated_at, {', '.join(MERGE_FIELDS)}, timeframe)
+            VALUES ({', '.join('?' * (len(MERGE_FIELDS) + 6))})
+        """, (timestamp, data["caller_cli"], identity, email_key, timestamp, *encode_lead(data)))
+        lead_id = cursor.lastrowid
+    turn = data.get("turn")
+    if turn:
+        data = dict(data, transcript_url=_lead_transcript_url(lead_id, turn, timestamp))
+    # CRM events (booked / handoff) and the /stats rollups are written in the same transaction as the lead itself
+    for event_type in data.get("events") or ():
+        webhook_outbox.emit(event_type, lead_id, data, timestamp)
+    record_call(conn, data, timestamp, new_lead=not merged)
+    insert_usage(conn, lead_id, timestamp, client_id, usage)
+    return lead_id, merged
+
+def insert_usage(db, lead_id, timestamp, client_id, usage):
+    """Write LLM usage rows (as built by usage.make_usage) for a lead without committing."""
+    if usage:
+        db.executemany("""
+            INSERT INTO llm_usage (lead_id, timestamp, client_id, provider, model, input_tokens, output_tokens, latency_ms, cost_usd, ok)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (lead_id, timestamp, client_id, u["provider"], u["model"], u["input_tokens"], u["output_tokens"],
+             u["latency_ms"], u["cost_usd"], int(u["ok"]))
+            for u in usage
+        ])
+
+def _lead_transcript_url(lead_id, turn, timestamp):
+    """Append the turn to the lead's transcript (started on its first turn); returns its /transcripts URL."""
+    transcript_id = cursor.execute("SELECT transcript_id FROM leads WHERE id = ?", (lead_id,)).fetchone()[0]
+    if transcript_id is None:
+        transcript_id = new_transcript_id()
+        cursor.execute(
+            "UPDATE leads SET transcript_id = ?, transcript_url = ? WHERE id = ?",
+            (transcript_id, f"/transcripts/{transcript_id}", lead_id)
+        )
+    transcript_store.append(transcript_id, {"timestamp": timestamp, "user": turn["user"], "agent": turn["agent"]})
+    return f"/transcripts/{transcript_id}"
+
+# Leads from /call are written after the response is sent; the task row is committed first, so a
+# lead is never lost once /call has answered
+task_queue = TaskQueue(conn)
+webhook_outbox = WebhookOutbox(conn)
+
+@task_queue.handler("log_lead")
+def _log_lead_task(payload):
+    # No commit here: the queue deletes the task in the same transaction, so a lead is upserted exactly once
+    _upsert_lead(payload["data"], payload["usage"], payload["client_id"], payload["timestamp"])
+
+async def log_lead(data, usage=None, client_id=None):
+    """Queue the lead (with its usage rows) for the background workers; durable once this returns."""
+    timestamp = datetime.now(LEAD_TZ).isoformat()
+    task_id = task_queue.enqueue(
+        "log_lead", {"data": data, "usage": usage or [], "client_id": client_id, "timestamp": timestamp}
+    )
+    return {"ok": True, "queued": True, "task_id": task_id}
+
+def log_leads_bulk(records):
+    """Upsert many (data, usage, client_id) records in a single transaction; returns their lead ids."""
+    timestamp = datetime.now(LEAD_TZ).isoformat()
+    try:
+        lead_ids = [_upsert_lead(data, usage, client_id, timestamp)[0] for data, usage, client_id in records]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return lead_ids
 
 # ---------------------------
 # Models
 # ---------------------------
+# Bounds keep validation cost and prompt size predictable; the Streamlit client resends its whole
+# chat history every turn, so older turns are dropped (not rejected) beyond CHAT_HISTORY_MAX_TURNS.
+MAX_MESSAGE_CHARS = 4000
+MAX_REPLY_CHARS = 8000
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", 20))
+PROMPT_HISTORY_TURNS = 5
+
+ShortText = Annotated[str, StringConstraints(max_length=200)]
+
+class ChatTurn(TypedDict):
+    """One earlier exchange. A TypedDict validates ~5x faster than a nested model and stays a plain dict."""
+    user: Annotated[str, StringConstraints(max_length=MAX_MESSAGE_CHARS)]
+    agent: Annotated[str, StringConstraints(max_length=MAX_REPLY_CHARS)]
+
 class CallRequest(BaseModel):
-    name: str
-    phone: str
-    email: str
-    message: str
+    name: ShortText
+    phone: Annotated[str, StringConstraints(max_length=40)]
+    email: Annotated[str, StringConstraints(max_length=320)]
+    message: Annotated[str, StringConstraints(max_length=MAX_MESSAGE_CHARS)]
     budget: int
     beds: int
     parking: int
-    timeframe: str
+    timeframe: ShortText
     owner_occ: bool
-    finance_status: str
-    preferred_suburbs: list
-    preferred_slot: str = None
-    additional_info: str = ""
-    chat_history: list = []
+    finance_status: ShortText
+    preferred_suburbs: list[ShortText] = Field(max_length=20)
+    preferred_slot: Optional[ShortText] = None
+    additional_info: Annotated[str, StringConstraints(max_length=MAX_MESSAGE_CHARS)] = ""
+    chat_history: list[ChatTurn] = []
+
+    @field_validator("chat_history", mode="before")
+    @classmethod
+    def keep_recent_turns(cls, value):
+        return value[-CHAT_HISTORY_MAX_TURNS:] if isinstance(value, list) else value
+
+class CallResponse(BaseModel):
+    """/call reply; unset fields are omitted (e.g. unsubscribe replies only carry response + flags)."""
+    response: str
+    booking: Optional[dict] = None
+    human_handoff: bool = False
+    lead_logged: bool = False
+    compliance_flags: Optional[list[str]] = None
+    degraded: bool = False  # set when load shedding answered with the template reply
 
 # ---------------------------
 # Helpers
 # ---------------------------
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
 def sanitize_message(msg: str) -> str:
-    translator = str.maketrans("", "", string.punctuation)
-    return msg.lower().translate(translator).strip()
+    return msg.lower().translate(PUNCTUATION_TABLE).strip()
+
+def keyword_pattern(words):
+    """Compiled substring matcher equivalent to any(word in text for word in words)."""
+    return re.compile("|".join(re.escape(word) for word in words))
+
+# Unsubscribing is permanent, so only clear opt-out intent counts: whole words on the sanitized
+# message, and a bare "stop" only as the entire message ("near the bus stop" is not an opt-out)
+UNSUBSCRIBE_PATTERN = re.compile(
+    r"^stop$|\b(?:unsubscribe|opt out|(?:do not|dont) (?:call|contact|text|email)"
+    r"|stop (?:calling|contacting|texting|messaging|emailing))\b"
+)
+INTEREST_PATTERN = keyword_pattern(["visit", "see", "appointment", "book", "chat", "meet", "speak", "human"])
+HANDOFF_PATTERN = keyword_pattern(["human", "speak to someone", "sales team"])
+UNSUBSCRIBE_REPLY = "No worries at all — you won’t be contacted again. Have a great day!"
+
+MAX_INTEREST_SCORE = 8  # budget 2 + beds 1 + timeframe 2 + interest keywords 3
+
+def score_call(call: CallRequest) -> dict:
+    """Smart interest scoring for booking / human handoff."""
+    msg_clean = sanitize_message(call.message + " " + getattr(call, "additional_info", ""))
+    interest_score = 0
+    if call.budget >= 800000: interest_score += 2
+    if call.beds >= 2: interest_score += 1
+    if call.timeframe in ["0-3 months", "3-6 months"]:
+        interest_score += 2
+    if INTEREST_PATTERN.search(msg_clean):
+        interest_score += 3
+    return {
+        "msg_clean": msg_clean,
+        "unsubscribe": UNSUBSCRIBE_PATTERN.search(msg_clean) is not None,
+        "interest_score": interest_score,
+    }
+
+def score_calls(calls) -> list:
+    """Score a batch of calls in one pass (used by /call/batch ingest)."""
+    return [score_call(call) for call in calls]
 
 def iso_to_readable(iso_str: str) -> str:
     dt = datetime.fromisoformat(iso_str)
@@ -320,27 +485,85 @@ async def book_appointment(name, phone, email, slot_iso, mode="video", notes="")
 # ---------------------------
 # LLM Response
 # ---------------------------
-async def generate_agent_response(call: CallRequest):
-    if os.getenv("CI") == "true":
-        return "Test response"
-    msg = call.message.lower()
+LLM_CALLS = Counter(
+    "riverstone_llm_calls_total",
+    "LLM provider calls by provider and outcome",
+    label_names=("provider", "outcome"),
+)
 
-    # Quick unsubscribe
-    if any(word in msg for word in ["stop", "unsubscribe", "do not call"]):
-        return "No worries at all — you won’t be contacted again. Have a great day!"
-    
-    # -------------------------------
-    # Build conversation history
-    # -------------------------------
-    history_text = ""
-    if hasattr(call, "chat_history") and call.chat_history:
-        # Include last 5 turns only
-        for turn in call.chat_history[-5:]:
-            history_text += f"User: {turn['user']}\nAgent: {turn['agent']}\n"
-
-
-    # Build smart prompt
-    prompt = f"""
+STATIC_FALLBACK_REPLY = "Thanks for your message! Based on what you've told me, I'd recommend having a look at **Yarra Edge in Footscray** — excellent value with a great food scene. Would you like more details or to book a quick chat with our team?"
+
+usage_tracker = UsageTracker()
+
+# Upper bound on concurrent calls per provider (protects provider rate limits under batch fan-out)
+PROVIDER_MAX_CONCURRENCY = {
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", 32)),
+    "mistral": int(os.getenv("MISTRAL_MAX_CONCURRENCY", 16)),
+}
+provider_slots = {name: asyncio.Semaphore(limit) for name, limit in PROVIDER_MAX_CONCURRENCY.items()}
+
+
+class RequestPacer:
+    """Spaces calls so at most `per_minute` start in any minute (0 = unlimited)."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_start = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+# Provider requests-per-minute quotas (0 = no limit); long-running jobs such as follow-up
+# campaigns would otherwise burn through the quota the live /call traffic needs
+PROVIDER_RPM = {
+    "gemini": int(os.getenv("GEMINI_RPM", 0)),
+    "mistral": int(os.getenv("MISTRAL_RPM", 0)),
+}
+provider_pacers = {name: RequestPacer(rpm) for name, rpm in PROVIDER_RPM.items()}
+llm_singleflight = SingleFlight("llm")
+
+# Prompt grounding: top-k listings / lifestyle blurbs / FAQs per request, inside a token budget
+knowledge_index = build_knowledge_index(KNOWLEDGE_PACK)
+
+def matching_units(call: CallRequest, limit=3):
+    """Cheapest available units within budget with the beds and parking asked for, preferred suburbs first."""
+    criteria = dict(max_price=call.budget, beds=call.beds, min_parking=call.parking, limit=limit)
+    units = []
+    if call.preferred_suburbs:
+        units, _ = unit_inventory.search(suburbs=call.preferred_suburbs, **criteria)
+    if not units:
+        units, _ = unit_inventory.search(**criteria)
+    return units
+
+def grounding_query(call: CallRequest) -> str:
+    last_user_turn = call.chat_history[-1]["user"] if call.chat_history else ""
+    return " ".join([
+        call.message, call.additional_info, last_user_turn, " ".join(call.preferred_suburbs), f"{call.beds}-bed"
+    ])
+
+_gemini_configs = {}
+
+def gemini_config_for(tier: str):
+    """GenerateContentConfig per routing tier, built once (tiers are static)."""
+    config = _gemini_configs.get(tier)
+    if config is None:
+        route = route_for(tier)
+        config = _gemini_configs[tier] = genai_types.GenerateContentConfig(
+            temperature=route["temperature"],
+            max_output_tokens=route["max_output_tokens"] + route["thinking_budget"],
+            thinking_config=genai_types.ThinkingConfig(thinking_budget=route["thinking_budget"])
+        )
+    return config
+
+# str.format template (fields: see build_prompt); evaluation.py swaps in variants of it
+PROMPT_TEMPLATE = """
 You are an experienced, friendly Melbourne real estate sales agent for Harbourline Developments.
 Speak like a real person — warm, confident, short sentences, never robotic.
 Maximum 3-4 sentences. End with ONE question or clear next step to keep the conversation going.
@@ -351,42 +574,117 @@ Conversation so far:
 {history_text}
 
 User just said:
-{call.message}
+{message}
+
+Relevant projects and info (only quote prices and facts from here):
+{grounding}
 
-Our current projects:
-- Riverstone Place (Abbotsford): {KNOWLEDGE_PACK['projects'][0]['price_2bed']}, leafy & quiet
-- Harbourview Towers (Richmond): {KNOWLEDGE_PACK['projects'][1]['price_2bed']}, vibrant & central
-- Yarra Edge (Footscray): {KNOWLEDGE_PACK['projects'][2]['price_2bed']}, best value & food scene
-- Collingwood Quarter (Collingwood): {KNOWLEDGE_PACK['projects'][3]['price_2bed']}, hip & creative
+Available units that fit their budget, beds and parking (quote these exact prices):
+{units}
 
 User details:
-• Name: {call.name}
-• Budget: ${call.budget:,}
-• Beds wanted: {call.beds}
-• Timeframe: {call.timeframe}
-• Finance: {call.finance_status}
-• Owner-occupier: {call.owner_occ}
-• Extra note: {call.message}
-• Additional: {getattr(call, 'additional_info', '')}
+• Name: {name}
+• Budget: ${budget:,}
+• Beds wanted: {beds}
+• Timeframe: {timeframe}
+• Finance: {finance_status}
+• Owner-occupier: {owner_occ}
+• Extra note: {message}
+• Additional: {additional_info}
 
 Based on what they told you, recommend the BEST matching suburb/project based on their needs.
 Avoid repeating the same recommendation unless the user insists.
-If their budget is low → lean Footscray. Medium → Abbotsford/Collingwood. High → Richmond.
-Be helpful and slightly salesy. Never push finance/legal advice — refer to {KNOWLEDGE_PACK['handoff_email']}.
+Match their budget against the prices listed above; don't assume which suburb is cheapest.
+Be helpful and slightly salesy. Never push finance/legal advice — refer to {handoff_email}.
 """
 
+def build_prompt(call: CallRequest, instruction=None, template=PROMPT_TEMPLATE):
+    """The reply prompt: conversation history, retrieved grounding and matching units filled into template."""
+    history_text = "".join(
+        f"User: {turn['user']}\nAgent: {turn['agent']}\n" for turn in call.chat_history[-PROMPT_HISTORY_TURNS:]
+    )
+    with stage_timer("retrieval"):
+        grounding = "\n".join(f"- {snippet}" for snippet in knowledge_index.snippets(grounding_query(call)))
+        if len(unit_inventory):
+            units = "\n".join(f"- {format_unit(unit)}" for unit in matching_units(call)) or (
+                "- None in budget with those beds/parking — suggest the closest project or a chat with the team"
+            )
+        else:
+            # No unit-level stock imported yet: the project "from" prices above are all there is
+            units = "- Unit-level stock isn't loaded; quote the project \"from\" prices above instead"
+    prompt = template.format(
+        history_text=history_text, message=call.message, grounding=grounding, units=units, name=call.name,
+        budget=call.budget, beds=call.beds, timeframe=call.timeframe, finance_status=call.finance_status,
+        owner_occ=call.owner_occ, additional_info=call.additional_info, handoff_email=KNOWLEDGE_PACK["handoff_email"],
+    )
+    if instruction:
+        prompt += f"\n{instruction}\n"
+    return prompt
+
+async def generate_agent_response(call: CallRequest, usage_log=None, route=None, instruction=None):
+    """
+    Generate the agent reply (Gemini → Mistral → static fallback).
+    route is a model tier from routing.route_for(); None keeps the default models and limits.
+    If usage_log is a list, one usage record per provider attempt is appended to it.
+    instruction is appended to the prompt (e.g. outbound follow-ups rather than a reply).
+    """
+    if os.getenv("CI") == "true":
+        return "Test response"
+    gemini_model = route["gemini_model"] if route else GEMINI_MODEL
+    mistral_model = route["mistral_model"] if route else MISTRAL_MODEL
+    temperature = route["temperature"] if route else 0.7
+    max_tokens = route["max_output_tokens"] if route else 700
+    gemini_config = gemini_config_for(route["tier"]) if route else None
+    if usage_log is None:
+        usage_log = []
+    with stage_timer("prompt_build"):
+        # Quick unsubscribe
+        if UNSUBSCRIBE_PATTERN.search(sanitize_message(call.message)):
+            return UNSUBSCRIBE_REPLY
+
+        prompt = build_prompt(call, instruction)
+
+    # Identical prompts in flight at the same time share one provider call; its usage is charged to
+    # one of the callers that got the reply (the one that made it, unless that caller went away).
+    fingerprint = prompt_fingerprint(prompt, gemini_model, mistral_model, temperature, max_tokens)
+    (reply, usage), owner = await llm_singleflight.do(
+        fingerprint,
+        lambda: _call_providers(prompt, gemini_model, mistral_model, temperature, max_tokens, gemini_config)
+    )
+    if owner:
+        usage_log.extend(usage)
+    return reply
+
+
+def prompt_fingerprint(prompt, *params):
+    return hashlib.sha256("\x1f".join(map(str, (prompt, *params))).encode()).hexdigest()
+
+
+async def _call_providers(prompt, gemini_model, mistral_model, temperature, max_tokens, gemini_config):
+    """Gemini → Mistral → static fallback. Returns (reply, usage records)."""
+    usage = []
     # ========================
     # 1. Try Gemini first
     # ========================
     if gemini_client:
+        started = time.perf_counter()
         try:
-            response = gemini_client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt
-            )
+            async with provider_slots["gemini"]:
+                await provider_pacers["gemini"].wait()
+                started = time.perf_counter()
+                with stage_timer("gemini"):
+                    response = await gemini_client.aio.models.generate_content(
+                        model=gemini_model,
+                        contents=prompt,
+                        config=gemini_config
+                    )
+            usage.append(gemini_usage(response, gemini_model, time.perf_counter() - started))
             logging.info("✅ Used Gemini successfully")
-            return response.text.strip()
+            LLM_CALLS.inc("gemini", "ok")
+            return response.text.strip(), usage
         except Exception as e:
+            usage.append(make_usage("gemini", gemini_model, 0, 0, time.perf_counter() - started, ok=False))
+            LLM_CALLS.inc("gemini", "error")
             error_str = str(e).lower()
             logging.warning(f"Gemini failed: {type(e).__name__} - {str(e)}")
             
@@ -397,82 +695,97 @@ Be helpful and slightly salesy. Never push finance/legal advice — refer to {KN
     # 2. Fallback to Mistral V2
     # ========================
     if mistral_client:
+        started = time.perf_counter()
         try:
-            chat_response = mistral_client.chat.complete(
-                model=MISTRAL_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a friendly, professional real estate sales agent for Harbourline Developments in Melbourne. Speak conversationally. No markdown"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=700
-            )
-            logging.info(f"✅ Used Mistral ({MISTRAL_MODEL}) successfully as fallback")
-            return chat_response.choices[0].message.content.strip()
+            async with provider_slots["mistral"]:
+                await provider_pacers["mistral"].wait()
+                started = time.perf_counter()
+                with stage_timer("mistral"):
+                    chat_response = await mistral_client.chat.complete_async(
+                        model=mistral_model,
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": "You are a friendly, professional real estate sales agent for Harbourline Developments in Melbourne. Speak conversationally. No markdown"
+                            },
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+            usage.append(mistral_usage(chat_response, mistral_model, time.perf_counter() - started))
+            logging.info(f"✅ Used Mistral ({mistral_model}) successfully as fallback")
+            LLM_CALLS.inc("mistral", "ok")
+            return chat_response.choices[0].message.content.strip(), usage
 
         except Exception as e:
+            usage.append(make_usage("mistral", mistral_model, 0, 0, time.perf_counter() - started, ok=False))
+            LLM_CALLS.inc("mistral", "error")
             logging.error(f"Mistral also failed: {type(e).__name__} - {str(e)}", exc_info=True)
     
     # ========================
     # 3. Ultimate fallback (both failed)
     # ========================
     logging.error("Both Gemini and Mistral failed — using static fallback")
-    return "Thanks for your message! Based on what you've told me, I'd recommend having a look at **Yarra Edge in Footscray** — excellent value with a great food scene. Would you like more details or to book a quick chat with our team?"
+    LLM_CALLS.inc("static", "fallback")
+    return STATIC_FALLBACK_REPLY, usage
 
 # ---------------------------
-# Core Endpoint
+# Triage
 # ---------------------------
-@app.post("/call")
-async def handle_call(call: CallRequest, request: Request):
-    client_ip = request.client.host
-    if not check_rate_limit(client_ip):
-        raise HTTPException(
-            status_code=429,
-            detail="Too many requests, please try again later."
-        )
-    # Smart interest scoring - only book or handoff for hot leads
-    msg_clean = sanitize_message(call.message + " " + getattr(call, "additional_info", ""))
-    if any(word in msg_clean for word in ["stop", "unsubscribe", "do not call"]):
-        return {"response": "No worries at all — you won’t be contacted again. Have a great day!", 
-                "compliance_flags": ["unsubscribe_request"]}
-    
-    # Smart interest scoring for booking / human handoff
-    interest_score = 0
-    if call.budget >= 800000: interest_score += 2
-    if call.beds >= 2: interest_score += 1
-    if call.timeframe in ["0-3 months", "3-6 months"]: 
-        interest_score += 2
-    if any(word in msg_clean for word in ["visit", "see", "appointment", "book", "chat", "meet", "speak", "human"]):
-        interest_score += 3
-
+async def triage_call(call: CallRequest, score: dict):
+    """Book hot leads and flag human handoff. Returns (booking, human_handoff)."""
+    msg_clean = score["msg_clean"]
+    interest_score = score["interest_score"]
     booking = {"ok": False}
     human_handoff = False
 
     if interest_score >= 6 and "book" in msg_clean:  # Hot lead → book appointment
-        available_slots = generate_appointment_slots()
-        slot_iso = call.preferred_slot if call.preferred_slot in available_slots else available_slots[0]
-        mode = "display-suite" if "T10" in slot_iso or "T12" in slot_iso else "video"
-        booking = await book_appointment(
-            call.name, call.phone, call.email, slot_iso,
-            mode=mode,
-            notes=f"{call.beds}-bed, ${call.budget}, {call.finance_status}"
-        )
-    elif interest_score >= 3 and any(word in msg_clean for word in ["human", "speak to someone", "sales team"]):
+        with stage_timer("booking"):
+            available_slots = generate_appointment_slots()
+            slot_iso = call.preferred_slot if call.preferred_slot in available_slots else available_slots[0]
+            mode = "display-suite" if "T10" in slot_iso or "T12" in slot_iso else "video"
+            booking = await book_appointment(
+                call.name, call.phone, call.email, slot_iso,
+                mode=mode,
+                notes=f"{call.beds}-bed, ${call.budget}, {call.finance_status}"
+            )
+    elif interest_score >= 3 and HANDOFF_PATTERN.search(msg_clean):
         human_handoff = True
-
-    # Generate natural response using Gemini
-    agent_reply = await generate_agent_response(call)
-
-
-    # Log lead
-    lead_data = {
+    return booking, human_handoff
+
+def select_tier(call: CallRequest, score: dict, client_id=None):
+    """Model tier from lead value; clients over their token budget are downgraded (pass client_id=None to skip)."""
+    intent = classify_intent(score["msg_clean"])
+    tier = choose_tier(score["interest_score"], score["msg_clean"], intent, len(call.chat_history))
+    if client_id is not None:
+        budget_action = usage_tracker.budget_action(client_id)
+        if budget_action == "cheaper_model":
+            tier = BUDGET_TIER
+        elif budget_action == "template":
+            tier = "template"
+    TIER_REQUESTS.inc(tier)
+    return tier
+
+async def reply_for_tier(call: CallRequest, tier: str, usage: list):
+    started = time.perf_counter()
+    with stage_timer("llm_total"):
+        if tier == "template":
+            agent_reply = STATIC_FALLBACK_REPLY
+        else:
+            agent_reply = await generate_agent_response(call, usage, route=route_for(tier))
+    TIER_LATENCY.observe(time.perf_counter() - started, tier)
+    return agent_reply
+
+def build_lead_data(call: CallRequest, booking: dict, interest_score=None, agent_reply=None, human_handoff=False) -> dict:
+    return {
         "caller_cli": call.phone,
+        "name": call.name,
+        "email": call.email,
+        "interest_score": interest_score,
         "summary": f"{call.name}, {call.beds}-bed, budget ${call.budget}, finance {call.finance_status}",
         "qualification": {
             "budget_band": str(call.budget),
@@ -485,17 +798,408 @@ async def handle_call(call: CallRequest, request: Request):
         },
         "booking": booking,
         "compliance_flags": [],
-        "transcript_url": "https://placeholder-transcript-url.com",
-        "recording_url": "https://placeholder-recording-url.com"
+        # Set when the turn is stored (see _lead_transcript_url); calls are text-only, so there is no recording
+        "transcript_url": None,
+        "recording_url": None,
+        "turn": {"user": call.message, "agent": agent_reply} if agent_reply is not None else None,
+        "events": lead_events(booking, human_handoff),
     }
-    await log_lead(lead_data)
 
-    return {
+# ---------------------------
+# Core Endpoint
+# ---------------------------
+idempotency_store = IdempotencyStore()
+llm_admission = AdmissionController()
+
+# response_model lets FastAPI serialize straight to JSON bytes in pydantic-core (no jsonable_encoder pass)
+@app.post("/call", response_model=CallResponse, response_model_exclude_unset=True)
+async def handle_call(call: CallRequest, request: Request, response: Response, background_tasks: BackgroundTasks):
+    trace = start_trace("call_total")
+    # Queued post-call work (lead logging, ...) starts as soon as the response has been sent
+    background_tasks.add_task(task_queue.run_due)
+    try:
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if not idempotency_key:
+            return _retry_hint(await _handle_call(call, request), response)
+        if len(idempotency_key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters.")
+        # Retries with the same key get the original result (or wait for the in-flight attempt)
+        fingerprint = hashlib.sha256(call.model_dump_json().encode()).hexdigest()
+        try:
+            result, replayed = await idempotency_store.run(
+                idempotency_key, fingerprint, lambda: _handle_call(call, request)
+            )
+        except IdempotencyConflict:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request body."
+            )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        elif worth_retrying(result):
+            idempotency_store.forget(idempotency_key)  # so the retry gets a real reply, not this one again
+        return _retry_hint(result, response)
+    finally:
+        if trace:
+            trace.finish()
+            response.headers["Server-Timing"] = trace.server_timing()
+
+
+async def admitted_reply(call: CallRequest, tier: str, usage: list):
+    """(reply, degraded): LLM tiers run under llm_admission; shed requests get the template reply."""
+    if tier != "template":
+        with stage_timer("admission"):
+            admitted = await llm_admission.acquire()
+        if not admitted:
+            return await reply_for_tier(call, "template", usage), True
+        started = time.perf_counter()
+        try:
+            return await reply_for_tier(call, tier, usage), False
+        finally:
+            llm_admission.release(time.perf_counter() - started)
+    return await reply_for_tier(call, tier, usage), False
+
+def worth_retrying(result) -> bool:
+    """
+    Degraded replies that made no booking or handoff: a retry (which re-logs into the same lead) can
+    get a full reply without booking twice. Degraded replies that did book/hand off are final.
+    """
+    return bool(result.get("degraded")) and not result.get("booking") and not result.get("human_handoff")
+
+def _retry_hint(result, response: Response):
+    """Retryable shed (template) replies tell the client when a full reply is likely again."""
+    if worth_retrying(result):
+        response.headers["Retry-After"] = str(llm_admission.retry_after())
+    return result
+
+def suppress_caller(call: CallRequest):
+    """Persist an unsubscribe request so the caller is never processed (or billed) again."""
+    suppression_list.add(identity_keys(call.phone, call.email), source="unsubscribe_request")
+
+async def _handle_call(call: CallRequest, request: Request):
+    # Do-not-call numbers get no rate-limit slot, scoring or LLM call
+    if suppression_list.is_suppressed(call.phone, call.email):
+        return {"response": UNSUBSCRIBE_REPLY, "compliance_flags": ["do_not_call"]}
+    client_ip = request.client.host
+    with stage_timer("rate_limit"):
+        allowed = check_rate_limit(client_ip)
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please try again later."
+        )
+    with stage_timer("scoring"):
+        # Smart interest scoring - only book or handoff for hot leads
+        score = score_call(call)
+    if score["unsubscribe"]:
+        suppress_caller(call)
+        return {"response": UNSUBSCRIBE_REPLY, "compliance_flags": ["unsubscribe_request"]}
+
+    booking, human_handoff = await triage_call(call, score)
+
+    # Pick model tier / output budget from lead value, downgrading clients that are over their token budget
+    tier = select_tier(call, score, client_id=client_ip)
+
+    # Generate natural response using Gemini, unless the LLM path is saturated (see admission.py)
+    usage = []
+    agent_reply, degraded = await admitted_reply(call, tier, usage)
+    for record in usage:
+        usage_tracker.record(client_ip, record)
+
+    # Log lead
+    lead_data = build_lead_data(call, booking, score["interest_score"], agent_reply, human_handoff)
+    with stage_timer("log_lead"):
+        await log_lead(lead_data, usage, client_id=client_ip)
+
+    result = {
         "response": agent_reply,
         "booking": booking if booking["ok"] else None,
         "human_handoff": human_handoff,
         "lead_logged": True
     }
+    if degraded:
+        result["degraded"] = True
+    return result
+
+
+# ---------------------------
+# Batch qualification
+# ---------------------------
+# CRM imports: POST a JSON list, or NDJSON (Content-Type: application/x-ndjson), of CallRequests.
+# Lines are parsed and scored as they arrive, LLM calls fan out through a bounded worker pool
+# (plus the per-provider limits above), leads are written in bulk transactions, and results
+# stream back as NDJSON in completion order. Each result carries its input "index".
+# Batches need "Authorization: Bearer $BATCH_API_TOKEN" (the endpoint is off while it is unset). Every
+# item is charged to the caller like a /call: BATCH_RATE_LIMIT_MAX_ITEMS per window (items past it come
+# back "rate_limited"), the per-client token budget, and the shared LLM admission limit.
+BATCH_API_TOKEN = os.getenv("BATCH_API_TOKEN")
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 10000))
+BATCH_MAX_LINE_BYTES = int(os.getenv("BATCH_MAX_LINE_BYTES", 64 * 1024))
+BATCH_RATE_LIMIT_MAX_ITEMS = int(os.getenv("BATCH_RATE_LIMIT_MAX_ITEMS", 2000))
+BATCH_RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("BATCH_RATE_LIMIT_WINDOW_SECONDS", 3600))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 32))
+BATCH_WRITE_SIZE = int(os.getenv("BATCH_WRITE_SIZE", 100))
+BATCH_SCORE_CHUNK = 256
+
+async def _read_batch_items(request: Request):
+    """Yield (index, parsed JSON or exception) from a JSON-array or NDJSON body."""
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        index = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > BATCH_MAX_LINE_BYTES:
+                raise HTTPException(status_code=413, detail=f"NDJSON lines are limited to {BATCH_MAX_LINE_BYTES} bytes.")
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield index, json.loads(line)
+                    except ValueError as e:
+                        yield index, e
+                    index += 1
+        if buffer.strip():
+            try:
+                yield index, json.loads(buffer)
+            except ValueError as e:
+                yield index, e
+        return
+    try:
+        items = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON.")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of call requests.")
+    for index, item in enumerate(items):
+        yield index, item
+
+async def _qualify_batch_item(index, call, score, client_id):
+    booking, human_handoff = await triage_call(call, score)
+    tier = select_tier(call, score, client_id=client_id)
+    usage = []
+    agent_reply, degraded = await admitted_reply(call, tier, usage)
+    for record in usage:
+        usage_tracker.record(client_id, record)
+    result = {
+        "index": index,
+        "status": "ok",
+        "response": agent_reply,
+        "booking": booking if booking["ok"] else None,
+        "human_handoff": human_handoff,
+        "lead_logged": True,
+    }
+    if degraded:
+        result["degraded"] = True
+    return result, (build_lead_data(call, booking, score["interest_score"], agent_reply, human_handoff), usage, client_id)
+
+async def _batch_worker(work_queue, results, client_id):
+    while True:
+        item = await work_queue.get()
+        if item is None:  # ingest finished and queue drained
+            return
+        index, call, score = item
+        try:
+            results.put_nowait(await _qualify_batch_item(index, call, score, client_id))
+        except Exception as e:
+            logging.error(f"Batch item {index} failed: {type(e).__name__} - {e}")
+            results.put_nowait(({"index": index, "status": "error", "error": type(e).__name__}, None))
+
+def _triage_chunk(chunk, work_queue, results, client_id):
+    """
+    Validate and score a chunk of parsed items; do-not-call, unsubscribes, invalid rows and items
+    over the client's rate limit never reach the LLM.
+    """
+    calls = []
+    for index, item in chunk:
+        try:
+            if isinstance(item, Exception):
+                raise item
+            call = CallRequest.model_validate(item)
+        except (ValidationError, ValueError) as e:
+            results.put_nowait(({"index": index, "status": "invalid", "error": str(e)[:500]}, None))
+            continue
+        if suppression_list.is_suppressed(call.phone, call.email):
+            results.put_nowait(({"index": index, "status": "suppressed", "response": UNSUBSCRIBE_REPLY,
+                                 "compliance_flags": ["do_not_call"]}, None))
+        else:
+            calls.append((index, call))
+    unsubscribed = []
+    for (index, call), score in zip(calls, score_calls(call for _, call in calls)):
+        if score["unsubscribe"]:
+            unsubscribed.extend(identity_keys(call.phone, call.email))
+            results.put_nowait(({"index": index, "status": "ok", "response": UNSUBSCRIBE_REPLY,
+                                 "compliance_flags": ["unsubscribe_request"]}, None))
+        elif not check_rate_limit(f"batch:{client_id}", BATCH_RATE_LIMIT_MAX_ITEMS, BATCH_RATE_LIMIT_WINDOW_SECONDS):
+            results.put_nowait(({"index": index, "status": "rate_limited"}, None))
+        else:
+            work_queue.put_nowait((index, call, score))
+    suppression_list.add(unsubscribed, source="unsubscribe_request")
+
+async def _stream_batch_results(total, results, workers):
+    try:
+        emitted = 0
+        while emitted < total:
+            batch = [await results.get()]
+            while len(batch) < BATCH_WRITE_SIZE and not results.empty():
+                batch.append(results.get_nowait())
+            records = [lead for _, lead in batch if lead is not None]
+            if records:
+                with stage_timer("batch_log_leads"):
+                    lead_ids = iter(log_leads_bulk(records))
+                for result, lead in batch:
+                    if lead is not None:
+                        result["lead_id"] = next(lead_ids)
+            emitted += len(batch)
+            yield "".join(json.dumps(result) + "\n" for result, _ in batch)
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+@app.post("/call/batch")
+async def handle_call_batch(request: Request):
+    """Qualify many leads in one request; streams NDJSON results as they complete."""
+    if not bearer_token_ok(request, BATCH_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Batch qualification needs a valid BATCH_API_TOKEN bearer token.")
+    client_ip = request.client.host
+    if not check_rate_limit(client_ip):
+        raise HTTPException(status_code=429, detail="Too many requests, please try again later.")
+
+    work_queue = asyncio.Queue()
+    results = asyncio.Queue()
+    # Token budget and usage are the client's own, shared with its /call traffic
+    client_id = client_ip
+    workers = [asyncio.ensure_future(_batch_worker(work_queue, results, client_id)) for _ in range(BATCH_CONCURRENCY)]
+
+    # Work starts while the body is still being read
+    total = 0
+    chunk = []
+    try:
+        async for index, item in _read_batch_items(request):
+            if index >= BATCH_MAX_ITEMS:
+                raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items.")
+            chunk.append((index, item))
+            total += 1
+            if len(chunk) >= BATCH_SCORE_CHUNK:
+                _triage_chunk(chunk, work_queue, results, client_id)
+                chunk = []
+        _triage_chunk(chunk, work_queue, results, client_id)
+        for _ in workers:
+            work_queue.put_nowait(None)
+    except BaseException:
+        for worker in workers:
+            worker.cancel()
+        raise
+
+    return StreamingResponse(_stream_batch_results(total, results, workers), media_type="application/x-ndjson")
+
+
+# ---------------------------
+# Unit search
+# ---------------------------
+@app.get("/units/search")
+async def units_search(
+    max_price: Optional[int] = None,
+    min_price: int = 0,
+    beds: Optional[int] = None,
+    min_parking: int = 0,
+    suburb: Annotated[list[str], Query()] = [],
+    project: Annotated[list[str], Query()] = [],
+    min_floor: Optional[int] = None,
+    status: str = "available",
+    limit: Annotated[int, Query(ge=1, le=UNITS_SEARCH_MAX_LIMIT)] = 20,
+):
+    """Cheapest units matching the filters; total is omitted (null) when min_floor is used."""
+    if status not in UNIT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(UNIT_STATUSES)}")
+    units, total = unit_inventory.search(
+        max_price=max_price, min_price=min_price, beds=beds, min_parking=min_parking, projects=project,
+        suburbs=suburb, min_floor=min_floor, status=status, limit=limit
+    )
+    return {"total": total, "units": units}
+
+
+# ---------------------------
+# Transcripts
+# ---------------------------
+@app.get("/transcripts/{transcript_id}")
+def transcript(transcript_id: str):
+    """A lead's conversation as NDJSON turns, oldest first, streamed frame by frame from its segments."""
+    locations = transcript_store.locate(transcript_id)
+    if not locations:
+        raise HTTPException(status_code=404, detail="Transcript not found.")
+    return StreamingResponse(
+        (json.dumps(turn) + "\n" for turn in transcript_store.read(locations)), media_type="application/x-ndjson"
+    )
+
+
+# ---------------------------
+# Lead export
+# ---------------------------
+# Disabled unless LEADS_EXPORT_TOKEN is set; callers send it as "Authorization: Bearer <token>"
+LEADS_EXPORT_TOKEN = os.getenv("LEADS_EXPORT_TOKEN")
+
+@app.get("/leads/export")
+def leads_export(request: Request, format: str = "csv", since: Optional[str] = None):
+    """All leads (optionally only those updated since an ISO date) streamed as CSV or Parquet; see lead_export.py."""
+    if not bearer_token_ok(request, LEADS_EXPORT_TOKEN):
+        raise HTTPException(status_code=403, detail="Lead export needs a valid LEADS_EXPORT_TOKEN bearer token.")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server.")
+    # Own connection: chunks are read from the threadpool and must not see the shared connection's open writes
+    export_db = sqlite3.connect(LEADS_DB_PATH, check_same_thread=False)
+
+    def body():
+        try:
+            yield from export_leads(export_db, format, since=since)
+        finally:
+            export_db.close()
+
+    filename = f"leads-{datetime.now(LEAD_TZ):%Y%m%d}.{format}"
+    return StreamingResponse(body(), media_type=EXPORT_FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# ---------------------------
+# Lead stats
+# ---------------------------
+@app.get("/stats")
+def lead_stats(days: Annotated[int, Query(ge=1, le=STATS_MAX_DAYS)] = 30):
+    """Calls, new leads, bookings and handoffs (with rates) per day, suburb and project, from the rollups."""
+    return rollup_stats(conn, days, today=datetime.now(LEAD_TZ).date())
+
+
+# ---------------------------
+# CRM webhooks
+# ---------------------------
+@app.get("/webhooks/stats")
+def webhook_stats():
+    """Per-endpoint delivery counts, backlog, throughput and latency (see webhooks.py)."""
+    return webhook_outbox.stats()
+
+
+# ---------------------------
+# Usage
+# ---------------------------
+@app.get("/usage")
+def usage_summary(request: Request, client_id: str = None):
+    """Token/cost totals per provider and model today, plus one client's spend if requested."""
+    if not bearer_token_ok(request, LEADS_EXPORT_TOKEN):
+        raise HTTPException(status_code=403, detail="Usage needs a valid LEADS_EXPORT_TOKEN bearer token.")
+    return usage_tracker.summary(client_id)
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of in-process counters and latency histograms."""
+    return render_prometheus()
 
 
 # ---------------------------
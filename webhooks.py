@@ -0,0 +1,287 @@
+"""
+Outbound CRM webhooks for booked and handed-off leads.
+
+    CRM_WEBHOOK_URLS=https://crm.example.com/hooks/riverstone uvicorn voice_agent:app
+    python -m webhooks stats
+    python -m webhooks retry-dead
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+import uuid
+import httpx
+from pydantic_core import to_json
+from metrics import Counter, Gauge, Histogram
+
+# ---------------------------
+# CRM webhooks
+# ---------------------------
+# emit() writes one outbox row per endpoint inside the caller's transaction (the lead upsert), so an
+# event exists exactly when its lead does and survives restarts. One dispatcher loop per endpoint
+# wakes on new events, lingers WEBHOOK_LINGER_SECONDS to fill a batch, and POSTs up to
+# WEBHOOK_BATCH_SIZE events as one gzipped JSON document over a shared keep-alive connection pool.
+# A failed batch (network error, 408/429/5xx) is retried with jittered exponential backoff (or the
+# receiver's Retry-After); other 4xx responses and events out of attempts are dead-lettered.
+# Delivery is at-least-once: receivers should dedupe on the event "id".
+WEBHOOK_URLS = [url.strip() for url in os.getenv("CRM_WEBHOOK_URLS", "").split(",") if url.strip()]
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", 200))
+WEBHOOK_LINGER_SECONDS = float(os.getenv("WEBHOOK_LINGER_SECONDS", 0.2))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 8))
+WEBHOOK_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_BACKOFF_SECONDS", 1))
+WEBHOOK_MAX_BACKOFF_SECONDS = 300
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", 10))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 10))
+WEBHOOK_POLL_SECONDS = 5  # also picks up retries that come due while nothing new is emitted
+RETRYABLE_STATUSES = {408, 425, 429}
+
+WEBHOOK_EVENTS = Counter(
+    "riverstone_webhook_events_total",
+    "Webhook events by endpoint and outcome: delivered, retried, dead",
+    label_names=("endpoint", "outcome"),
+)
+WEBHOOK_BATCHES = Counter(
+    "riverstone_webhook_batches_total",
+    "Webhook batch POSTs by endpoint and result (HTTP status or error)",
+    label_names=("endpoint", "result"),
+)
+WEBHOOK_LATENCY = Histogram("riverstone_webhook_request_seconds", "Webhook batch POST latency", label_names=("endpoint",))
+
+
+def lead_events(booking, human_handoff):
+    """Event types a qualified call produces."""
+    events = []
+    if booking and booking.get("ok"):
+        events.append("lead.booked")
+    if human_handoff:
+        events.append("lead.handoff")
+    return events
+
+
+class WebhookOutbox:
+    def __init__(self, db, endpoints=None, batch_size=WEBHOOK_BATCH_SIZE, linger_seconds=WEBHOOK_LINGER_SECONDS,
+                 max_attempts=WEBHOOK_MAX_ATTEMPTS, backoff_seconds=WEBHOOK_BACKOFF_SECONDS, transport=None,
+                 export_metrics=True):
+        self.db = db
+        self.endpoints = WEBHOOK_URLS if endpoints is None else list(endpoints)
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.transport = transport
+        self.client = None
+        self._wake = {}          # endpoint -> asyncio.Event, while dispatchers run
+        self._dispatchers = []
+        self._started_at = time.monotonic()
+        db.execute("""
+        CREATE TABLE IF NOT EXISTS webhook_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            endpoint TEXT NOT NULL,
+            event TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_error TEXT
+        )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS idx_webhook_events_due ON webhook_events (endpoint, status, next_attempt_at)")
+        db.commit()
+        if export_metrics:
+            Gauge("riverstone_webhook_pending", "Webhook events waiting for delivery", callback=self.pending)
+
+    def emit(self, event_type, lead_id, lead, occurred_at):
+        """Queue an event for every endpoint without committing (call inside the lead's transaction)."""
+        if not self.endpoints:
+            return None
+        event_id = uuid.uuid4().hex
+        event = to_json({
+            "id": event_id,
+            "type": event_type,
+            "occurred_at": occurred_at,
+            "lead_id": lead_id,
+            "lead": {
+                "name": lead.get("name"),
+                "phone": lead.get("caller_cli"),
+                "email": lead.get("email"),
+                "interest_score": lead.get("interest_score"),
+                "summary": lead.get("summary"),
+                "qualification": lead.get("qualification"),
+                "booking": lead.get("booking") if (lead.get("booking") or {}).get("ok") else None,
+            },
+        }).decode()
+        now = time.time()
+        self.db.executemany(
+            "INSERT INTO webhook_events (endpoint, event, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+            [(endpoint, event, now, now) for endpoint in self.endpoints]
+        )
+        for wake in self._wake.values():
+            wake.set()
+        return event_id
+
+    def pending(self):
+        return self.db.execute("SELECT COUNT(*) FROM webhook_events WHERE status = 'pending'").fetchone()[0]
+
+    def _client(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                transport=self.transport,
+                timeout=WEBHOOK_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=WEBHOOK_MAX_CONNECTIONS,
+                                    max_keepalive_connections=WEBHOOK_MAX_CONNECTIONS),
+            )
+        return self.client
+
+    async def deliver_batch(self, endpoint):
+        """POST the next due batch for one endpoint; returns how many events were attempted."""
+        rows = self.db.execute(
+            "SELECT id, event, attempts FROM webhook_events WHERE endpoint = ? AND status = 'pending' "
+            "AND next_attempt_at <= ? ORDER BY id LIMIT ?", (endpoint, time.time(), self.batch_size)
+        ).fetchall()
+        if not rows:
+            return 0
+        # Events are stored as JSON text, so the batch body is assembled without re-encoding them
+        body = gzip.compress(('{"events":[' + ",".join(event for _, event, _ in rows) + "]}").encode(), compresslevel=5)
+        started = time.perf_counter()
+        retry_after = None
+        try:
+            response = await self._client().post(
+                endpoint, content=body,
+                headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+            )
+            result = str(response.status_code)
+            error = None if response.is_success else f"HTTP {response.status_code}"
+            retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+            retry_after = response.headers.get("Retry-After")
+        except httpx.HTTPError as e:
+            result, error, retryable = type(e).__name__, f"{type(e).__name__}: {e}", True
+        WEBHOOK_LATENCY.observe(time.perf_counter() - started, endpoint)
+        WEBHOOK_BATCHES.inc(endpoint, result)
+
+        if error is None:
+            self.db.executemany("DELETE FROM webhook_events WHERE id = ?", [(row_id,) for row_id, _, _ in rows])
+            WEBHOOK_EVENTS.inc(endpoint, "delivered", amount=len(rows))
+        else:
+            logging.warning(f"Webhook batch of {len(rows)} to {endpoint} failed: {error}")
+            now = time.time()
+            retries, dead = [], []
+            for row_id, _, attempts in rows:
+                attempts += 1
+                if not retryable or attempts >= self.max_attempts:
+                    dead.append((attempts, error, row_id))
+                else:
+                    delay = min(self.backoff_seconds * 2 ** (attempts - 1), WEBHOOK_MAX_BACKOFF_SECONDS)
+                    delay *= random.uniform(0.5, 1.0)
+                    if retry_after and retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+                    retries.append((attempts, now + delay, error, row_id))
+            self.db.executemany(
+                "UPDATE webhook_events SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?", retries
+            )
+            self.db.executemany(
+                "UPDATE webhook_events SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?", dead
+            )
+            WEBHOOK_EVENTS.inc(endpoint, "retried", amount=len(retries))
+            WEBHOOK_EVENTS.inc(endpoint, "dead", amount=len(dead))
+        self.db.commit()
+        return len(rows) if error is None else 0
+
+    async def flush(self, endpoint=None):
+        """Deliver everything currently due (all endpoints by default); returns events delivered."""
+        delivered = 0
+        for target in [endpoint] if endpoint else self.endpoints:
+            while True:
+                sent = await self.deliver_batch(target)
+                if not sent:
+                    break
+                delivered += sent
+        return delivered
+
+    async def _dispatch(self, endpoint):
+        wake = self._wake[endpoint]
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=WEBHOOK_POLL_SECONDS)
+                    await asyncio.sleep(self.linger_seconds)  # let a burst of events share one POST
+                except asyncio.TimeoutError:
+                    pass
+                wake.clear()
+                await self.flush(endpoint)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Webhook dispatcher for {endpoint} failed: {e}")
+                await asyncio.sleep(WEBHOOK_POLL_SECONDS)
+
+    def start(self):
+        """Start one dispatcher per endpoint on the running event loop (no-op without endpoints)."""
+        self._started_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        for endpoint in self.endpoints:
+            self._wake[endpoint] = asyncio.Event()
+            self._wake[endpoint].set()  # deliver anything left from a previous run
+            self._dispatchers.append(loop.create_task(self._dispatch(endpoint)))
+
+    async def stop(self):
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        self._wake = {}
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def stats(self):
+        """Per-endpoint delivery counts, backlog, throughput and POST latency."""
+        counts = {
+            (endpoint, status): count for endpoint, status, count in self.db.execute(
+                "SELECT endpoint, status, COUNT(*) FROM webhook_events GROUP BY endpoint, status"
+            )
+        }
+        uptime = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            endpoint: {
+                "delivered": WEBHOOK_EVENTS.value(endpoint, "delivered"),
+                "retried": WEBHOOK_EVENTS.value(endpoint, "retried"),
+                "dead_lettered": WEBHOOK_EVENTS.value(endpoint, "dead"),
+                "pending": counts.get((endpoint, "pending"), 0),
+                "dead": counts.get((endpoint, "dead"), 0),
+                "batches": WEBHOOK_LATENCY.count(endpoint),
+                "events_per_second": round(WEBHOOK_EVENTS.value(endpoint, "delivered") / uptime, 2),
+                "latency_p50_ms": WEBHOOK_LATENCY.quantile(0.50, endpoint) * 1000,
+                "latency_p95_ms": WEBHOOK_LATENCY.quantile(0.95, endpoint) * 1000,
+            }
+            for endpoint in sorted(set(self.endpoints) | {endpoint for endpoint, _ in counts})
+        }
+
+    def retry_dead(self):
+        count = self.db.execute(
+            "UPDATE webhook_events SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'dead'",
+            (time.time(),)
+        ).rowcount
+        self.db.commit()
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("LEADS_DB_PATH", "leads.db"))
+    parser.add_argument("command", choices=["stats", "retry-dead"])
+    args = parser.parse_args(argv)
+    outbox = WebhookOutbox(sqlite3.connect(args.db))
+    if args.command == "stats":
+        print(json.dumps({endpoint: {key: value for key, value in stats.items() if key in ("pending", "dead")}
+                          for endpoint, stats in outbox.stats().items()}, indent=2))
+    else:
+        print(f"Requeued {outbox.retry_dead()} dead webhook events")
+
+
+if __name__ == "__main__":
+    main()